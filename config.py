@@ -7,18 +7,76 @@ API_URL = "https://api.hyperliquid.xyz/info"
 DATA_DIR = "data"
 FUNDING_RATES_FILE = "data/funding_rates.csv"
 FUNDING_HISTORY_FILE = "data/funding_history.csv"
+LATEST_RATES_FILE = "data/latest_rates.json"  # Latest snapshot + symbol list sidecar
+ROLLUPS_DIR = "data/rollups"  # Daily/weekly per-symbol aggregates
+ROLLING_DIR = "data/rolling"  # Persisted rolling stats and incremental state
+SEGMENT_LOG_DIR = "data/wal"  # Write-ahead log of live snapshots awaiting compaction
+DEAD_LETTER_DIR = "data/dead_letter"  # Snapshots an exporter could not deliver, per exporter
+CACHE_DIR = "data/.cache"  # Dashboard frames cached across restarts
+MATRIX_DIR = "data/matrix"  # Memory-mapped symbols x hours matrices of the history
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used entries are evicted past this
+
+# Rolling statistics windows (name -> length in hours of wall-clock time)
+ROLLING_WINDOWS = {"24h": 24, "7d": 24 * 7, "30d": 24 * 30}
+
+# Storage backend: "csv" (files above), "parquet" (partitioned by symbol/month)
+# or "sqlite" (single indexed database file with SQL aggregation)
+STORAGE_BACKEND = "csv"
+PARQUET_DIR = "data/parquet"
+SQLITE_FILE = "data/funding.sqlite"
 
 # Collection settings
 COLLECTION_INTERVAL_HOURS = 1
+COLLECTION_INTERVAL_SECONDS = COLLECTION_INTERVAL_HOURS * 3600  # e.g. 10-60 to sample predicted funding
+COLLECTION_JITTER_SECONDS = 0  # Random delay (up to this) added to each collection
 MAX_RETRIES = 3
 RETRY_DELAY_SECONDS = 30
+COMPACT_INTERVAL_SECONDS = 300  # Background compaction of the live snapshot log
+
+# Exporters (e.g. Google Sheets) run on a background queue, never on the collection path
+EXPORT_QUEUE_SIZE = 100  # Batches waiting per run; overflow goes straight to the dead-letter spool
+EXPORT_MAX_ATTEMPTS = 5
+EXPORT_BACKOFF_BASE_SECONDS = 5
+EXPORT_BACKOFF_MAX_SECONDS = 300
+EXPORT_FLUSH_SECONDS = 60  # Collections are coalesced into one export per destination per flush
+EXPORT_FLUSH_ROWS = 5000  # ... or sooner once this many rows are waiting
+EXPORT_STOP_TIMEOUT_SECONDS = 30  # Longest shutdown waits for the final flush
+
+# API rate limiting (Hyperliquid allows 1200 request weight per minute per IP)
+API_WEIGHT_PER_MINUTE = 1200
+API_WEIGHT_BURST = 300
+INFO_REQUEST_WEIGHT = 20
+ITEMS_PER_EXTRA_WEIGHT = 20  # fundingHistory costs +1 weight per 20 items returned
+
+# metaAndAssetCtxs responses are reused for this long within a run
+SNAPSHOT_TTL_SECONDS = 10
+
+# History fetch settings
+HISTORY_FETCH_WORKERS = 8
+RETRY_BACKOFF_BASE_SECONDS = 1
+RETRY_BACKOFF_MAX_SECONDS = 60
+BACKFILL_QUEUE_PAGES = 32  # Parsed pages buffered between fetch workers and the writer
+BACKFILL_MANIFEST_FILE = "data/backfill_manifest.json"  # Per-coin checkpoints for resuming
 
 # Dashboard settings
 DEFAULT_SYMBOLS = ["BTC", "ETH", "SOL", "ARB", "DOGE"]
 CHART_HEIGHT = 400
+MAX_HISTORY_DAYS = 30  # Widest window the live dashboard loads
 HISTORY_CHART_HEIGHT = 500
+TABLE_PAGE_SIZE = 100  # Rows per page of the raw data tables
+DOWNLOAD_BATCH_ROWS = 50_000  # Rows read per batch when streaming a table download
+CHART_MAX_POINTS = 1500  # Points per series sent to a time series chart (about its width in pixels)
+DOWNSAMPLE_METHOD = "minmax"  # "minmax" (keeps every bucket's extremes) or "lttb" (keeps the shape)
+
+# Carry backtest defaults
+BACKTEST_FEE_BPS = 5.0  # Cost per unit of notional traded (perp + spot legs), in basis points
+BACKTEST_REBALANCE_HOURS = 24  # Portfolio weights are reset this often
+BACKTEST_TOP_N = 5  # Symbols held by the top-N portfolio
+BACKTEST_LOOKBACK_HOURS = 24 * 7  # Trailing window ranking the top-N portfolio
 
 # Google Sheets settings
 GOOGLE_CREDENTIALS_FILE = "credentials.json"  # Service account JSON file
 SPREADSHEET_NAME = "Hyperliquid Funding Rates"  # Name of the spreadsheet to create/use
 WORKSHEET_NAME = "Funding Rates"  # Name of the worksheet
+SHEETS_ROTATION = "monthly"  # "monthly" (a tab per month), "monthly_spreadsheet" (opt-in: creates and link-shares a spreadsheet per month), or None
+SHEETS_LATEST_WORKSHEET = "Latest"  # Tab overwritten with the newest snapshot (None to disable)
@@ -13,8 +13,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta, timezone
 
-from src.storage import load_funding_rates, get_latest_rates, get_available_symbols
-from config import DEFAULT_SYMBOLS, CHART_HEIGHT
+from src.storage import query_funding_rates
+from src.downsample import downsample
+from src.table import TableQuery, render_table
+from config import DEFAULT_SYMBOLS, CHART_HEIGHT, MAX_HISTORY_DAYS, CHART_MAX_POINTS
 
 # Page config
 st.set_page_config(
@@ -26,11 +28,14 @@ st.set_page_config(
 # Header
 st.title("📊 Hyperliquid Funding Rate Tracker")
 
-# Load data
-df = load_funding_rates()
+# Load data: one narrow read covering the widest window the sidebar allows
+df = query_funding_rates(
+    start=datetime.now(timezone.utc) - timedelta(days=MAX_HISTORY_DAYS),
+    columns=["timestamp", "symbol", "funding_rate", "mark_price"]
+)
 
 if df.empty:
-    st.warning("No data available. Run the collector first: `python run_collector.py --once`")
+    st.warning(f"No data in the last {MAX_HISTORY_DAYS} days. Run the collector first: `python run_collector.py --once`")
     st.stop()
 
 # Last update time
@@ -40,7 +45,7 @@ st.caption(f"Last updated: {last_update.strftime('%Y-%m-%d %H:%M:%S')} UTC")
 # Sidebar filters
 st.sidebar.header("Filters")
 
-available_symbols = get_available_symbols()
+available_symbols = sorted(df["symbol"].unique().tolist())
 default_selection = [s for s in DEFAULT_SYMBOLS if s in available_symbols]
 
 selected_symbols = st.sidebar.multiselect(
@@ -52,12 +57,26 @@ selected_symbols = st.sidebar.multiselect(
 days_filter = st.sidebar.slider(
     "Days of History",
     min_value=1,
-    max_value=30,
+    max_value=MAX_HISTORY_DAYS,
     value=7
 )
 
 # Filter data (use timezone-aware datetime to match stored data)
+now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
 cutoff = datetime.now(timezone.utc) - timedelta(days=days_filter)
+
+# Zoom: the line chart is re-queried for this window, so narrowing it shows finer detail
+zoom_start, zoom_end = st.sidebar.slider(
+    "Zoom Chart",
+    min_value=now - timedelta(days=days_filter),
+    max_value=now,
+    value=(now - timedelta(days=days_filter), now),
+    step=timedelta(hours=1),
+    format="MM-DD HH:mm"
+)
+st.sidebar.caption(
+    f"The chart shows up to {CHART_MAX_POINTS:,} points per symbol; narrow the window for full detail."
+)
 filtered_df = df[
     (df["symbol"].isin(selected_symbols)) &
     (df["timestamp"] >= cutoff)
@@ -66,7 +85,7 @@ filtered_df = df[
 # Summary Cards
 st.subheader("Current Funding Rates")
 
-latest_rates = get_latest_rates()
+latest_rates = df[df["timestamp"] == last_update]
 if not latest_rates.empty and selected_symbols:
     cols = st.columns(min(len(selected_symbols), 5))
 
@@ -92,7 +111,8 @@ st.subheader("Funding Rates Over Time")
 
 if not filtered_df.empty:
     # Convert to percentage for display
-    chart_df = filtered_df.copy()
+    chart_df = filtered_df[(filtered_df["timestamp"] >= zoom_start) & (filtered_df["timestamp"] <= zoom_end)]
+    chart_df = downsample(chart_df, "funding_rate").copy()
     chart_df["funding_rate_pct"] = chart_df["funding_rate"] * 100
 
     fig = px.line(
@@ -123,7 +143,7 @@ if not filtered_df.empty:
     # Pivot for heatmap
     pivot_df = filtered_df.pivot_table(
         index="symbol",
-        columns=pd.Grouper(key="timestamp", freq="1H"),
+        columns=pd.Grouper(key="timestamp", freq="1h"),
         values="funding_rate",
         aggfunc="last"
     )
@@ -154,17 +174,29 @@ if not filtered_df.empty:
 st.subheader("Historical Data")
 
 if not filtered_df.empty:
-    display_df = filtered_df.copy()
-    display_df["funding_rate_pct"] = (display_df["funding_rate"] * 100).round(6)
-    display_df["mark_price"] = display_df["mark_price"].round(2)
-
-    display_df = display_df[["timestamp", "symbol", "funding_rate_pct", "mark_price"]]
-    display_df.columns = ["Timestamp", "Symbol", "Funding Rate (%)", "Mark Price ($)"]
-
-    st.dataframe(
-        display_df.sort_values("Timestamp", ascending=False),
-        use_container_width=True,
-        hide_index=True
+    # Only the visible page is fetched and rendered; downloads stream the whole selection
+    render_table(
+        TableQuery(
+            "funding_rates",
+            ["timestamp", "symbol", "funding_rate", "mark_price"],
+            symbols=selected_symbols,
+            start=cutoff
+        ),
+        display=lambda rows: pd.DataFrame({
+            "Timestamp": rows["timestamp"],
+            "Symbol": rows["symbol"],
+            "Funding Rate (%)": (rows["funding_rate"] * 100).round(6),
+            "Mark Price ($)": rows["mark_price"].round(2),
+        }),
+        sort_options={
+            "Timestamp": "timestamp",
+            "Symbol": "symbol",
+            "Funding Rate": "funding_rate",
+            "Mark Price": "mark_price",
+        },
+        file_name="funding_rates",
+        frame=filtered_df,
+        key="rates_table"
     )
 
 # Footer
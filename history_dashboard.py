@@ -3,16 +3,31 @@
 
 import sys
 import os
+from datetime import datetime, time, timedelta
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from config import DEFAULT_SYMBOLS, HISTORY_CHART_HEIGHT, FUNDING_HISTORY_FILE
+from config import (
+    DEFAULT_SYMBOLS, HISTORY_CHART_HEIGHT, CHART_MAX_POINTS, BACKTEST_FEE_BPS, BACKTEST_REBALANCE_HOURS, BACKTEST_TOP_N,
+    BACKTEST_LOOKBACK_HOURS,
+)
+from src.backends import get_backend
+from src.analytics import filter_date_range, volatility_ranking, find_gaps, MIN_ACTIVITY_RATIO
+from src.rollups import load_rollups, compute_rollups, query_rollups, range_stats, bucket_means
+from src.rolling import load_rolling_stats, compute_rolling_stats
+from src.frame_cache import disk_cached
+from src.downsample import downsample
+from src.table import TableQuery, render_table
+from src.matrix import load_matrix
+from src.backtest import run_backtest
+from src.storage import get_latest_rates
 
 # Page config
 st.set_page_config(
@@ -25,19 +40,106 @@ st.title("📈 Funding Rate History Dashboard")
 
 
 @st.cache_data
+@disk_cached(datasets=["funding_history"])
 def load_history():
-    """Load the full funding history CSV."""
-    df = pd.read_csv(FUNDING_HISTORY_FILE)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    """Load the full funding history from the configured storage backend."""
+    df = get_backend().read("funding_history")
     df.sort_values(["symbol", "timestamp"], inplace=True)
     df.reset_index(drop=True, inplace=True)
     return df
 
 
+@st.cache_data
+@disk_cached(datasets=["funding_history", "funding_history_daily"])
+def load_daily_rollups():
+    """Daily per-symbol rollups of the history, maintained at ingest time."""
+    if get_backend().supports_aggregation:
+        # Aggregated by the database from the raw rows, so never stale
+        return query_rollups("funding_history", "daily")
+
+    rollups = load_rollups("funding_history", "daily")
+    if rollups.empty or rollups["count"].sum() != len(load_history()):
+        # Missing or out of date: aggregate the loaded history instead
+        rollups = compute_rollups(load_history(), "daily")
+    return rollups
+
+
+@st.cache_data
+@disk_cached(datasets=["funding_history", "funding_history_rolling"])
+def load_trailing_means():
+    """Persisted 30-day trailing mean per observation, maintained at ingest time."""
+    trailing = load_rolling_stats("funding_history", columns=["timestamp", "symbol", "mean_30d"])
+    if len(trailing) != len(load_history()):
+        # Missing or out of date: compute from the loaded history instead
+        trailing = compute_rolling_stats(load_history(), {"30d": 24 * 30})[["timestamp", "symbol", "mean_30d"]]
+    return trailing
+
+
+@st.cache_data
+@disk_cached(datasets=["funding_history"])
+def load_gaps():
+    """Missing-hour gaps in the stored history."""
+    return find_gaps(load_history())
+
+
+@st.cache_data
+@disk_cached(datasets=["funding_history", "funding_history_daily"])
+def load_active_symbols():
+    """Symbols with enough non-zero funding activity over the full history."""
+    activity = range_stats(load_daily_rollups())["activity"]
+    return activity[activity >= MIN_ACTIVITY_RATIO].index.tolist()
+
+
+@st.cache_data
+@disk_cached(datasets=["funding_history", "funding_history_daily"])
+def load_range_stats(start_date, end_date):
+    """Per-symbol funding rate stats for active symbols in a date range."""
+    if get_backend().supports_aggregation:
+        rollups = query_rollups("funding_history", None, load_active_symbols(), start_date, end_date)
+    else:
+        rollups = filter_date_range(load_daily_rollups(), start_date, end_date)
+        rollups = rollups[rollups["symbol"].isin(load_active_symbols())]
+    return range_stats(rollups)
+
+
+def _day_end(day):
+    """Last instant of a UTC date, as an inclusive time bound."""
+    return pd.Timestamp(day, tz="UTC") + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+
+
+@st.cache_data
+@disk_cached(datasets=["funding_history", "funding_rates"])
+def load_carry_backtest(symbols, start_date, end_date, fee_bps, rebalance_hours, top_n):
+    """Carry backtest of each symbol and the portfolios, rebased to 100 at the start of the range."""
+    matrix = load_matrix("funding_history", symbols=symbols, start=start_date, end=_day_end(end_date))
+
+    # History has no open interest, so the OI-weighted portfolio uses the latest snapshot's
+    latest = get_latest_rates()
+    open_interest = None
+    if not latest.empty and "open_interest" in latest:
+        open_interest = latest.set_index("symbol")["open_interest"].reindex(matrix.symbols).to_numpy(dtype=float)
+
+    result = run_backtest(
+        matrix, open_interest, fee_bps=fee_bps, rebalance_hours=rebalance_hours, top_n=top_n
+    )
+    return result.index_frame(), result.stats()
+
+
+@st.cache_data
+@disk_cached(datasets=["funding_history", "funding_history_daily"])
+def load_daily_means(symbols, start_date, end_date):
+    """Daily mean funding rate pivoted as symbols x days."""
+    if get_backend().supports_aggregation:
+        return bucket_means(query_rollups("funding_history", "daily", list(symbols), start_date, end_date))
+
+    rollups = filter_date_range(load_daily_rollups(), start_date, end_date)
+    return bucket_means(rollups[rollups["symbol"].isin(symbols)])
+
+
 df = load_history()
 
 if df.empty:
-    st.warning("No history data found. Ensure `data/funding_history.csv` exists.")
+    st.warning("No history data found. Run the history fetcher first: `python run_history.py`")
     st.stop()
 
 # --- Sidebar Filters ---
@@ -61,25 +163,37 @@ else:
     start_date = date_range[0] if isinstance(date_range, (list, tuple)) else date_range
     end_date = max_date
 
+# Zoom: the time series charts are re-queried for this window, so narrowing it shows finer detail
+zoom = st.sidebar.slider(
+    "Zoom Charts",
+    min_value=datetime.combine(start_date, time.min),
+    max_value=datetime.combine(end_date, time.min) + timedelta(days=1),
+    value=(datetime.combine(start_date, time.min), datetime.combine(end_date, time.min) + timedelta(days=1)),
+    step=timedelta(hours=1),
+    format="YYYY-MM-DD HH:mm"
+)
+zoom_start, zoom_end = pd.Timestamp(zoom[0], tz="UTC"), pd.Timestamp(zoom[1], tz="UTC")
+st.sidebar.caption(
+    f"Line charts show up to {CHART_MAX_POINTS:,} points per series (each bucket's min and max); "
+    "narrow the window for full hourly detail."
+)
+
+
+def chart_points(frame, y):
+    """Rows of `frame` inside the zoom window, downsampled to the charts' point budget."""
+    in_window = frame[(frame["timestamp"] >= zoom_start) & (frame["timestamp"] < zoom_end)]
+    return downsample(in_window, y)
+
+
 # Filter to date range FIRST
-df_date_filtered = df[
-    (df["timestamp"].dt.date >= start_date) &
-    (df["timestamp"].dt.date <= end_date)
-]
+df_date_filtered = filter_date_range(df, start_date, end_date)
 
 # Filter out symbols with insufficient funding rate activity (< 50% non-zero)
-active_symbols = []
-for symbol in df["symbol"].unique():
-    sym_data = df[df["symbol"] == symbol]
-    pct_nonzero = (sym_data["funding_rate"] != 0).sum() / len(sym_data)
-    if pct_nonzero >= 0.5:  # At least 50% non-zero rates
-        active_symbols.append(symbol)
-
-# Filter to active symbols only
-df_active = df_date_filtered[df_date_filtered["symbol"].isin(active_symbols)]
-
-# Calculate volatility for SELECTED DATE RANGE
-volatility = df_active.groupby("symbol")["funding_rate"].std().sort_values(ascending=False)
+df_active = df_date_filtered[df_date_filtered["symbol"].isin(load_active_symbols())]
+
+# Mean / std / volatility for SELECTED DATE RANGE, computed in one grouped pass
+range_stats = load_range_stats(start_date, end_date)
+volatility = volatility_ranking(range_stats)
 available_symbols = volatility.index.tolist()
 
 # Create display labels with volatility rank
@@ -109,6 +223,11 @@ selected_labels = st.sidebar.multiselect(
 # Convert labels back to symbols
 selected_symbols = [label_to_symbol[label] for label in selected_labels]
 
+st.sidebar.header("Carry Backtest")
+fee_bps = st.sidebar.number_input("Fees (bps of notional traded)", min_value=0.0, value=float(BACKTEST_FEE_BPS), step=0.5)
+rebalance_hours = int(st.sidebar.number_input("Rebalance every (hours)", min_value=1, value=BACKTEST_REBALANCE_HOURS))
+top_n = int(st.sidebar.number_input("Top-N portfolio size", min_value=1, value=BACKTEST_TOP_N))
+
 # Filter to selected symbols only (date range already applied)
 filtered_df = df_active[df_active["symbol"].isin(selected_symbols)]
 
@@ -118,56 +237,52 @@ if not selected_symbols:
 
 st.caption(f"Showing data from {start_date} to {end_date} · {len(filtered_df):,} rows")
 
+gaps = load_gaps()
+gaps = gaps[
+    gaps["symbol"].isin(selected_symbols) &
+    (gaps["gap_end"] >= pd.Timestamp(start_date, tz="UTC")) &
+    (gaps["gap_start"] < pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1))
+]
+if not gaps.empty:
+    st.caption(
+        f"⚠️ {gaps['missing'].sum():,} missing hourly observations across "
+        f"{gaps['symbol'].nunique()} symbol(s) in this range. "
+        "Run `python run_history.py --fill-gaps` to refetch them."
+    )
+
 # ── 1. Funding Carry Index (Rebased to 100) ──
 st.subheader("Funding Carry Index (Short + Spot Hedge)")
-st.caption("Rebased to 100 at period start. Assumes short position collecting funding, hedged with spot bought off-platform.")
+st.caption(
+    "Rebased to 100 at period start. Assumes short position collecting funding, hedged with spot bought "
+    f"off-platform, paying {fee_bps:g} bps on notional traded. Portfolios rebalance every "
+    f"{rebalance_hours}h; the top-{top_n} portfolio ranks symbols by trailing "
+    f"{BACKTEST_LOOKBACK_HOURS // 24}-day mean funding."
+)
 
 if not filtered_df.empty:
-    index_df = filtered_df.copy()
-
-    # Calculate compounding index per symbol: index[t] = index[t-1] * (1 + funding_rate)
-    index_df = index_df.sort_values(["symbol", "timestamp"])
-    index_df["index"] = index_df.groupby("symbol")["funding_rate"].transform(
-        lambda x: (1 + x).cumprod() * 100
+    index_df, carry_stats = load_carry_backtest(
+        tuple(selected_symbols), start_date, end_date, fee_bps, rebalance_hours, top_n
     )
 
-    # Calculate metrics for each symbol
-    metrics_data = []
-    for symbol in selected_symbols:
-        symbol_data = index_df[index_df["symbol"] == symbol]
-        if not symbol_data.empty:
-            start_idx = 100
-            end_idx = symbol_data["index"].iloc[-1]
-            gross_return = end_idx - 100
-
-            # Annualized return
-            days_in_period = (end_date - start_date).days + 1
-            if days_in_period > 0:
-                annualized_return = (pow(end_idx / 100, 365 / days_in_period) - 1) * 100
-            else:
-                annualized_return = 0
-
-            metrics_data.append({
-                "symbol": symbol,
-                "end_idx": end_idx,
-                "gross_return": gross_return,
-                "annualized_return": annualized_return
-            })
-
     # Display metrics cards
-    if metrics_data:
+    metrics_data = carry_stats.loc[[s for s in selected_symbols if s in carry_stats.index]]
+    metrics_data = metrics_data[metrics_data["hours"] > 0]
+    if not metrics_data.empty:
         cols = st.columns(min(len(metrics_data), 5))
-        for i, metric in enumerate(metrics_data[:5]):
+        for i, (symbol, metric) in enumerate(metrics_data.head(5).iterrows()):
             with cols[i]:
                 st.metric(
-                    label=metric["symbol"],
-                    value=f"{metric['end_idx']:.1f}",
-                    delta=f"{metric['gross_return']:+.1f}% total | {metric['annualized_return']:+.1f}% annual"
+                    label=symbol,
+                    value=f"{metric['final_index']:.1f}",
+                    delta=(
+                        f"{metric['total_return'] * 100:+.1f}% total | "
+                        f"{metric['annualized_return'] * 100:+.1f}% annual"
+                    )
                 )
 
     # Chart
     fig_index = px.line(
-        index_df,
+        chart_points(index_df, "index"),
         x="timestamp",
         y="index",
         color="symbol",
@@ -183,19 +298,33 @@ if not filtered_df.empty:
     fig_index.update_layout(hovermode="x unified")
     st.plotly_chart(fig_index, use_container_width=True)
 
+    portfolio_stats = carry_stats[~carry_stats.index.isin(selected_symbols)]
+    st.dataframe(
+        pd.DataFrame({
+            "Total Return (%)": portfolio_stats["total_return"] * 100,
+            "Annualized (%)": portfolio_stats["annualized_return"] * 100,
+            "Sharpe": portfolio_stats["sharpe"],
+            "Max Drawdown (%)": portfolio_stats["max_drawdown"] * 100,
+            "Turnover (x/yr)": portfolio_stats["turnover"],
+        }).round(2),
+        use_container_width=True
+    )
+
 # ── 2. 7-Day Average Funding Rates ──
 st.subheader("7-Day Average Funding Rates")
 
-# Compute 7d average from the most recent 7 days in filtered data
+# Compute 7d average from the most recent 7 days in filtered data (a view of the cached matrix)
 latest_date = filtered_df["timestamp"].max()
 seven_days_ago = latest_date - pd.Timedelta(days=7)
-recent_df = filtered_df[filtered_df["timestamp"] >= seven_days_ago]
+recent = load_matrix("funding_history", symbols=selected_symbols[:5], start=seven_days_ago, end=latest_date)
+observed = ~np.isnan(recent.values)
+recent_counts = dict(zip(recent.symbols, observed.sum(axis=1)))
+recent_sums = dict(zip(recent.symbols, np.where(observed, recent.values, 0).sum(axis=1, dtype=np.float64)))
 
 cols = st.columns(min(len(selected_symbols), 5))
 for i, symbol in enumerate(selected_symbols[:5]):
-    symbol_recent = recent_df[recent_df["symbol"] == symbol]
-    if not symbol_recent.empty:
-        avg_rate = symbol_recent["funding_rate"].mean()
+    if recent_counts.get(symbol, 0):
+        avg_rate = recent_sums[symbol] / recent_counts[symbol]
         annualized = avg_rate * 24 * 365 * 100
         with cols[i]:
             st.metric(
@@ -208,7 +337,7 @@ for i, symbol in enumerate(selected_symbols[:5]):
 st.subheader("Funding Rates Over Time")
 
 if not filtered_df.empty:
-    chart_df = filtered_df.copy()
+    chart_df = chart_points(filtered_df, "funding_rate").copy()
     chart_df["funding_rate_apr"] = chart_df["funding_rate"] * 24 * 365 * 100
 
     fig_ts = px.line(
@@ -230,16 +359,13 @@ if not filtered_df.empty:
 
 # ── 4. 30-Day Trailing Average ──
 st.subheader("30-Day Trailing Average")
-st.caption("Rolling 30-day mean of hourly funding rates, annualized.")
+st.caption("Rolling 30-day mean of hourly funding rates over the full history, annualized.")
 
 if not filtered_df.empty:
-    avg_df = filtered_df.copy()
-    # 30 days * 24 hours = 720 hourly observations
-    avg_df["trailing_30d_apr"] = (
-        avg_df.groupby("symbol")["funding_rate"]
-        .transform(lambda x: x.rolling(window=720, min_periods=1).mean())
-        * 24 * 365 * 100
-    )
+    avg_df = filter_date_range(load_trailing_means(), start_date, end_date)
+    avg_df = avg_df[avg_df["symbol"].isin(selected_symbols)].copy()
+    avg_df = chart_points(avg_df, "mean_30d").copy()
+    avg_df["trailing_30d_apr"] = avg_df["mean_30d"] * 24 * 365 * 100
 
     fig_avg = px.line(
         avg_df,
@@ -266,12 +392,7 @@ st.caption("Mean funding rate over the selected date range — top 20 and bottom
 ranking_df = df_active
 
 if not ranking_df.empty:
-    mean_rates = (
-        ranking_df.groupby("symbol")["funding_rate"]
-        .mean()
-        .sort_values(ascending=True)
-        * 24 * 365 * 100
-    )
+    mean_rates = range_stats["mean"].sort_values(ascending=True) * 24 * 365 * 100
 
     # Take top 20 and bottom 20
     if len(mean_rates) > 40:
@@ -302,22 +423,14 @@ st.subheader("Daily Funding Rate Heatmap")
 st.caption("Daily average funding rate for selected symbols.")
 
 if not filtered_df.empty:
-    heat_df = filtered_df.copy()
-    heat_df["date"] = heat_df["timestamp"].dt.date
-
-    pivot_df = heat_df.pivot_table(
-        index="symbol",
-        columns="date",
-        values="funding_rate",
-        aggfunc="mean"
-    )
+    pivot_df = load_daily_means(tuple(selected_symbols), start_date, end_date)
 
     if not pivot_df.empty:
         pivot_pct = pivot_df * 24 * 365 * 100
 
         fig_heatmap = go.Figure(data=go.Heatmap(
             z=pivot_pct.values,
-            x=[str(d) for d in pivot_pct.columns],
+            x=[str(d.date()) for d in pivot_pct.columns],
             y=pivot_pct.index.tolist(),
             colorscale="RdYlGn",
             zmid=0,
@@ -337,7 +450,7 @@ st.caption("Mean funding rate vs volatility — selected symbols highlighted")
 
 # Calculate stats for ALL active symbols (already filtered by date range)
 if not df_active.empty:
-    stats_df = df_active.groupby("symbol")["funding_rate"].agg(['mean', 'std']).reset_index()
+    stats_df = range_stats[["mean", "std"]].reset_index()
     stats_df["mean_apr"] = stats_df["mean"] * 24 * 365 * 100
     stats_df["volatility_apr"] = stats_df["std"] * 24 * 365 * 100
     stats_df["selected"] = stats_df["symbol"].isin(selected_symbols)
@@ -384,18 +497,37 @@ if not df_active.empty:
     st.plotly_chart(fig_scatter, use_container_width=True)
 
 # ── 8. Data Table ──
+def display_history_rows(rows):
+    """Displayed columns for a page of raw history rows."""
+    return pd.DataFrame({
+        "Timestamp": rows["timestamp"],
+        "Symbol": rows["symbol"],
+        "Annualized Rate (%)": (rows["funding_rate"] * 24 * 365 * 100).round(2),
+        "Premium (%)": (rows["premium"] * 100).round(6),
+    })
+
+
 with st.expander("📋 Raw Data Table"):
     if not filtered_df.empty:
-        display_df = filtered_df.copy()
-        display_df["funding_rate_apr"] = (display_df["funding_rate"] * 24 * 365 * 100).round(2)
-        display_df["premium_pct"] = (display_df["premium"] * 100).round(6)
-        display_df = display_df[["timestamp", "symbol", "funding_rate_apr", "premium_pct"]]
-        display_df.columns = ["Timestamp", "Symbol", "Annualized Rate (%)", "Premium (%)"]
-
-        st.dataframe(
-            display_df.sort_values("Timestamp", ascending=False),
-            use_container_width=True,
-            hide_index=True
+        # Only the visible page is fetched and rendered; downloads stream the whole selection
+        render_table(
+            TableQuery(
+                "funding_history",
+                ["timestamp", "symbol", "funding_rate", "premium"],
+                symbols=selected_symbols,
+                start=pd.Timestamp(start_date, tz="UTC"),
+                end=_day_end(end_date)
+            ),
+            display=display_history_rows,
+            sort_options={
+                "Timestamp": "timestamp",
+                "Symbol": "symbol",
+                "Annualized Rate": "funding_rate",
+                "Premium": "premium",
+            },
+            file_name=f"funding_history_{start_date}_{end_date}",
+            frame=filtered_df,
+            key="history_table"
         )
     else:
         st.info("No data for selected filters.")
@@ -7,6 +7,7 @@ import os
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from config import COLLECTION_INTERVAL_SECONDS, COLLECTION_JITTER_SECONDS
 from src.scheduler import run_scheduler, collect_funding_rates
 
 
@@ -25,6 +26,18 @@ def main():
         action="store_true",
         help="Also export data to Google Sheets (requires credentials.json)"
     )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=COLLECTION_INTERVAL_SECONDS,
+        help=f"Seconds between collections, aligned to the clock (default: {COLLECTION_INTERVAL_SECONDS:g})"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=COLLECTION_JITTER_SECONDS,
+        help=f"Maximum random delay added to each collection, in seconds (default: {COLLECTION_JITTER_SECONDS:g})"
+    )
 
     args = parser.parse_args()
 
@@ -35,7 +48,7 @@ def main():
     else:
         print("Starting scheduler (press Ctrl+C to stop)...")
         try:
-            run_scheduler(use_sheets=args.sheets)
+            run_scheduler(use_sheets=args.sheets, interval=args.interval, jitter=args.jitter)
         except KeyboardInterrupt:
             print("\nStopping collector...")
 
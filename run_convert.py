@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""One-time converter between storage backends (e.g. CSV -> Parquet)."""
+
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.backends import BACKENDS, DATASET_COLUMNS, get_backend
+
+
+def main():
+    """Copy datasets from one storage backend to another."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert funding data between storage backends")
+    parser.add_argument(
+        "--from",
+        dest="source",
+        choices=sorted(BACKENDS),
+        default="csv",
+        help="Backend to read from (default: csv)"
+    )
+    parser.add_argument(
+        "--to",
+        dest="target",
+        choices=sorted(BACKENDS),
+        default="parquet",
+        help="Backend to write to (default: parquet)"
+    )
+    parser.add_argument(
+        "--datasets",
+        type=str,
+        default=",".join(DATASET_COLUMNS),
+        help="Comma-separated datasets to convert (default: all)"
+    )
+
+    args = parser.parse_args()
+
+    if args.source == args.target:
+        print("Source and target backends are the same; nothing to do.")
+        sys.exit(1)
+
+    source = get_backend(args.source)
+    target = get_backend(args.target)
+
+    for dataset in [d.strip() for d in args.datasets.split(",")]:
+        if not source.exists(dataset):
+            print(f"Skipping {dataset}: not found in {source.name} backend")
+            continue
+
+        started = time.perf_counter()
+        df = source.read(dataset)
+        target.write(dataset, df)
+        elapsed = time.perf_counter() - started
+        print(f"Converted {dataset}: {len(df):,} rows ({source.name} -> {target.name}) in {elapsed:.1f}s")
+
+    print(f"\nSet STORAGE_BACKEND = \"{args.target}\" in config.py to use the converted data.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,17 @@ import sys
 import os
 import logging
 
+import pandas as pd
+
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from src.history_fetcher import fetch_all_funding_history
+from src.history_fetcher import fetch_all_funding_history, fill_history_gaps
+from src.api_client import get_client
+from src.backends import get_backend
+from src.rollups import rebuild_rollups
+from src.rolling import rebuild_rolling
+from src.matrix import rebuild_matrix_cache
 
 
 def main():
@@ -22,6 +29,35 @@ def main():
         default=None,
         help="Comma-separated list of coins to fetch (e.g. BTC,ETH,SOL). Defaults to all."
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch entries newer than the stored history and append them"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Fetch this many coins concurrently under a shared rate limiter (default: 1, serial)"
+    )
+
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Start over instead of resuming an interrupted run"
+    )
+
+    parser.add_argument(
+        "--rebuild-derived",
+        action="store_true",
+        help="Recompute rollups, rolling stats and the matrix cache from the stored history and exit"
+    )
+
+    parser.add_argument(
+        "--fill-gaps",
+        action="store_true",
+        help="Detect missing hours in the stored history and refetch only those ranges"
+    )
 
     args = parser.parse_args()
 
@@ -31,20 +67,51 @@ def main():
         datefmt="%H:%M:%S",
     )
 
+    if args.rebuild_derived:
+        rebuild_rollups("funding_history")
+        rebuild_rolling("funding_history")
+        rebuild_matrix_cache("funding_history")
+        print("Rebuilt funding history rollups, rolling stats and matrix cache.")
+        return
+
+    if args.fill_gaps:
+        df = fill_history_gaps()
+        print(f"\nRecovered {len(df)} missing rows.")
+        return
+
     coins = None
     if args.coins:
         coins = [c.strip().upper() for c in args.coins.split(",")]
         print(f"Fetching history for {len(coins)} coin(s): {', '.join(coins)}")
+    elif args.incremental:
+        print("Refreshing history for all stored coins...")
     else:
         print("Fetching history for ALL coins...")
 
-    df = fetch_all_funding_history(coins=coins)
+    summary = fetch_all_funding_history(
+        coins=coins, incremental=args.incremental, workers=args.workers, restart=args.restart
+    )
+
+    stats = get_client().stats.summary()
+    print(
+        f"API: {stats['requests']} requests ({stats['errors']} failed), "
+        f"{stats['bytes_received'] / 1e6:.1f} MB, mean latency {stats['mean_latency_ms']:.0f} ms"
+    )
+
+    if summary["failed"]:
+        print(f"\n{len(summary['failed'])} coin(s) failed: {', '.join(summary['failed'])}")
+        print("Run the same command again to resume them.")
+        sys.exit(1)
 
-    if not df.empty:
-        symbols = df["symbol"].nunique()
-        print(f"\nDone! {len(df)} total rows across {symbols} symbol(s)")
-        print(f"Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
-        print(f"Saved to: data/funding_history.csv")
+    if summary["rows"]:
+        label = "new" if args.incremental else "fetched"
+        first = pd.Timestamp(summary["first_time"], unit="ms", tz="UTC")
+        last = pd.Timestamp(summary["last_time"], unit="ms", tz="UTC")
+        print(f"\nDone! {summary['rows']} {label} rows across {summary['symbols']} symbol(s)")
+        print(f"Date range: {first} to {last}")
+        print(f"Saved to: funding_history ({get_backend().name} backend)")
+    elif args.incremental:
+        print("\nHistory is already up to date.")
     else:
         print("\nNo data was fetched.")
         sys.exit(1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Entry point for parallel parameter sweeps of the funding carry strategy."""
+
+import sys
+import os
+import time
+import logging
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import BACKTEST_FEE_BPS, BACKTEST_LOOKBACK_HOURS, BACKTEST_REBALANCE_HOURS
+from src.backends import get_backend
+from src.matrix import dense_matrix
+from src.sweep import parameter_grid, run_sweep, write_results
+
+
+def main():
+    """Backtest a grid of carry strategy parameters over the stored funding history."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Funding carry parameter sweep")
+    parser.add_argument(
+        "--entry",
+        type=float,
+        nargs="+",
+        default=[5.0, 10.0, 20.0, 40.0],
+        help="Entry thresholds: trailing mean funding, annualized %% (default: 5 10 20 40)"
+    )
+    parser.add_argument(
+        "--exit",
+        type=float,
+        nargs="+",
+        default=[-5.0, 0.0, 5.0],
+        help="Exit thresholds, annualized %% (default: -5 0 5)"
+    )
+    parser.add_argument(
+        "--lookback",
+        type=int,
+        nargs="+",
+        default=[24, BACKTEST_LOOKBACK_HOURS, 24 * 30],
+        help=f"Trailing windows in hours (default: 24 {BACKTEST_LOOKBACK_HOURS} 720)"
+    )
+    parser.add_argument(
+        "--rebalance",
+        type=int,
+        nargs="+",
+        default=[1, 8, BACKTEST_REBALANCE_HOURS],
+        help=f"Rebalance intervals in hours (default: 1 8 {BACKTEST_REBALANCE_HOURS})"
+    )
+    parser.add_argument(
+        "--fees",
+        type=float,
+        nargs="+",
+        default=[BACKTEST_FEE_BPS],
+        help=f"Fees in bps of notional traded (default: {BACKTEST_FEE_BPS:g})"
+    )
+    parser.add_argument(
+        "--coins",
+        type=str,
+        default=None,
+        help="Comma-separated list of coins to include (e.g. BTC,ETH,SOL). Defaults to all."
+    )
+    parser.add_argument("--start", type=str, default=None, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=str, default=None, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: one per core)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="data/sweeps/sweep.parquet",
+        help="Parquet file to stream results to (default: data/sweeps/sweep.parquet)"
+    )
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+    )
+
+    history = get_backend().read(
+        "funding_history",
+        columns=["timestamp", "symbol", "funding_rate"],
+        symbols=[c.strip().upper() for c in args.coins.split(",")] if args.coins else None,
+        start=pd.Timestamp(args.start, tz="UTC") if args.start else None,
+        end=pd.Timestamp(args.end, tz="UTC") + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1) if args.end else None
+    )
+    if history.empty:
+        print("No history data found. Run the history fetcher first: `python run_history.py`")
+        sys.exit(1)
+
+    matrix = dense_matrix(history)
+    grid = parameter_grid(args.entry, args.exit, args.lookback, args.rebalance, args.fees)
+    if not grid:
+        print("Empty parameter grid: every exit threshold is above every entry threshold.")
+        sys.exit(1)
+
+    workers = args.workers or os.cpu_count() or 1
+    print(
+        f"Sweeping {len(grid):,} parameter sets over {len(matrix.symbols)} symbols x "
+        f"{matrix.values.shape[1]:,} hours with {workers} worker(s)..."
+    )
+
+    started = time.perf_counter()
+    written = write_results(run_sweep(matrix, grid, workers=workers), args.output, total=len(grid))
+    elapsed = time.perf_counter() - started
+
+    print(f"\nDone! {written:,} results in {elapsed:.1f}s ({written / elapsed:.1f} sets/s)")
+    print(f"Saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
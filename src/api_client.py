@@ -0,0 +1,156 @@
+"""Shared Hyperliquid API client with a pooled session and snapshot cache."""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import API_URL, SNAPSHOT_TTL_SECONDS, HISTORY_FETCH_WORKERS
+from src.decode import loads
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Per-request latency and byte counters, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def record(self, latency: float, size: int, ok: bool = True) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.bytes_received += size
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.last_latency = latency
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Snapshot of the counters.
+
+        Returns:
+            Dict with: requests, errors, bytes_received, mean_latency_ms,
+            max_latency_ms, last_latency_ms
+        """
+        with self._lock:
+            mean = self.total_latency / self.requests if self.requests else 0.0
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "bytes_received": self.bytes_received,
+                "mean_latency_ms": mean * 1000,
+                "max_latency_ms": self.max_latency * 1000,
+                "last_latency_ms": self.last_latency * 1000,
+            }
+
+
+class HyperliquidClient:
+    """
+    Client for the Hyperliquid info endpoint.
+
+    All requests go through one keep-alive session, so repeated calls reuse
+    pooled connections instead of paying a TLS handshake each time. The
+    metaAndAssetCtxs snapshot (universe + asset contexts) is cached for
+    `snapshot_ttl` seconds, so callers needing the symbol list, top symbols
+    and current rates within one run share a single request.
+    """
+
+    def __init__(
+        self,
+        api_url: str = API_URL,
+        snapshot_ttl: float = SNAPSHOT_TTL_SECONDS,
+        pool_size: int = HISTORY_FETCH_WORKERS
+    ):
+        self.api_url = api_url
+        self.snapshot_ttl = snapshot_ttl
+        self.stats = RequestStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: Optional[Tuple[list, list, int]] = None
+        self._snapshot_at = 0.0
+
+    def post(self, payload: Dict[str, Any], timeout: float = 30, api_url: Optional[str] = None) -> Any:
+        """
+        POST a request to the info endpoint and decode the JSON response.
+
+        Args:
+            payload: Request body
+            timeout: Seconds to wait for the server
+            api_url: Override the client's endpoint (e.g. for a test server)
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            requests.RequestException: On connection errors or HTTP error statuses
+        """
+        started = time.perf_counter()
+        try:
+            response = self.session.post(api_url or self.api_url, json=payload, timeout=timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            self.stats.record(time.perf_counter() - started, 0, ok=False)
+            raise
+
+        self.stats.record(time.perf_counter() - started, len(response.content))
+        return loads(response.content)
+
+    def meta_and_asset_ctxs(self, max_age: Optional[float] = None) -> Tuple[list, list, int]:
+        """
+        Get the universe and asset contexts, reusing a recent snapshot.
+
+        Args:
+            max_age: Oldest acceptable snapshot in seconds (defaults to the client TTL)
+
+        Returns:
+            Tuple of (universe, asset_ctxs, fetch time in epoch milliseconds)
+        """
+        max_age = self.snapshot_ttl if max_age is None else max_age
+
+        with self._snapshot_lock:
+            if self._snapshot is None or time.monotonic() - self._snapshot_at > max_age:
+                data = self.post({"type": "metaAndAssetCtxs"})
+                fetched_at = time.time_ns() // 1_000_000
+                # data[0] contains universe (metadata), data[1] contains asset contexts
+                self._snapshot = (data[0]["universe"], data[1], fetched_at)
+                self._snapshot_at = time.monotonic()
+            return self._snapshot
+
+    def symbols(self) -> List[str]:
+        """Names of all perpetuals in the current universe."""
+        universe, _, _ = self.meta_and_asset_ctxs()
+        return [asset["name"] for asset in universe]
+
+    def invalidate(self) -> None:
+        """Drop the cached snapshot so the next call refetches it."""
+        with self._snapshot_lock:
+            self._snapshot = None
+
+
+_client: Optional[HyperliquidClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HyperliquidClient:
+    """Get the process-wide API client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HyperliquidClient()
+        return _client
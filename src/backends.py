@@ -0,0 +1,849 @@
+"""Pluggable storage backends for funding rate datasets."""
+
+import os
+import shutil
+import hashlib
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from config import (
+    STORAGE_BACKEND, FUNDING_RATES_FILE, FUNDING_HISTORY_FILE, PARQUET_DIR, SQLITE_FILE, ROLLUPS_DIR,
+    ROLLING_DIR, ROLLING_WINDOWS, DOWNLOAD_BATCH_ROWS,
+)
+
+# Rollup datasets hold one row per symbol per bucket; `timestamp` is the bucket start
+ROLLUP_COLUMNS = [
+    "timestamp", "symbol", "count", "sum", "sum_sq", "min", "max", "nonzero", "first_time", "last_time",
+]
+
+# Rolling stats datasets hold one row per raw observation
+ROLLING_STATS = ("mean", "std", "ewma", "zscore")
+ROLLING_COLUMNS = ["timestamp", "symbol"] + [
+    f"{stat}_{name}" for name in ROLLING_WINDOWS for stat in ROLLING_STATS
+]
+
+# Known datasets and their columns, in storage order
+DATASET_COLUMNS = {
+    "funding_rates": ["timestamp", "symbol", "funding_rate", "mark_price", "day_ntl_vlm", "open_interest"],
+    "funding_history": ["timestamp", "symbol", "funding_rate", "premium"],
+    # A full history backfill is written here, then swapped in for funding_history once complete
+    "funding_history_staging": ["timestamp", "symbol", "funding_rate", "premium"],
+    "funding_rates_daily": ROLLUP_COLUMNS,
+    "funding_rates_weekly": ROLLUP_COLUMNS,
+    "funding_history_daily": ROLLUP_COLUMNS,
+    "funding_history_weekly": ROLLUP_COLUMNS,
+    "funding_rates_rolling": ROLLING_COLUMNS,
+    "funding_history_rolling": ROLLING_COLUMNS,
+}
+
+CSV_FILES = {
+    "funding_rates": FUNDING_RATES_FILE,
+    "funding_history": FUNDING_HISTORY_FILE,
+    "funding_history_staging": os.path.join(os.path.dirname(FUNDING_HISTORY_FILE), "funding_history_staging.csv"),
+    "funding_rates_daily": os.path.join(ROLLUPS_DIR, "funding_rates_daily.csv"),
+    "funding_rates_weekly": os.path.join(ROLLUPS_DIR, "funding_rates_weekly.csv"),
+    "funding_history_daily": os.path.join(ROLLUPS_DIR, "funding_history_daily.csv"),
+    "funding_history_weekly": os.path.join(ROLLUPS_DIR, "funding_history_weekly.csv"),
+    "funding_rates_rolling": os.path.join(ROLLING_DIR, "funding_rates_rolling.csv"),
+    "funding_history_rolling": os.path.join(ROLLING_DIR, "funding_history_rolling.csv"),
+}
+
+# Rows per chunk when filtering CSVs while reading
+CSV_CHUNK_ROWS = 100_000
+
+# Aggregation periods: bucket length in ms, and the offset that aligns weeks to
+# Mondays (the epoch fell on a Thursday)
+DAY_MS = 24 * 3600 * 1000
+PERIOD_BUCKETS = {"daily": (DAY_MS, 0), "weekly": (7 * DAY_MS, 3 * DAY_MS)}
+
+# Columns stored as integers in typed backends (everything else is a float)
+INTEGER_COLUMNS = {"timestamp", "count", "nonzero", "first_time", "last_time"}
+
+
+def to_epoch_ms(timestamps: pd.Series) -> pd.Series:
+    """Convert ISO-8601 strings or datetimes to int64 epoch milliseconds."""
+    parsed = pd.to_datetime(timestamps, format="ISO8601", utc=True)
+    return parsed.dt.as_unit("ms").astype("int64")
+
+
+def from_epoch_ms(values: pd.Series) -> pd.Series:
+    """Convert int64 epoch milliseconds to UTC datetimes."""
+    return pd.to_datetime(values, unit="ms", utc=True)
+
+
+def _to_utc(value) -> Optional[pd.Timestamp]:
+    """Normalize a datetime-like filter bound to a UTC Timestamp."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _empty_frame(dataset: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.DataFrame(columns=columns or DATASET_COLUMNS[dataset])
+
+
+def sort_keys(dataset: str, sort_by: str) -> List[str]:
+    """
+    Sort column followed by symbol and timestamp as tie-breakers, so pages never overlap.
+
+    Raises:
+        ValueError: If `sort_by` is not a column of the dataset
+    """
+    if sort_by not in DATASET_COLUMNS[dataset]:
+        raise ValueError(f"Cannot sort {dataset} by unknown column '{sort_by}'")
+    return [sort_by] + [key for key in ("symbol", "timestamp") if key != sort_by]
+
+
+def sort_rows(df: pd.DataFrame, keys: List[str], ascending: bool) -> pd.DataFrame:
+    """Sort by `keys`, the first in the given direction and the tie-breakers ascending; missing values last."""
+    return df.sort_values(keys, ascending=[ascending] + [True] * (len(keys) - 1), kind="stable")
+
+
+class StorageBackend:
+    """
+    Base class for dataset storage.
+
+    Every backend exchanges DataFrames in the same shape: a UTC datetime
+    `timestamp` column, a string `symbol` column and float value columns.
+    How they are laid out on disk is up to the backend.
+    """
+
+    name = "base"
+
+    # True if aggregate() runs inside the backend instead of on loaded rows
+    supports_aggregation = False
+
+    # True if read_page() and read_batches() sort and slice inside the backend instead of on loaded rows
+    supports_paging = False
+
+    def exists(self, dataset: str) -> bool:
+        raise NotImplementedError
+
+    def version(self, dataset: str) -> str:
+        """
+        Cheap fingerprint of a dataset's on-disk state.
+
+        Changes whenever the dataset is written, so it can key caches of
+        anything derived from it. Built from file mtimes and sizes; no file
+        contents are read.
+        """
+        raise NotImplementedError
+
+    def read(
+        self,
+        dataset: str,
+        columns: Optional[List[str]] = None,
+        symbols: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Read a dataset, optionally restricted to symbols and a time range.
+
+        Args:
+            dataset: Dataset name (see DATASET_COLUMNS)
+            columns: Columns to return (None = all)
+            symbols: Symbols to keep (None = all)
+            start: Inclusive lower time bound
+            end: Inclusive upper time bound
+
+        Returns:
+            DataFrame with the requested rows and columns
+        """
+        raise NotImplementedError
+
+    def append(self, dataset: str, df: pd.DataFrame) -> None:
+        """Append rows to a dataset, creating it if needed."""
+        raise NotImplementedError
+
+    def write(self, dataset: str, df: pd.DataFrame) -> None:
+        """Replace a dataset's contents with the given rows."""
+        raise NotImplementedError
+
+    def upsert(self, dataset: str, df: pd.DataFrame) -> None:
+        """Insert rows, replacing any existing row with the same (symbol, timestamp)."""
+        raise NotImplementedError
+
+    def delete(self, dataset: str) -> None:
+        """Remove a dataset entirely (no-op if it does not exist)."""
+        raise NotImplementedError
+
+    def rename(self, source: str, target: str) -> None:
+        """
+        Replace dataset `target` with the contents of `source`, which no longer exists afterwards.
+
+        Readers see either the old or the new `target`, never a partial one.
+        """
+        raise NotImplementedError
+
+    def aggregate(
+        self,
+        dataset: str,
+        period: Optional[str] = "daily",
+        column: str = "funding_rate",
+        symbols: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Aggregate a raw dataset per symbol and bucket without returning its rows.
+
+        Only backends with `supports_aggregation` implement this; callers fall
+        back to the materialized rollups otherwise.
+
+        Args:
+            dataset: Raw dataset name
+            period: "daily", "weekly", or None for one bucket per symbol
+                spanning the whole selection (timestamp = first observation)
+            column: Value column to aggregate
+            symbols: Symbols to include (None = all)
+            start: Inclusive lower time bound
+            end: Inclusive upper time bound
+
+        Returns:
+            DataFrame with ROLLUP_COLUMNS, sorted by symbol and timestamp
+        """
+        raise NotImplementedError
+
+    def read_page(
+        self,
+        dataset: str,
+        columns: Optional[List[str]] = None,
+        symbols: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        sort_by: str = "timestamp",
+        ascending: bool = False,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        One page of a filtered, sorted dataset, and how many rows match in total.
+
+        Ties on `sort_by` are broken by symbol and timestamp, so consecutive
+        pages neither overlap nor skip rows. This default loads the matching
+        rows and sorts them; backends with `supports_paging` return only the
+        page from storage.
+
+        Args:
+            dataset: Dataset name (see DATASET_COLUMNS)
+            columns: Columns to return (None = all)
+            symbols: Symbols to keep (None = all)
+            start: Inclusive lower time bound
+            end: Inclusive upper time bound
+            sort_by: Column to order by
+            ascending: Sort direction of `sort_by`
+            offset: Rows to skip
+            limit: Maximum rows to return
+
+        Returns:
+            Tuple of (page, total matching rows)
+        """
+        keys = sort_keys(dataset, sort_by)
+        wanted = columns or DATASET_COLUMNS[dataset]
+        df = self.read(dataset, columns=list(dict.fromkeys(wanted + keys)), symbols=symbols, start=start, end=end)
+        order = sort_rows(df[keys], keys, ascending).index[offset:offset + limit]
+        return df.loc[order, wanted].reset_index(drop=True), len(df)
+
+    def read_batches(
+        self,
+        dataset: str,
+        columns: Optional[List[str]] = None,
+        symbols: Optional[List[str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        sort_by: str = "timestamp",
+        ascending: bool = False,
+        batch_rows: int = DOWNLOAD_BATCH_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield a filtered, sorted selection in batches of up to `batch_rows` rows.
+
+        Same arguments and ordering as read_page. Backends with
+        `supports_paging` stream the batches from storage, so the whole
+        selection is never held in memory at once.
+        """
+        keys = sort_keys(dataset, sort_by)
+        wanted = columns or DATASET_COLUMNS[dataset]
+        df = self.read(dataset, columns=list(dict.fromkeys(wanted + keys)), symbols=symbols, start=start, end=end)
+        df = sort_rows(df, keys, ascending)[wanted]
+        for offset in range(0, len(df), batch_rows):
+            yield df.iloc[offset:offset + batch_rows].reset_index(drop=True)
+
+    @staticmethod
+    def _filter(
+        df: pd.DataFrame,
+        symbols: Optional[List[str]],
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> pd.DataFrame:
+        """Apply symbol/time filters to an in-memory frame."""
+        if symbols is not None:
+            df = df[df["symbol"].isin(symbols)]
+        if start is not None:
+            df = df[df["timestamp"] >= _to_utc(start)]
+        if end is not None:
+            df = df[df["timestamp"] <= _to_utc(end)]
+        return df
+
+
+class CsvBackend(StorageBackend):
+    """One CSV file per dataset with ISO-8601 string timestamps."""
+
+    name = "csv"
+
+    def __init__(self, files: Optional[Dict[str, str]] = None):
+        self.files = files or CSV_FILES
+
+    def exists(self, dataset: str) -> bool:
+        return os.path.exists(self.files[dataset])
+
+    def version(self, dataset: str) -> str:
+        path = self.files[dataset]
+        if not os.path.exists(path):
+            return "missing"
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def read(self, dataset, columns=None, symbols=None, start=None, end=None):
+        path = self.files[dataset]
+        if not os.path.exists(path):
+            return _empty_frame(dataset, columns)
+
+        needed = None
+        if columns is not None:
+            needed = list(columns)
+            if symbols is not None:
+                needed.append("symbol")
+            if start is not None or end is not None:
+                needed.append("timestamp")
+            needed = list(dict.fromkeys(needed))
+
+        if symbols is None and start is None and end is None:
+            df = self._parse_timestamps(pd.read_csv(path, usecols=needed))
+            return df[columns] if columns is not None else df
+
+        # Filter chunk by chunk so only matching rows are ever materialized.
+        # Symbols are matched before timestamps are parsed, which is the
+        # expensive step.
+        chunks = []
+        for chunk in pd.read_csv(path, usecols=needed, chunksize=CSV_CHUNK_ROWS):
+            if symbols is not None:
+                chunk = chunk[chunk["symbol"].isin(symbols)]
+            if chunk.empty:
+                continue
+            chunk = self._filter(self._parse_timestamps(chunk), None, start, end)
+            if not chunk.empty:
+                chunks.append(chunk[columns] if columns is not None else chunk)
+
+        if not chunks:
+            return _empty_frame(dataset, columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    @staticmethod
+    def _parse_timestamps(df: pd.DataFrame) -> pd.DataFrame:
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+        return df
+
+    def append(self, dataset, df):
+        path = self.files[dataset]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # Render the rows first, then append them with O_APPEND and fsync, so
+        # the file is never left mid-render; an empty file (not just a missing
+        # one) gets the header
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            header = os.fstat(fd).st_size == 0
+            view = memoryview(self._to_csv_frame(df).to_csv(header=header, index=False).encode())
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def write(self, dataset, df):
+        path = self.files[dataset]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self._to_csv_frame(df).to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete(self, dataset):
+        if os.path.exists(self.files[dataset]):
+            os.remove(self.files[dataset])
+
+    def rename(self, source, target):
+        os.makedirs(os.path.dirname(self.files[target]) or ".", exist_ok=True)
+        os.replace(self.files[source], self.files[target])
+
+    def upsert(self, dataset, df):
+        if df.empty:
+            return
+        df = df.copy()
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+
+        existing = self.read(dataset)
+        if not existing.empty:
+            df = pd.concat([existing, df], ignore_index=True)
+        df = df.drop_duplicates(subset=["symbol", "timestamp"], keep="last")
+        self.write(dataset, df.sort_values(["symbol", "timestamp"]))
+
+    @staticmethod
+    def _to_csv_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Render datetime timestamps back to the ISO-8601 strings the CSVs use."""
+        if "timestamp" in df.columns and pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            df = df.copy()
+            ts = df["timestamp"].dt.tz_convert("UTC")
+            df["timestamp"] = ts.dt.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+        return df
+
+
+class ParquetBackend(StorageBackend):
+    """
+    Parquet dataset partitioned as <dataset>/symbol=<SYM>/month=<YYYY-MM>/.
+
+    Timestamps are stored as int64 epoch milliseconds and values as float64.
+    The symbol lives in the partition path, so filters on symbol and time
+    prune whole directories before any file is opened.
+    """
+
+    name = "parquet"
+    supports_paging = True
+
+    def __init__(self, root: str = PARQUET_DIR):
+        self.root = root
+
+    @staticmethod
+    def _modules():
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("The parquet storage backend requires pyarrow (pip install pyarrow)") from e
+        return pa, ds, pq
+
+    def _dataset_dir(self, dataset: str) -> str:
+        return os.path.join(self.root, dataset)
+
+    def exists(self, dataset: str) -> bool:
+        return os.path.isdir(self._dataset_dir(dataset))
+
+    def version(self, dataset: str) -> str:
+        root = self._dataset_dir(dataset)
+        if not os.path.isdir(root):
+            return "missing"
+        digest = hashlib.sha1()
+        for directory, subdirs, files in os.walk(root):
+            subdirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(directory, name))
+                digest.update(f"{os.path.relpath(directory, root)}/{name}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+        return digest.hexdigest()
+
+    def _partitioning(self):
+        pa, ds, _ = self._modules()
+        return ds.partitioning(
+            pa.schema([("symbol", pa.string()), ("month", pa.string())]),
+            flavor="hive"
+        )
+
+    def _scan(self, dataset, columns=None, symbols=None, start=None, end=None):
+        """Arrow table of the matching rows, with pruned partitions and pushed-down filters."""
+        _, ds, _ = self._modules()
+        data = ds.dataset(self._dataset_dir(dataset), format="parquet", partitioning=self._partitioning())
+
+        predicate = None
+
+        def _and(expr):
+            return expr if predicate is None else predicate & expr
+
+        if symbols is not None:
+            predicate = _and(ds.field("symbol").isin(list(symbols)))
+        if start is not None:
+            start = _to_utc(start)
+            predicate = _and(ds.field("month") >= start.strftime("%Y-%m"))
+            predicate = _and(ds.field("timestamp") >= int(start.value // 10**6))
+        if end is not None:
+            end = _to_utc(end)
+            predicate = _and(ds.field("month") <= end.strftime("%Y-%m"))
+            predicate = _and(ds.field("timestamp") <= int(end.value // 10**6))
+
+        wanted = [c for c in (columns or DATASET_COLUMNS[dataset]) if c in data.schema.names]
+        return data.to_table(columns=wanted, filter=predicate)
+
+    @staticmethod
+    def _to_frame(table) -> pd.DataFrame:
+        df = table.to_pandas()
+        if "timestamp" in df.columns:
+            df["timestamp"] = from_epoch_ms(df["timestamp"])
+        if "symbol" in df.columns:
+            df["symbol"] = df["symbol"].astype(str)
+        return df
+
+    def read(self, dataset, columns=None, symbols=None, start=None, end=None):
+        if not self.exists(dataset):
+            return _empty_frame(dataset, columns)
+        return self._to_frame(self._scan(dataset, columns, symbols, start, end))
+
+    def _sorted(self, dataset, columns, symbols, start, end, sort_by, ascending):
+        """Matching rows sorted in Arrow (nulls last), so only what is returned is converted to pandas."""
+        keys = sort_keys(dataset, sort_by)
+        wanted = columns or DATASET_COLUMNS[dataset]
+        table = self._scan(dataset, list(dict.fromkeys(wanted + keys)), symbols, start, end)
+        order = [(key, "ascending" if ascending or i else "descending") for i, key in enumerate(keys)]
+        return table.sort_by(order).select(wanted)
+
+    def read_page(self, dataset, columns=None, symbols=None, start=None, end=None,
+                  sort_by="timestamp", ascending=False, offset=0, limit=100):
+        if not self.exists(dataset):
+            return _empty_frame(dataset, columns), 0
+        table = self._sorted(dataset, columns, symbols, start, end, sort_by, ascending)
+        return self._to_frame(table.slice(offset, limit)), table.num_rows
+
+    def read_batches(self, dataset, columns=None, symbols=None, start=None, end=None,
+                     sort_by="timestamp", ascending=False, batch_rows=DOWNLOAD_BATCH_ROWS):
+        if not self.exists(dataset):
+            return
+        pa, _, _ = self._modules()
+        table = self._sorted(dataset, columns, symbols, start, end, sort_by, ascending)
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            yield self._to_frame(pa.Table.from_batches([batch]))
+
+    def _partitions(self, df: pd.DataFrame):
+        """Yield (symbol, month, rows) for each partition touched by df."""
+        df = df.copy()
+        df["timestamp"] = to_epoch_ms(df["timestamp"])
+        months = from_epoch_ms(df["timestamp"]).dt.strftime("%Y-%m").values
+        for (symbol, month), rows in df.groupby([df["symbol"].values, months], sort=False):
+            yield symbol, month, rows.drop(columns=["symbol"])
+
+    def _write_partition(
+        self,
+        root: str,
+        symbol: str,
+        month: str,
+        rows: pd.DataFrame,
+        replace_existing: bool = False
+    ) -> None:
+        """
+        Write one partition file atomically, merging with any existing file.
+
+        With replace_existing, stored rows with the same timestamp as a new row
+        are dropped in favour of the new one.
+        """
+        pa, _, pq = self._modules()
+        directory = os.path.join(root, f"symbol={symbol}", f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "data.parquet")
+
+        table = pa.Table.from_pandas(rows.reset_index(drop=True), preserve_index=False)
+        if os.path.exists(path):
+            table = pa.concat_tables([pq.read_table(path), table], promote_options="default")
+            if replace_existing:
+                merged = table.to_pandas().drop_duplicates(subset=["timestamp"], keep="last")
+                table = pa.Table.from_pandas(merged, preserve_index=False)
+        table = table.sort_by("timestamp")
+
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def append(self, dataset, df):
+        if df.empty:
+            return
+        root = self._dataset_dir(dataset)
+        for symbol, month, rows in self._partitions(df):
+            self._write_partition(root, symbol, month, rows)
+
+    def upsert(self, dataset, df):
+        if df.empty:
+            return
+        root = self._dataset_dir(dataset)
+        for symbol, month, rows in self._partitions(df):
+            self._write_partition(root, symbol, month, rows, replace_existing=True)
+
+    def write(self, dataset, df):
+        root = self._dataset_dir(dataset)
+        staging = f"{root}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(staging, exist_ok=True)
+        for symbol, month, rows in self._partitions(df):
+            self._write_partition(staging, symbol, month, rows)
+
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+        os.replace(staging, root)
+
+    def delete(self, dataset):
+        root = self._dataset_dir(dataset)
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+
+    def rename(self, source, target):
+        # Directories cannot be replaced in one step: move the old one aside
+        # first, so the target is missing only between two renames
+        root = self._dataset_dir(target)
+        retired = f"{root}.{uuid.uuid4().hex}.old"
+        if os.path.isdir(root):
+            os.replace(root, retired)
+        os.replace(self._dataset_dir(source), root)
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Single-file SQLite database with one table per dataset.
+
+    Each table is clustered on its (symbol, timestamp) primary key
+    (WITHOUT ROWID), so symbol and time filters are index range scans rather
+    than full scans, and writes on an existing key replace the stored row.
+    Timestamps are int64 epoch milliseconds. Aggregations run as SQL, so
+    callers can fetch per-bucket stats instead of raw rows. Uses only the
+    sqlite3 module from the standard library and works entirely offline.
+    """
+
+    name = "sqlite"
+    supports_aggregation = True
+    supports_paging = True
+
+    def __init__(self, path: str = SQLITE_FILE):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections must not be shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            # WAL lets dashboards read while the collector writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS _versions (dataset TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, dataset: str) -> Iterator[sqlite3.Connection]:
+        """Run writes in one transaction that also bumps the dataset's version."""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO _versions VALUES (?, 1) ON CONFLICT(dataset) DO UPDATE SET version = version + 1",
+                (dataset,)
+            )
+            yield conn
+
+    @staticmethod
+    def _columns(dataset: str) -> List[str]:
+        return DATASET_COLUMNS[dataset]
+
+    def _create(self, conn: sqlite3.Connection, dataset: str) -> None:
+        definitions = [
+            f'"{column}" {"INTEGER" if column in INTEGER_COLUMNS else "REAL"}'
+            if column != "symbol" else '"symbol" TEXT NOT NULL'
+            for column in self._columns(dataset)
+        ]
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{dataset}" ({", ".join(definitions)}, '
+            f"PRIMARY KEY (symbol, timestamp)) WITHOUT ROWID"
+        )
+
+    def exists(self, dataset: str) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        row = self._connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (dataset,)
+        ).fetchone()
+        return row is not None
+
+    def version(self, dataset: str) -> str:
+        if not self.exists(dataset):
+            return "missing"
+        row = self._connection().execute("SELECT version FROM _versions WHERE dataset = ?", (dataset,)).fetchone()
+        return f"{os.path.abspath(self.path)}:{row[0] if row else 0}"
+
+    @staticmethod
+    def _where(
+        symbols: Optional[List[str]],
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Tuple[str, list]:
+        """SQL WHERE clause and parameters for symbol/time filters."""
+        clauses, params = [], []
+        if symbols is not None:
+            symbols = list(symbols)
+            clauses.append(f"symbol IN ({', '.join('?' * len(symbols))})" if symbols else "0")
+            params.extend(symbols)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(int(_to_utc(start).value // 10**6))
+        if end is not None:
+            clauses.append("timestamp <= ?")
+            params.append(int(_to_utc(end).value // 10**6))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    @staticmethod
+    def _from_rows(df: pd.DataFrame) -> pd.DataFrame:
+        if "timestamp" in df.columns:
+            df["timestamp"] = from_epoch_ms(df["timestamp"])
+        if "symbol" in df.columns:
+            df["symbol"] = df["symbol"].astype(str)
+        return df
+
+    def read(self, dataset, columns=None, symbols=None, start=None, end=None):
+        if not self.exists(dataset):
+            return _empty_frame(dataset, columns)
+
+        wanted = columns or self._columns(dataset)
+        where, params = self._where(symbols, start, end)
+        select = ", ".join(f'"{column}"' for column in wanted)
+        df = pd.read_sql_query(f'SELECT {select} FROM "{dataset}"{where}', self._connection(), params=params)
+        return self._from_rows(df)
+
+    def _ordered_select(self, dataset, columns, symbols, start, end, sort_by, ascending) -> Tuple[str, list]:
+        """SELECT of the matching rows in page order, and its parameters."""
+        keys = sort_keys(dataset, sort_by)
+        order = ", ".join(
+            f'"{key}" {"ASC" if ascending or i else "DESC"} NULLS LAST' for i, key in enumerate(keys)
+        )
+        select = ", ".join(f'"{column}"' for column in columns or self._columns(dataset))
+        where, params = self._where(symbols, start, end)
+        return f'SELECT {select} FROM "{dataset}"{where} ORDER BY {order}', params
+
+    def read_page(self, dataset, columns=None, symbols=None, start=None, end=None,
+                  sort_by="timestamp", ascending=False, offset=0, limit=100):
+        if not self.exists(dataset):
+            return _empty_frame(dataset, columns), 0
+
+        where, params = self._where(symbols, start, end)
+        total = self._connection().execute(f'SELECT COUNT(*) FROM "{dataset}"{where}', params).fetchone()[0]
+        query, params = self._ordered_select(dataset, columns, symbols, start, end, sort_by, ascending)
+        df = pd.read_sql_query(f"{query} LIMIT ? OFFSET ?", self._connection(), params=params + [limit, offset])
+        return self._from_rows(df), total
+
+    def read_batches(self, dataset, columns=None, symbols=None, start=None, end=None,
+                     sort_by="timestamp", ascending=False, batch_rows=DOWNLOAD_BATCH_ROWS):
+        if not self.exists(dataset):
+            return
+        query, params = self._ordered_select(dataset, columns, symbols, start, end, sort_by, ascending)
+        cursor = self._connection().execute(query, params)
+        names = [description[0] for description in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            yield self._from_rows(pd.DataFrame.from_records(rows, columns=names))
+
+    def _rows(self, dataset: str, df: pd.DataFrame) -> Tuple[List[str], list]:
+        """Column names and row tuples to insert, with timestamps as epoch ms."""
+        columns = [column for column in self._columns(dataset) if column in df.columns]
+        out = df[columns].copy()
+        out["timestamp"] = to_epoch_ms(out["timestamp"])
+        # NaN becomes NULL so it round-trips as NaN
+        out = out.astype(object).where(out.notna(), None)
+        return columns, list(out.itertuples(index=False, name=None))
+
+    def _insert(self, conn: sqlite3.Connection, dataset: str, df: pd.DataFrame) -> None:
+        columns, rows = self._rows(dataset, df)
+        names = ", ".join(f'"{column}"' for column in columns)
+        updates = ", ".join(
+            f'"{column}" = excluded."{column}"' for column in columns if column not in ("symbol", "timestamp")
+        )
+        conn.executemany(
+            f'INSERT INTO "{dataset}" ({names}) VALUES ({", ".join("?" * len(columns))}) '
+            f"ON CONFLICT(symbol, timestamp) DO UPDATE SET {updates}",
+            rows
+        )
+
+    def append(self, dataset, df):
+        # The primary key makes append and upsert the same operation: a
+        # repeated (symbol, timestamp) replaces the stored row
+        self.upsert(dataset, df)
+
+    def upsert(self, dataset, df):
+        if df.empty:
+            return
+        with self._transaction(dataset) as conn:
+            self._create(conn, dataset)
+            self._insert(conn, dataset, df)
+
+    def write(self, dataset, df):
+        with self._transaction(dataset) as conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{dataset}"')
+            self._create(conn, dataset)
+            if not df.empty:
+                self._insert(conn, dataset, df)
+
+    def delete(self, dataset):
+        if not self.exists(dataset):
+            return
+        with self._transaction(dataset) as conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{dataset}"')
+
+    def rename(self, source, target):
+        with self._transaction(target) as conn:
+            conn.execute(f'DROP TABLE IF EXISTS "{target}"')
+            conn.execute(f'ALTER TABLE "{source}" RENAME TO "{target}"')
+
+    def aggregate(self, dataset, period="daily", column="funding_rate", symbols=None, start=None, end=None):
+        if not self.exists(dataset):
+            return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+        if period is None:
+            bucket = "MIN(timestamp)"
+            group = "symbol"
+        else:
+            size, offset = PERIOD_BUCKETS[period]
+            bucket = f"timestamp - ((timestamp + {offset}) % {size})"
+            group = "symbol, 2"
+
+        value = f'"{column}"'
+        where, params = self._where(symbols, start, end)
+        query = (
+            f"SELECT symbol, {bucket} AS timestamp, COUNT(*) AS count, "
+            f"TOTAL({value}) AS sum, TOTAL({value} * {value}) AS sum_sq, "
+            f"MIN({value}) AS min, MAX({value}) AS max, TOTAL({value} != 0) AS nonzero, "
+            f"MIN(timestamp) AS first_time, MAX(timestamp) AS last_time "
+            f'FROM "{dataset}"{where} GROUP BY {group} ORDER BY symbol, timestamp'
+        )
+        df = pd.read_sql_query(query, self._connection(), params=params)
+        df["nonzero"] = df["nonzero"].astype("int64")
+        return self._from_rows(df)[ROLLUP_COLUMNS]
+
+
+BACKENDS = {
+    CsvBackend.name: CsvBackend,
+    ParquetBackend.name: ParquetBackend,
+    SqliteBackend.name: SqliteBackend,
+}
+
+_instances: Dict[str, StorageBackend] = {}
+
+
+def get_backend(name: Optional[str] = None) -> StorageBackend:
+    """
+    Get the storage backend by name (defaults to STORAGE_BACKEND in config).
+
+    Returns:
+        Shared backend instance
+    """
+    name = name or STORAGE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name} (choose from {', '.join(BACKENDS)})")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
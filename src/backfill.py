@@ -0,0 +1,256 @@
+"""Streaming, resumable funding history backfill."""
+
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import API_URL, BACKFILL_MANIFEST_FILE, BACKFILL_QUEUE_PAGES
+from src.backends import get_backend
+from src.batch import FundingBatch
+from src.concurrent_fetcher import default_rate_limiter, _fetch_page_with_retry
+from src.fileutil import write_json_atomic, read_json
+from src.history_fetcher import PAGE_SIZE, get_all_symbols, load_high_water_marks
+from src.rate_limiter import TokenBucket
+from src.rollups import update_rollups, rebuild_rollups
+from src.rolling import update_rolling, rebuild_rolling
+from src.matrix import update_matrix_cache, rebuild_matrix_cache
+
+logger = logging.getLogger(__name__)
+
+# Full runs write here and replace funding_history only once every coin has finished
+STAGING_DATASET = "funding_history_staging"
+
+
+class PageResult(NamedTuple):
+    """One unit of work passed from a fetch worker to the writer."""
+    coin: str
+    batch: Optional[FundingBatch]  # None once the coin is finished (or failed)
+    next_start: int
+    error: Optional[Exception] = None
+
+
+def _produce_coin(
+    coin: str,
+    start_time: int,
+    limiter: TokenBucket,
+    api_url: str,
+    pages: "queue.Queue[PageResult]",
+    stop: threading.Event
+) -> None:
+    """
+    Page through one coin's history, handing each parsed page to the writer.
+
+    Blocks on the bounded queue when the writer falls behind, so at most
+    BACKFILL_QUEUE_PAGES pages (plus one per worker) are held in memory.
+    """
+    try:
+        while not stop.is_set():
+            data = _fetch_page_with_retry(coin, start_time, limiter, api_url)
+            if not data:
+                break
+
+            start_time = data[-1]["time"] + 1
+            pages.put(PageResult(coin, FundingBatch.from_history_page(data), start_time))
+
+            if len(data) < PAGE_SIZE:
+                break
+
+        pages.put(PageResult(coin, None, start_time))
+    except Exception as e:
+        pages.put(PageResult(coin, None, start_time, e))
+
+
+def new_manifest(start_times: Dict[str, int], incremental: bool) -> Dict[str, Any]:
+    """Create the checkpoint manifest for a fresh run."""
+    return {
+        "incremental": incremental,
+        "dataset": "funding_history" if incremental else STAGING_DATASET,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "complete": False,
+        "coins": {
+            coin: {"next_start": start, "rows": 0, "done": False, "error": None}
+            for coin, start in start_times.items()
+        },
+    }
+
+
+def load_manifest(path: str = BACKFILL_MANIFEST_FILE) -> Optional[Dict[str, Any]]:
+    """Read the checkpoint manifest of the last run, if any."""
+    return read_json(path)
+
+
+def _resumable(manifest: Optional[Dict[str, Any]], coins: Optional[List[str]], incremental: bool) -> bool:
+    """True if `manifest` is an unfinished run matching the requested coins and mode."""
+    if manifest is None or manifest.get("complete") or manifest.get("incremental") != incremental:
+        return False
+    return coins is None or sorted(coins) == sorted(manifest["coins"])
+
+
+def stream_pages(
+    manifest: Dict[str, Any],
+    workers: int = 1,
+    limiter: Optional[TokenBucket] = None,
+    api_url: str = API_URL,
+    manifest_path: str = BACKFILL_MANIFEST_FILE
+) -> Dict[str, Any]:
+    """
+    Fetch every unfinished coin in `manifest` and append pages as they arrive.
+
+    Workers fetch coins in parallel and push parsed pages onto a bounded
+    queue; this thread appends each page to the run's dataset (the history
+    itself, or its staging copy in full runs) and then advances the coin's
+    checkpoint in the manifest. In incremental runs each page is also folded
+    into the rollups, rolling stats and matrix cache.
+
+    Returns:
+        Dict with: rows, symbols, first_time, last_time (epoch ms, or None)
+    """
+    limiter = limiter or default_rate_limiter()
+    backend = get_backend()
+    incremental = manifest["incremental"]
+    dataset = manifest.get("dataset", "funding_history")
+    pending = {coin: state["next_start"] for coin, state in manifest["coins"].items() if not state["done"]}
+
+    pages: "queue.Queue[PageResult]" = queue.Queue(maxsize=BACKFILL_QUEUE_PAGES)
+    stop = threading.Event()
+    summary = {"rows": 0, "symbols": set(), "first_time": None, "last_time": None}
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = [
+            pool.submit(_produce_coin, coin, start_time, limiter, api_url, pages, stop)
+            for coin, start_time in pending.items()
+        ]
+
+        try:
+            remaining = len(pending)
+            while remaining:
+                result = pages.get()
+                state = manifest["coins"][result.coin]
+
+                if result.batch is None:
+                    remaining -= 1
+                    if result.error is not None:
+                        state["error"] = str(result.error)
+                        logger.error(f"Failed to fetch {result.coin}: {result.error}")
+                    else:
+                        state["done"], state["error"] = True, None
+                        logger.info(f"Finished {result.coin} ({state['rows']} rows)")
+                    write_json_atomic(manifest_path, manifest)
+                    continue
+
+                df = result.batch.to_frame()
+                backend.append(dataset, df)
+                if incremental:
+                    update_rollups("funding_history", df)
+                    update_rolling("funding_history", df)
+                    update_matrix_cache("funding_history", df)
+
+                state["next_start"] = result.next_start
+                state["rows"] += len(df)
+                write_json_atomic(manifest_path, manifest)
+
+                summary["rows"] += len(df)
+                summary["symbols"].add(result.coin)
+                first, last = int(result.batch.time.min()), int(result.batch.time.max())
+                summary["first_time"] = first if summary["first_time"] is None else min(summary["first_time"], first)
+                summary["last_time"] = last if summary["last_time"] is None else max(summary["last_time"], last)
+        finally:
+            # On error, release workers blocked on a full queue so the pool can shut down
+            stop.set()
+            while not all(future.done() for future in futures):
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    summary["symbols"] = len(summary["symbols"])
+    return summary
+
+
+def backfill_history(
+    coins: Optional[List[str]] = None,
+    incremental: bool = False,
+    workers: int = 1,
+    restart: bool = False,
+    manifest_path: str = BACKFILL_MANIFEST_FILE
+) -> Dict[str, Any]:
+    """
+    Fetch funding history and stream it to storage, resuming an interrupted run.
+
+    A full run refetches every coin from the beginning into a staging
+    dataset, which replaces the stored history (and its rollups, rolling
+    stats and matrix cache are rebuilt) only once every coin has finished, so
+    a failed or interrupted run leaves the stored history untouched. An
+    incremental run appends to the history after each coin's stored
+    high-water mark. Progress is checkpointed per page, so if a run with the
+    same coins and mode was interrupted it picks up where it stopped (unless
+    `restart` is set). Memory use is bounded by the page queue, not by the
+    size of the history.
+
+    Args:
+        coins: Symbols to fetch. If None, all listed symbols (plus, in
+            incremental mode, every symbol already stored).
+        incremental: If True, only fetch and append rows after the stored history.
+        workers: Number of coins fetched concurrently under the shared rate limiter.
+        restart: Ignore an unfinished manifest and start over.
+        manifest_path: Checkpoint manifest location
+
+    Returns:
+        Dict with: rows and symbols written by this run, first_time and
+        last_time (epoch ms, or None), failed (coins to retry by re-running)
+    """
+    backend = get_backend()
+    manifest = load_manifest(manifest_path)
+
+    if not restart and _resumable(manifest, coins, incremental):
+        done = sum(state["done"] for state in manifest["coins"].values())
+        logger.info(f"Resuming backfill started {manifest['started_at']} ({done}/{len(manifest['coins'])} coins done)")
+        # Stored data is authoritative: skip anything appended after the last checkpoint
+        high_water_marks = load_high_water_marks(manifest.get("dataset", "funding_history"))
+        for coin, state in manifest["coins"].items():
+            state["next_start"] = max(state["next_start"], high_water_marks.get(coin, -1) + 1)
+    else:
+        high_water_marks = load_high_water_marks() if incremental else {}
+
+        if coins is None:
+            logger.info("Fetching symbol list from Hyperliquid...")
+            coins = get_all_symbols()
+            logger.info(f"Found {len(coins)} symbols")
+
+            if incremental:
+                # Keep refreshing delisted symbols already stored; newly listed ones start from 0
+                listed = set(coins)
+                coins = sorted(listed | set(high_water_marks))
+                new_symbols = len(listed - set(high_water_marks))
+                logger.info(f"Refreshing {len(coins)} symbols ({new_symbols} not stored yet)")
+
+        if not incremental:
+            # Leftovers of an abandoned full run
+            backend.delete(STAGING_DATASET)
+
+        manifest = new_manifest({coin: high_water_marks.get(coin, -1) + 1 for coin in coins}, incremental)
+        write_json_atomic(manifest_path, manifest)
+
+    summary = stream_pages(manifest, workers=workers, manifest_path=manifest_path)
+
+    failed = [coin for coin, state in manifest["coins"].items() if not state["done"]]
+    summary["failed"] = failed
+    if failed:
+        logger.warning(f"{len(failed)} coin(s) failed: {', '.join(failed)}. Re-run to resume them.")
+        return summary
+
+    if not incremental:
+        # Missing if nothing was fetched, or if it was already swapped in before an interruption
+        if manifest.get("dataset") == STAGING_DATASET and backend.exists(STAGING_DATASET):
+            backend.rename(STAGING_DATASET, "funding_history")
+        rebuild_rollups("funding_history")
+        rebuild_rolling("funding_history")
+        rebuild_matrix_cache("funding_history")
+
+    manifest["complete"] = True
+    write_json_atomic(manifest_path, manifest)
+    logger.info(f"Backfill complete: {summary['rows']} rows ({backend.name})")
+    return summary
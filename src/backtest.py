@@ -0,0 +1,321 @@
+"""Vectorized funding carry backtests over a dense symbols x hours matrix."""
+
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config import BACKTEST_FEE_BPS, BACKTEST_REBALANCE_HOURS, BACKTEST_TOP_N, BACKTEST_LOOKBACK_HOURS
+from src.matrix import FundingMatrix, HOUR_MS
+
+HOURS_PER_YEAR = 24 * 365
+
+
+class BacktestResult(NamedTuple):
+    """
+    Hourly series for every symbol and portfolio, one row per series.
+
+    A series is short the perp and long spot, so each hour it earns the
+    funding rate on its notional, minus fees on the notional it trades.
+    """
+    names: List[str]
+    start_ms: int
+    returns: np.ndarray   # Net hourly carry (0 when nothing is held)
+    index: np.ndarray     # 100 * cumulative product of (1 + returns)
+    drawdown: np.ndarray  # index / running peak - 1
+    turnover: np.ndarray  # Notional traded each hour (sum of |weight change|)
+    observed: np.ndarray  # True where the series held a position with an observed rate
+
+    @property
+    def hours(self) -> pd.DatetimeIndex:
+        """Start of each column's hour (UTC)."""
+        return FundingMatrix(self.returns, self.names, self.start_ms).hours
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Summary statistics for every series, computed over its observed hours.
+
+        Returns:
+            DataFrame indexed by series name with: final_index, total_return,
+            annualized_return, sharpe (annualized), max_drawdown, turnover
+            (notional traded per year) and hours
+        """
+        hours = self.observed.sum(axis=1)
+        held = np.where(self.observed, self.returns, 0.0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = held.sum(axis=1) / hours
+            deviations = np.where(self.observed, self.returns - mean[:, None], 0.0)
+            std = np.sqrt((deviations ** 2).sum(axis=1) / (hours - 1))
+            sharpe = np.where(std > 0, mean / std * np.sqrt(HOURS_PER_YEAR), np.nan)
+            years = hours / HOURS_PER_YEAR
+            final = self.index[:, -1] if self.index.shape[1] else np.full(len(self.names), 100.0)
+            annualized = (final / 100) ** (1 / years) - 1
+            turnover = self.turnover.sum(axis=1) / years
+
+        return pd.DataFrame({
+            "final_index": final,
+            "total_return": final / 100 - 1,
+            "annualized_return": np.where(hours > 0, annualized, np.nan),
+            "sharpe": sharpe,
+            "max_drawdown": self.drawdown.min(axis=1, initial=0.0),
+            "turnover": np.where(hours > 0, turnover, np.nan),
+            "hours": hours,
+        }, index=pd.Index(self.names, name="series"))
+
+    def index_frame(self, names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Long-format carry index (timestamp, symbol, index) at observed hours only.
+
+        Args:
+            names: Series to include (defaults to all)
+        """
+        rows = np.arange(len(self.names)) if names is None else [self.names.index(n) for n in names]
+        observed = self.observed[rows]
+        series, hour = np.nonzero(observed)
+        times = self.start_ms + hour.astype(np.int64) * HOUR_MS
+        return pd.DataFrame({
+            "timestamp": pd.DatetimeIndex(times, dtype=pd.DatetimeTZDtype("ms", "UTC")),
+            "symbol": np.asarray(self.names, dtype=object)[np.asarray(rows)[series]],
+            "index": self.index[rows][observed],
+        })
+
+
+def equal_weights(available: np.ndarray) -> np.ndarray:
+    """Equal weight across the symbols with an observation in each hour."""
+    counts = available.sum(axis=0)
+    return np.divide(available, counts, out=np.zeros(available.shape), where=counts > 0)
+
+
+def oi_weights(available: np.ndarray, open_interest: np.ndarray) -> np.ndarray:
+    """
+    Weights proportional to open interest across the available symbols.
+
+    Args:
+        available: Boolean symbols x hours availability
+        open_interest: Per-symbol open interest, either static (symbols,) or
+            per hour (symbols x hours); NaN counts as zero
+    """
+    oi = np.nan_to_num(np.asarray(open_interest, dtype=np.float64))
+    if oi.ndim == 1:
+        oi = oi[:, None]
+    raw = np.where(available, np.clip(oi, 0, None), 0.0)
+    totals = raw.sum(axis=0)
+    return np.divide(raw, totals, out=np.zeros(raw.shape), where=totals > 0)
+
+
+def trailing_mean(rates: np.ndarray, available: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    Mean observed funding over the trailing window [h - lookback, h) for each hour h.
+
+    The window excludes hour h itself, so anything decided from it cannot
+    depend on the rate it is about to earn. Hours with no observation in
+    their window are NaN.
+    """
+    n_symbols, n_hours = rates.shape
+
+    # Prefix sums: window [a, b) is prefix[:, b] - prefix[:, a]
+    sums = np.zeros((n_symbols, n_hours + 1))
+    counts = np.zeros((n_symbols, n_hours + 1))
+    np.cumsum(np.where(available, rates, 0.0), axis=1, out=sums[:, 1:])
+    np.cumsum(available, axis=1, out=counts[:, 1:])
+
+    end = np.arange(n_hours)
+    begin = np.maximum(end - lookback, 0)
+    window_counts = counts[:, end] - counts[:, begin]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(window_counts > 0, (sums[:, end] - sums[:, begin]) / window_counts, np.nan)
+
+
+def top_n_weights(rates: np.ndarray, available: np.ndarray, n: int, lookback: int) -> np.ndarray:
+    """Equal weight in the `n` symbols with the highest trailing mean funding."""
+    n_symbols, n_hours = rates.shape
+    if n_hours == 0 or n <= 0:
+        return np.zeros(rates.shape)
+
+    score = trailing_mean(rates, available, lookback)
+    score = np.where(available & ~np.isnan(score), score, -np.inf)
+
+    end = np.arange(n_hours)
+    top = np.argsort(-score, axis=0, kind="stable")[:min(n, n_symbols)]
+    chosen = np.zeros(rates.shape, dtype=bool)
+    chosen[top, end] = True
+    chosen &= np.isfinite(score)
+    return equal_weights(chosen)
+
+
+def threshold_weights(
+    score: np.ndarray,
+    available: np.ndarray,
+    entry: float,
+    exit: float
+) -> np.ndarray:
+    """
+    Equal weight in the symbols whose carry position is open.
+
+    A position opens when the score (e.g. trailing mean funding) rises above
+    `entry` and stays open until it falls below `exit`; in between, the
+    previous state holds. With exit < entry this is a hysteresis band that
+    stops positions flapping around a single threshold.
+    """
+    # +1 = open, -1 = close, 0 = keep the last state: forward-fill the last non-zero signal
+    signal = np.where(score > entry, 1, np.where(score < exit, -1, 0))
+    hour = np.arange(signal.shape[1])
+    last = np.maximum.accumulate(np.where(signal != 0, hour, -1), axis=1)
+    state = np.take_along_axis(signal, np.maximum(last, 0), axis=1)
+    return equal_weights((state > 0) & (last >= 0) & available)
+
+
+def _hold(weights: np.ndarray, every: int) -> np.ndarray:
+    """Keep the weights set at each rebalance hour until the next one."""
+    if every <= 1:
+        return weights
+    columns = (np.arange(weights.shape[-1]) // every) * every
+    return weights[..., columns]
+
+
+def _turnover(weights: np.ndarray) -> np.ndarray:
+    """Sum over symbols of |weight change| into each hour, entry included."""
+    changes = np.diff(weights, axis=-1, prepend=0.0)
+    return np.abs(changes).sum(axis=-2)
+
+
+def run_backtest(
+    matrix: FundingMatrix,
+    open_interest: Optional[np.ndarray] = None,
+    fee_bps: float = BACKTEST_FEE_BPS,
+    rebalance_hours: int = BACKTEST_REBALANCE_HOURS,
+    top_n: int = BACKTEST_TOP_N,
+    lookback_hours: int = BACKTEST_LOOKBACK_HOURS
+) -> BacktestResult:
+    """
+    Backtest each symbol and each portfolio weighting in one vectorized pass.
+
+    Every symbol is a series of its own (fully invested from its first
+    observation, paying fees once on entry). The portfolios (equal weight,
+    OI-weighted, top-N by trailing funding) rebalance every
+    `rebalance_hours` and pay `fee_bps` on the notional they trade. Missing
+    hours earn nothing.
+
+    Args:
+        matrix: Hourly funding rates, symbols x hours
+        open_interest: Open interest per symbol (static or symbols x hours) for
+            the OI-weighted portfolio; omitted if None
+        fee_bps: Cost per unit of notional traded, in basis points
+        rebalance_hours: Hours between portfolio rebalances
+        top_n: Number of symbols held by the top-N portfolio
+        lookback_hours: Trailing window ranking the top-N portfolio
+
+    Returns:
+        BacktestResult with the symbols first, then the portfolios
+    """
+    rates = matrix.values.astype(np.float64, copy=False)
+    available = ~np.isnan(rates)
+    earned = np.where(available, rates, 0.0)
+
+    weights = {"Portfolio: equal weight": equal_weights(available)}
+    if open_interest is not None:
+        weights["Portfolio: OI weighted"] = oi_weights(available, open_interest)
+    weights[f"Portfolio: top {top_n}"] = top_n_weights(rates, available, top_n, lookback_hours)
+    held = _hold(np.stack(list(weights.values())), rebalance_hours)
+
+    # Per-symbol series hold a unit position from their first observation
+    entered = np.maximum.accumulate(available, axis=1)
+    symbol_turnover = np.diff(entered.astype(np.float64), axis=1, prepend=0.0)
+
+    return _simulate(
+        list(matrix.symbols) + list(weights), matrix.start_ms, fee_bps,
+        returns=np.vstack([earned, np.einsum("ksh,sh->kh", held, earned)]),
+        turnover=np.vstack([symbol_turnover, _turnover(held)]),
+        observed=np.vstack([available, (held * available).sum(axis=1) > 0])
+    )
+
+
+def threshold_backtest(
+    matrix: FundingMatrix,
+    entry: float,
+    exit: float,
+    lookback_hours: int = BACKTEST_LOOKBACK_HOURS,
+    rebalance_hours: int = BACKTEST_REBALANCE_HOURS,
+    fee_bps: float = BACKTEST_FEE_BPS,
+    score: Optional[np.ndarray] = None
+) -> BacktestResult:
+    """
+    Backtest an equal-weight portfolio of symbols gated by entry/exit thresholds.
+
+    Args:
+        matrix: Hourly funding rates, symbols x hours
+        entry: Open a symbol's position when its trailing mean hourly rate rises above this
+        exit: Close it when the trailing mean falls below this
+        lookback_hours: Trailing window for the mean
+        rebalance_hours: Hours between rebalances
+        fee_bps: Cost per unit of notional traded, in basis points
+        score: Precomputed trailing_mean(..., lookback_hours), to reuse across thresholds
+
+    Returns:
+        BacktestResult with a single "Portfolio: threshold" series
+    """
+    rates = matrix.values.astype(np.float64, copy=False)
+    available = ~np.isnan(rates)
+    if score is None:
+        score = trailing_mean(rates, available, lookback_hours)
+
+    held = _hold(threshold_weights(score, available, entry, exit)[None], rebalance_hours)
+    return _simulate(
+        ["Portfolio: threshold"], matrix.start_ms, fee_bps,
+        returns=np.einsum("ksh,sh->kh", held, np.where(available, rates, 0.0)),
+        turnover=_turnover(held),
+        observed=(held * available).sum(axis=1) > 0
+    )
+
+
+def _simulate(
+    names: List[str],
+    start_ms: int,
+    fee_bps: float,
+    returns: np.ndarray,
+    turnover: np.ndarray,
+    observed: np.ndarray
+) -> BacktestResult:
+    """Charge fees on gross returns and compound them into index and drawdown series."""
+    returns = returns - turnover * fee_bps / 10_000
+    index = 100 * np.cumprod(1 + returns, axis=1)
+    peak = np.maximum.accumulate(np.maximum(index, 100), axis=1)
+    drawdown = index / peak - 1
+    return BacktestResult(names, start_ms, returns, index, drawdown, turnover, observed)
+
+
+if __name__ == "__main__":
+    # Benchmark: per-group cumprod + Python loop vs the vectorized engine
+    import time
+    from src.matrix import dense_matrix
+
+    n_symbols, n_hours = 200, 24 * 365
+    rng = np.random.default_rng(0)
+    times = pd.date_range("2024-01-01", periods=n_hours, freq="h", tz="UTC")
+    df = pd.DataFrame({
+        "timestamp": np.tile(times, n_symbols),
+        "symbol": np.repeat([f"SYM{i}" for i in range(n_symbols)], n_hours),
+        "funding_rate": rng.normal(1e-5, 2e-5, n_symbols * n_hours),
+    })
+    print(f"{n_symbols} symbols x {n_hours:,} hours")
+
+    started = time.perf_counter()
+    index_df = df.sort_values(["symbol", "timestamp"]).copy()
+    index_df["index"] = index_df.groupby("symbol")["funding_rate"].transform(lambda x: (1 + x).cumprod() * 100)
+    metrics = []
+    for symbol in index_df["symbol"].unique():
+        symbol_data = index_df[index_df["symbol"] == symbol]
+        metrics.append((symbol, symbol_data["index"].iloc[-1]))
+    inline_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matrix = dense_matrix(df)
+    result = run_backtest(matrix, open_interest=rng.uniform(1e6, 1e8, n_symbols), fee_bps=0)
+    stats = result.stats()
+    engine_time = time.perf_counter() - started
+
+    assert np.allclose(stats["final_index"].iloc[:n_symbols].to_numpy(), [m[1] for m in metrics])
+    print(f"Inline groupby + loop: {inline_time * 1000:7.0f} ms (per-symbol index only)")
+    print(f"Vectorized engine:     {engine_time * 1000:7.0f} ms (+ drawdown, Sharpe, turnover, 3 portfolios)")
+    print(stats.tail(3).to_string())
@@ -0,0 +1,155 @@
+"""Rate-limited, retrying funding history page fetches shared by backfill workers."""
+
+import time
+import random
+import logging
+
+import requests
+
+from config import (
+    API_URL, MAX_RETRIES, API_WEIGHT_PER_MINUTE, API_WEIGHT_BURST,
+    INFO_REQUEST_WEIGHT, ITEMS_PER_EXTRA_WEIGHT,
+    RETRY_BACKOFF_BASE_SECONDS, RETRY_BACKOFF_MAX_SECONDS,
+)
+from src.history_fetcher import _fetch_funding_page
+from src.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def default_rate_limiter() -> TokenBucket:
+    """Create a limiter sized to Hyperliquid's per-IP request-weight budget."""
+    return TokenBucket.per_minute(API_WEIGHT_PER_MINUTE, API_WEIGHT_BURST)
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    ceiling = min(RETRY_BACKOFF_MAX_SECONDS, RETRY_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+def _fetch_page_with_retry(
+    coin: str,
+    start_time: int,
+    limiter: TokenBucket,
+    api_url: str
+) -> list:
+    """
+    Fetch one page, waiting on the shared limiter and retrying with backoff.
+
+    The base request weight is taken before the call; the per-item weight is
+    charged once the size of the response is known. Connection errors, HTTP
+    error statuses and undecodable (e.g. truncated) responses are retried.
+    """
+    for attempt in range(1, MAX_RETRIES + 1):
+        limiter.acquire(INFO_REQUEST_WEIGHT)
+        try:
+            data = _fetch_funding_page(coin, start_time, api_url)
+            limiter.charge(len(data) // ITEMS_PER_EXTRA_WEIGHT)
+            return data
+        except (requests.RequestException, ValueError) as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(f"  Attempt {attempt} failed for {coin}: {e}. Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+    return []
+
+
+if __name__ == "__main__":
+    # Compare the serial and concurrent paths against a local stub server
+    import json
+    import argparse
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from config import HISTORY_FETCH_WORKERS, RETRY_DELAY_SECONDS
+    from src.batch import FundingBatch
+    from src.history_fetcher import PAGE_SIZE, fetch_funding_history
+
+    parser = argparse.ArgumentParser(description="Benchmark history fetchers against a stub API")
+    parser.add_argument("--coins", type=int, default=6)
+    parser.add_argument("--hours", type=int, default=1200, help="History length per coin")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated server latency (s)")
+    args = parser.parse_args()
+
+    hour_ms = 3600 * 1000
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            first = max(0, -(-body["startTime"] // hour_ms))
+            last = min(args.hours, first + PAGE_SIZE)
+            page = [
+                {"coin": body["coin"], "time": h * hour_ms, "fundingRate": "0.0000125", "premium": "0.0001"}
+                for h in range(first, last)
+            ]
+            time.sleep(args.latency)
+            payload = json.dumps(page).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub_url = f"http://127.0.0.1:{server.server_port}/info"
+
+    def fetch_serially(start_times, api_url):
+        # The original loop: one coin at a time with fixed sleeps between requests
+        batches = []
+        for idx, (coin, start_time) in enumerate(start_times.items(), 1):
+            for attempt in range(1, MAX_RETRIES + 1):
+                try:
+                    batches.append(fetch_funding_history(coin, start_time, api_url))
+                    break
+                except Exception:
+                    if attempt < MAX_RETRIES:
+                        time.sleep(RETRY_DELAY_SECONDS)
+            if idx < len(start_times):
+                time.sleep(2)
+        return FundingBatch.concat(batches)
+
+    def fetch_coin(coin, start_time, limiter, api_url):
+        pages = []
+        while True:
+            data = _fetch_page_with_retry(coin, start_time, limiter, api_url)
+            if not data:
+                break
+            pages.append(FundingBatch.from_history_page(data))
+            if len(data) < PAGE_SIZE:
+                break
+            start_time = data[-1]["time"] + 1
+        return FundingBatch.concat(pages)
+
+    def fetch_concurrently(start_times, api_url):
+        # Every worker draws from the same token bucket
+        limiter = default_rate_limiter()
+        with ThreadPoolExecutor(max_workers=HISTORY_FETCH_WORKERS) as pool:
+            futures = {
+                coin: pool.submit(fetch_coin, coin, start_time, limiter, api_url)
+                for coin, start_time in start_times.items()
+            }
+            return {coin: future.result() for coin, future in futures.items()}
+
+    coins = {f"COIN{i}": 0 for i in range(args.coins)}
+
+    started = time.perf_counter()
+    serial_rows = fetch_serially(coins, stub_url)
+    serial_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = fetch_concurrently(coins, stub_url)
+    concurrent_time = time.perf_counter() - started
+    server.shutdown()
+
+    concurrent_rows = sum(len(rows) for rows in results.values())
+    print(f"Serial:     {len(serial_rows)} rows in {serial_time:.2f}s")
+    print(f"Concurrent: {concurrent_rows} rows in {concurrent_time:.2f}s")
+    print(f"Speedup:    {serial_time / concurrent_time:.1f}x")
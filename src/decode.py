@@ -0,0 +1,147 @@
+"""Fast JSON decoding and columnar parsing of Hyperliquid API responses."""
+
+import json
+from operator import itemgetter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Use the fastest JSON decoder available; all of them accept bytes
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+        loads = msgspec.json.decode
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        loads = json.loads
+        JSON_BACKEND = "json"
+
+_history_fields = itemgetter("time", "coin", "fundingRate", "premium")
+
+ASSET_CTX_FIELDS = {
+    "funding_rate": "funding",
+    "mark_price": "markPx",
+    "day_ntl_vlm": "dayNtlVlm",
+    "open_interest": "openInterest",
+}
+
+
+def encode_symbols(names) -> Tuple[np.ndarray, List[str]]:
+    """
+    Dictionary-encode a sequence of symbol names.
+
+    Returns:
+        Tuple of (int32 codes, distinct symbols in order of first appearance)
+    """
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(name, len(index)) for name in names), dtype=np.int32)
+    return codes, list(index)
+
+
+def parse_funding_history(data: list) -> Dict[str, Any]:
+    """
+    Parse a fundingHistory response into columns in a single pass.
+
+    Args:
+        data: Decoded fundingHistory entries
+
+    Returns:
+        Dict with: time (int64 epoch ms), symbol_code (int32), symbols (list of
+        distinct names the codes index), funding_rate and premium (float64)
+    """
+    if not data:
+        return {
+            "time": np.empty(0, dtype=np.int64),
+            "symbol_code": np.empty(0, dtype=np.int32),
+            "symbols": [],
+            "funding_rate": np.empty(0, dtype=np.float64),
+            "premium": np.empty(0, dtype=np.float64),
+        }
+
+    times, coins, rates, premiums = zip(*map(_history_fields, data))
+    codes, symbols = encode_symbols(coins)
+    return {
+        "time": np.array(times, dtype=np.int64),
+        "symbol_code": codes,
+        "symbols": symbols,
+        # numpy parses the decimal strings itself, without a float() call per value
+        "funding_rate": np.array(rates, dtype=np.float64),
+        "premium": np.array(premiums, dtype=np.float64),
+    }
+
+
+def parse_asset_ctxs(universe: list, asset_ctxs: list) -> Dict[str, Any]:
+    """
+    Parse a metaAndAssetCtxs response into columns.
+
+    Missing or null fields parse as 0, as the per-row parser used to do.
+
+    Returns:
+        Dict with: symbols (list of names, one per asset) and one float64
+        array per key of ASSET_CTX_FIELDS
+    """
+    columns: Dict[str, Any] = {"symbols": [asset["name"] for asset in universe[:len(asset_ctxs)]]}
+    for column, field in ASSET_CTX_FIELDS.items():
+        columns[column] = np.array([ctx.get(field) or 0 for ctx in asset_ctxs], dtype=np.float64)
+    return columns
+
+
+if __name__ == "__main__":
+    # Benchmark: dicts of ISO strings (re-parsed later) vs columnar parsing,
+    # on a synthetic 500-entry fundingHistory page
+    import time
+    from datetime import datetime, timezone
+
+    from src.batch import FundingBatch
+
+    import pandas as pd
+
+    hour_ms = 3600 * 1000
+    rng = np.random.default_rng(0)
+    page = [
+        {
+            "coin": "BTC",
+            "fundingRate": f"{rate:.10f}",
+            "premium": f"{premium:.10f}",
+            "time": 1_700_000_000_000 + i * hour_ms,
+        }
+        for i, (rate, premium) in enumerate(zip(rng.normal(1e-5, 2e-5, 500), rng.normal(0, 1e-4, 500)))
+    ]
+    raw = json.dumps(page).encode()
+    repeats = 500
+
+    def dict_path():
+        rows = [
+            {
+                "timestamp": datetime.fromtimestamp(entry["time"] / 1000, tz=timezone.utc).isoformat(),
+                "symbol": entry["coin"],
+                "funding_rate": float(entry["fundingRate"]),
+                "premium": float(entry["premium"]),
+            }
+            for entry in json.loads(raw)
+        ]
+        df = pd.DataFrame(rows)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+        return df
+
+    def columnar_path():
+        return FundingBatch.from_history_page(loads(raw)).to_frame()
+
+    pd.testing.assert_frame_equal(dict_path(), columnar_path(), check_dtype=False)
+
+    for label, path in (("Dict rows", dict_path), ("Columnar", columnar_path)):
+        started = time.perf_counter()
+        for _ in range(repeats):
+            path()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<10} {repeats * len(page) / elapsed:>12,.0f} rows/s")
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        parse_funding_history(loads(raw))
+    elapsed = time.perf_counter() - started
+    print(f"Decode+parse only ({JSON_BACKEND}): {repeats * len(page) / elapsed:,.0f} rows/s")
@@ -0,0 +1,172 @@
+"""Server-side downsampling of time series before they are sent to a chart."""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import CHART_MAX_POINTS, DOWNSAMPLE_METHOD
+
+METHODS = ("minmax", "lttb")
+
+
+def _as_numbers(values: pd.Series) -> np.ndarray:
+    """x values as float64, with datetimes as epoch nanoseconds."""
+    if isinstance(values.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(values):
+        return values.array.asi8.astype(np.float64)
+    return values.to_numpy(dtype=np.float64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: positions of `n_out` points that keep a series' visual shape.
+
+    The first and last points are always kept. The rest are split into
+    n_out - 2 equal-count buckets, and from each the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average is kept.
+
+    Args:
+        x: Sorted x values
+        y: y values (no NaN)
+        n_out: Number of points to keep
+
+    Returns:
+        Sorted positions into x and y
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+
+    # The point after each bucket's "next bucket": its average, or the last point for the last bucket
+    next_x = np.append(avg_x[1:], x[n - 1])
+    next_y = np.append(avg_y[1:], y[n - 1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs(
+            (x[a] - next_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[b] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, groups: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Positions of the minimum and maximum of every group in each of `n_buckets` equal-width x buckets.
+
+    Buckets span the x range of all groups together, so every series is
+    bucketed on the same grid. Each group's first and last points are kept
+    too, so lines still reach the edges of the range.
+
+    Args:
+        x: x values
+        y: y values (no NaN)
+        groups: Integer group code per point
+        n_buckets: Buckets across the x range
+
+    Returns:
+        Sorted positions into x and y
+    """
+    if len(x) == 0:
+        return np.arange(0)
+
+    span = x.max() - x.min()
+    bucket = np.minimum(((x - x.min()) / (span or 1) * n_buckets).astype(np.int64), n_buckets - 1)
+    points = pd.DataFrame({"group": groups, "bucket": bucket, "x": x, "y": y})
+
+    by_bucket = points.groupby(["group", "bucket"], sort=False)["y"]
+    by_group = points.groupby("group", sort=False)["x"]
+    keep = np.concatenate([
+        by_bucket.idxmin().to_numpy(), by_bucket.idxmax().to_numpy(),
+        by_group.idxmin().to_numpy(), by_group.idxmax().to_numpy(),
+    ])
+    return np.unique(keep)
+
+
+def downsample(
+    df: pd.DataFrame,
+    y: str,
+    x: str = "timestamp",
+    by: Optional[str] = "symbol",
+    max_points: int = CHART_MAX_POINTS,
+    method: str = DOWNSAMPLE_METHOD
+) -> pd.DataFrame:
+    """
+    Reduce every series in a long-format frame to about `max_points` points.
+
+    Series already within budget are returned unchanged. Rows with a
+    missing y are dropped from downsampled series (a line skips them anyway).
+
+    Args:
+        df: Rows with the x, y and (optionally) series columns
+        y: Value column
+        x: Sorted-by axis column (datetime or numeric)
+        by: Column identifying each series (None = a single series)
+        max_points: Points to keep per series; "minmax" keeps up to this many
+            (min and max of max_points / 2 buckets), "lttb" exactly this many
+        method: "minmax" (keeps every bucket's extremes) or "lttb" (keeps the
+            visual shape with fewer points)
+
+    Returns:
+        Subset of df's rows, sorted by series then x
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Choose from: {', '.join(METHODS)}")
+
+    sizes = df.groupby(by, sort=False).size() if by else pd.Series([len(df)])
+    if df.empty or sizes.max() <= max_points:
+        return df
+
+    df = df[df[y].notna()].sort_values([by, x] if by else [x], kind="stable")
+    xs = _as_numbers(df[x])
+    ys = df[y].to_numpy(dtype=np.float64)
+    groups = pd.factorize(df[by])[0] if by else np.zeros(len(df), dtype=np.int64)
+
+    if method == "minmax":
+        keep = minmax_indices(xs, ys, groups, max(max_points // 2, 1))
+    else:
+        starts = np.flatnonzero(np.diff(groups, prepend=-1))
+        ends = np.append(starts[1:], len(groups))
+        keep = np.concatenate([
+            start + lttb_indices(xs[start:end], ys[start:end], max_points)
+            for start, end in zip(starts, ends)
+        ])
+
+    return df.iloc[keep]
+
+
+if __name__ == "__main__":
+    # Benchmark: 40 series x 2.5 years of hourly points
+    import time
+
+    n_symbols, n_hours = 40, int(24 * 365 * 2.5)
+    rng = np.random.default_rng(0)
+    times = pd.date_range("2023-01-01", periods=n_hours, freq="h", tz="UTC")
+    df = pd.DataFrame({
+        "timestamp": np.tile(times, n_symbols),
+        "symbol": np.repeat([f"SYM{i}" for i in range(n_symbols)], n_hours),
+        "funding_rate": rng.normal(1e-5, 2e-5, n_symbols * n_hours),
+    })
+    print(f"{len(df):,} points in {n_symbols} series")
+
+    for method in METHODS:
+        started = time.perf_counter()
+        reduced = downsample(df, "funding_rate", method=method)
+        elapsed = time.perf_counter() - started
+        print(f"{method:>6}: {len(reduced):,} points in {elapsed * 1000:.0f} ms")
+
+        # Extremes survive min/max bucketing exactly
+        if method == "minmax":
+            extremes = df.groupby("symbol")["funding_rate"].agg(["min", "max"])
+            kept = reduced.groupby("symbol")["funding_rate"].agg(["min", "max"])
+            assert extremes.equals(kept.loc[extremes.index])
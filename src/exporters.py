@@ -0,0 +1,316 @@
+"""Background export of collected snapshots (Google Sheets and others)."""
+
+import os
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from config import (
+    DEAD_LETTER_DIR, EXPORT_QUEUE_SIZE, EXPORT_MAX_ATTEMPTS, EXPORT_BACKOFF_BASE_SECONDS,
+    EXPORT_BACKOFF_MAX_SECONDS, EXPORT_FLUSH_SECONDS, EXPORT_FLUSH_ROWS,
+)
+from src.batch import FundingBatch
+from src.segment_log import SegmentLog
+
+logger = logging.getLogger(__name__)
+
+# An exporter ships one batch somewhere and raises on failure
+Exporter = Callable[[FundingBatch], Any]
+
+
+def sheets_exporter(rates: FundingBatch) -> Any:
+    """Append a batch to Google Sheets (gspread is only imported when used)."""
+    from src.sheets import export_funding_rates
+    return export_funding_rates(rates)
+
+
+def default_exporters(use_sheets: bool = False) -> Dict[str, Exporter]:
+    """Exporters enabled by the collector's command-line options."""
+    exporters: Dict[str, Exporter] = {}
+    if use_sheets:
+        exporters["sheets"] = sheets_exporter
+    return exporters
+
+
+class ExportJob(NamedTuple):
+    exporter: str
+    batch: FundingBatch
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    ceiling = min(EXPORT_BACKOFF_MAX_SECONDS, EXPORT_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+class ExportQueue(threading.Thread):
+    """
+    Worker thread that runs exporters off the collection path.
+
+    `submit` never blocks: each batch is queued once per exporter. The
+    worker coalesces queued batches per exporter and ships them as one batch
+    once `flush_rows` rows are pending or the oldest has waited
+    `flush_seconds`, so a destination sees one write per flush rather than
+    one per collection. Failed flushes are retried with exponential backoff. A batch that still
+    fails after `max_attempts`, or that arrives while the queue is full, is
+    written to that exporter's dead-letter spool (a crash-safe SegmentLog)
+    instead of being dropped. Spooled batches are retried when the worker
+    starts, and whenever a later export to the same destination succeeds.
+    Batches still queued at shutdown are spooled too.
+    """
+
+    def __init__(
+        self,
+        exporters: Dict[str, Exporter],
+        spool_dir: str = DEAD_LETTER_DIR,
+        max_size: int = EXPORT_QUEUE_SIZE,
+        max_attempts: int = EXPORT_MAX_ATTEMPTS,
+        flush_seconds: float = EXPORT_FLUSH_SECONDS,
+        flush_rows: int = EXPORT_FLUSH_ROWS
+    ):
+        super().__init__(name="exporter", daemon=True)
+        self.exporters = dict(exporters)
+        self.max_attempts = max_attempts
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        # Batches received but not yet exported, and when the oldest arrived
+        self._pending: Dict[str, List[FundingBatch]] = {name: [] for name in self.exporters}
+        self._pending_since: Dict[str, float] = {}
+        self.spools = {name: SegmentLog(os.path.join(spool_dir, name)) for name in self.exporters}
+        self._jobs: "queue.Queue[ExportJob]" = queue.Queue(maxsize=max_size)
+        self._stopping = threading.Event()
+
+    def submit(self, batch: FundingBatch) -> None:
+        """Queue a batch for every exporter without waiting for any of them."""
+        for name in self.exporters:
+            try:
+                self._jobs.put_nowait(ExportJob(name, batch))
+            except queue.Full:
+                logger.warning(f"Export queue full; spooling {len(batch)} rows for {name}")
+                self._spool(ExportJob(name, batch))
+
+    def export_now(self, batch: FundingBatch) -> None:
+        """
+        Export a batch on the calling thread, for one-off runs without a worker.
+
+        Failures are spooled as usual; a success also replays the spool.
+        """
+        for name in self.exporters:
+            if self._export(ExportJob(name, batch)):
+                self._replay(name)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop after the current export, flushing what is pending once; failures are spooled.
+
+        Backoff waits end as soon as stop is called. If the worker is still
+        busy (e.g. a request hanging on the network) after `timeout` seconds,
+        it is abandoned; rows it had not exported yet are still in storage.
+        """
+        self._stopping.set()
+        self.join(timeout)
+        if self.is_alive():
+            logger.warning(f"Export worker still busy after {timeout}s; stopping without it")
+
+    def run(self) -> None:
+        for name in self.exporters:
+            self._replay(name)
+
+        while not self._stopping.is_set():
+            try:
+                self._add(self._jobs.get(timeout=self._wait_time()))
+            except queue.Empty:
+                pass
+            for name in self.exporters:
+                if self._flush_due(name):
+                    self._flush(name)
+
+        # Final flush: a single attempt each (stopping), spooled if it fails
+        while True:
+            try:
+                self._add(self._jobs.get_nowait())
+            except queue.Empty:
+                break
+        for name in self.exporters:
+            self._flush(name)
+
+    def _add(self, job: ExportJob) -> None:
+        if not self._pending[job.exporter]:
+            self._pending_since[job.exporter] = time.monotonic()
+        self._pending[job.exporter].append(job.batch)
+
+    def _pending_rows(self, name: str) -> int:
+        return sum(len(batch) for batch in self._pending[name])
+
+    def _flush_due(self, name: str) -> bool:
+        if not self._pending[name]:
+            return False
+        waited = time.monotonic() - self._pending_since[name]
+        return waited >= self.flush_seconds or self._pending_rows(name) >= self.flush_rows
+
+    def _wait_time(self) -> float:
+        """Seconds until the earliest pending flush is due (at most 0.5, so stop stays responsive)."""
+        waits = [
+            self._pending_since[name] + self.flush_seconds - time.monotonic()
+            for name in self.exporters if self._pending[name]
+        ]
+        return min([0.5] + [max(wait, 0.0) for wait in waits])
+
+    def _flush(self, name: str) -> None:
+        """Export everything pending for one destination as a single batch."""
+        batches, self._pending[name] = self._pending[name], []
+        if not batches:
+            return
+        if self._export(ExportJob(name, FundingBatch.concat(batches))):
+            self._replay(name)
+
+    def _export(self, job: ExportJob) -> bool:
+        """Run one export with retries; spool it if every attempt fails."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.exporters[job.exporter](job.batch)
+                return True
+            except Exception as e:
+                if attempt == self.max_attempts or self._stopping.is_set():
+                    logger.error(f"Export to {job.exporter} failed after {attempt} attempt(s): {e}")
+                    break
+                delay = _backoff_delay(attempt)
+                logger.warning(f"Export to {job.exporter} failed ({e}); retrying in {delay:.1f}s")
+                if self._stopping.wait(delay):
+                    break
+
+        self._spool(job)
+        return False
+
+    def _spool(self, job: ExportJob) -> None:
+        self.spools[job.exporter].append(job.batch)
+        logger.info(f"Spooled {len(job.batch)} rows for {job.exporter}")
+
+    def _replay(self, name: str) -> None:
+        """
+        Export everything in a destination's dead-letter spool, keeping what fails.
+
+        Spooled rows are sent in chunks of at most `flush_rows`, so a spool
+        that grew during a long outage never becomes one oversized request.
+        """
+        spool = self.spools[name]
+        if not spool.sealed_segments() and not os.path.exists(spool.active_path):
+            return
+        try:
+            rows = spool.drain(self.exporters[name], self.flush_rows)
+            if rows:
+                logger.info(f"Replayed {rows} spooled rows to {name}")
+        except Exception as e:
+            logger.warning(f"Spooled exports for {name} still failing: {e}")
+
+
+if __name__ == "__main__":
+    # Check: Sheets API calls made through the queue, counted with a fake gspread client
+    import tempfile
+    from collections import Counter
+
+    import gspread
+    import numpy as np
+    import requests
+
+    from src.sheets import SheetsExporter
+
+    calls = Counter()
+    quota_errors = {"remaining": 0}  # Appends to reject with HTTP 429
+
+    def quota_error() -> gspread.exceptions.APIError:
+        response = requests.Response()
+        response.status_code = 429
+        response._content = b'{"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}'
+        return gspread.exceptions.APIError(response)
+
+    class FakeWorksheet:
+        row_count = 1000
+
+        def append_row(self, row):
+            calls["append_row"] += 1
+
+        def append_rows(self, rows, **kwargs):
+            calls["append_rows"] += 1
+            if quota_errors["remaining"]:
+                quota_errors["remaining"] -= 1
+                raise quota_error()
+            calls["rows"] += len(rows)
+
+        def update(self, **kwargs):
+            calls["update"] += 1
+
+    class FakeSpreadsheet:
+        url = "https://docs.google.com/spreadsheets/d/fake"
+
+        def __init__(self):
+            self.worksheets = {}
+
+        def worksheet(self, name):
+            calls["worksheet"] += 1
+            if name not in self.worksheets:
+                raise gspread.WorksheetNotFound(name)
+            return self.worksheets[name]
+
+        def add_worksheet(self, title, rows, cols):
+            calls["add_worksheet"] += 1
+            self.worksheets[title] = FakeWorksheet()
+            return self.worksheets[title]
+
+    class FakeClient:
+        def __init__(self):
+            self.spreadsheets = {}
+
+        def open(self, name):
+            calls["open"] += 1
+            calls[f"open {name}"] += 1
+            return self.spreadsheets.setdefault(name, FakeSpreadsheet())
+
+    def authorize() -> FakeClient:
+        calls["auth"] += 1
+        return FakeClient()
+
+    def snapshot(time_ms: int) -> FundingBatch:
+        symbols = ["BTC", "ETH", "SOL"]
+        values = {column: np.ones(len(symbols)) for column in ("funding_rate", "mark_price", "day_ntl_vlm", "open_interest")}
+        return FundingBatch(np.full(len(symbols), time_ms), np.arange(len(symbols)), symbols, values)
+
+    sheets = SheetsExporter(client_factory=authorize)
+    spool_dir = tempfile.mkdtemp()
+    start_ms = int(time.time()) * 1000
+
+    # 12 collections, coalesced into a few flushes
+    exports = ExportQueue({"sheets": sheets}, spool_dir=spool_dir, flush_seconds=0.2)
+    exports.start()
+    for i in range(12):
+        exports.submit(snapshot(start_ms + i * 1000))
+        time.sleep(0.05)
+    time.sleep(0.4)
+    print(f"12 collections: {dict(calls)}")
+    assert calls["auth"] == 1 and calls["rows"] == 36 and calls["append_rows"] < 12
+    assert all(count == 1 for name, count in calls.items() if name.startswith("open "))
+
+    # Quota errors back off in the queue only, and stop cuts the backoff short
+    quota_errors["remaining"] = 10 ** 6
+    exports.submit(snapshot(start_ms + 12 * 1000))
+    time.sleep(0.5)
+    started = time.monotonic()
+    exports.stop(timeout=5)
+    print(f"Stopped during quota backoff in {time.monotonic() - started:.2f}s")
+    assert time.monotonic() - started < 2 and not exports.is_alive()
+
+    # The spooled snapshot (the newest so far) is replayed when the next worker starts
+    quota_errors["remaining"] = 0
+    updates = calls["update"]
+    exports = ExportQueue({"sheets": sheets}, spool_dir=spool_dir, flush_seconds=0.2)
+    exports.start()
+    exports.stop(timeout=5)
+    print(f"After replay: {dict(calls)}")
+    assert calls["rows"] == 39 and calls["auth"] == 1 and calls["update"] == updates + 1
+
+    # Replaying an older batch never overwrites the Latest tab with it
+    sheets(snapshot(start_ms - 3600 * 1000))
+    assert calls["update"] == updates + 1
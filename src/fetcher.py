@@ -1,50 +1,27 @@
 """Hyperliquid API client for fetching funding rates."""
 
-import requests
-from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import List, Optional
 
-from config import API_URL
+import numpy as np
 
+from src.api_client import get_client
+from src.batch import FundingBatch
 
-def fetch_funding_rates() -> List[Dict[str, Any]]:
+
+def fetch_funding_rates(max_age: Optional[float] = None) -> FundingBatch:
     """
     Fetch current funding rates from Hyperliquid API.
 
+    Args:
+        max_age: Oldest acceptable cached snapshot in seconds (None = client
+            TTL, 0 = always refetch)
+
     Returns:
-        List of dicts with: symbol, funding_rate, mark_price, timestamp
+        FundingBatch with one row per asset and columns: funding_rate,
+        mark_price, day_ntl_vlm, open_interest
     """
-    payload = {"type": "metaAndAssetCtxs"}
-
-    response = requests.post(API_URL, json=payload, timeout=30)
-    response.raise_for_status()
-
-    data = response.json()
-
-    # data[0] contains universe (metadata), data[1] contains asset contexts
-    universe = data[0]["universe"]
-    asset_ctxs = data[1]
-
-    timestamp = datetime.now(timezone.utc).isoformat()
-
-    results = []
-    for i, asset_ctx in enumerate(asset_ctxs):
-        symbol = universe[i]["name"]
-        funding_rate = float(asset_ctx.get("funding", 0))
-        mark_price = float(asset_ctx.get("markPx", 0))
-        day_ntl_vlm = float(asset_ctx.get("dayNtlVlm", 0))
-        open_interest = float(asset_ctx.get("openInterest", 0))
-
-        results.append({
-            "timestamp": timestamp,
-            "symbol": symbol,
-            "funding_rate": funding_rate,
-            "mark_price": mark_price,
-            "day_ntl_vlm": day_ntl_vlm,
-            "open_interest": open_interest
-        })
-
-    return results
+    universe, asset_ctxs, fetched_at = get_client().meta_and_asset_ctxs(max_age)
+    return FundingBatch.from_asset_ctxs(universe, asset_ctxs, fetched_at)
 
 
 def get_top_symbols_by_volume(limit: int = 10) -> List[str]:
@@ -54,30 +31,20 @@ def get_top_symbols_by_volume(limit: int = 10) -> List[str]:
     Returns:
         List of symbol names
     """
-    payload = {"type": "metaAndAssetCtxs"}
-
-    response = requests.post(API_URL, json=payload, timeout=30)
-    response.raise_for_status()
-
-    data = response.json()
-    universe = data[0]["universe"]
-    asset_ctxs = data[1]
-
-    # Sort by open interest
-    symbols_with_oi = []
-    for i, asset_ctx in enumerate(asset_ctxs):
-        symbol = universe[i]["name"]
-        oi = float(asset_ctx.get("openInterest", 0))
-        symbols_with_oi.append((symbol, oi))
-
-    symbols_with_oi.sort(key=lambda x: x[1], reverse=True)
+    rates = fetch_funding_rates()
 
-    return [s[0] for s in symbols_with_oi[:limit]]
+    # Sort by open interest (stable, so ties keep universe order)
+    order = np.argsort(-rates.values["open_interest"], kind="stable")[:limit]
+    return [rates.symbols[i] for i in order]
 
 
 if __name__ == "__main__":
     # Test the fetcher
     rates = fetch_funding_rates()
     print(f"Fetched {len(rates)} funding rates")
-    for rate in rates[:5]:
-        print(f"  {rate['symbol']}: {rate['funding_rate']:.6f} (mark: ${rate['mark_price']:.2f})")
+    for _, symbol, funding_rate, mark_price, _, _ in list(rates.rows())[:5]:
+        print(f"  {symbol}: {funding_rate:.6f} (mark: ${mark_price:.2f})")
+
+    # Served from the cached snapshot: no second request
+    print(f"Top by OI: {', '.join(get_top_symbols_by_volume(5))}")
+    print(f"Requests: {get_client().stats.summary()}")
@@ -0,0 +1,77 @@
+"""Small file helpers shared by the storage modules."""
+
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+def write_json_atomic(path: str, obj: Any) -> None:
+    """
+    Write JSON so readers see either the old file or the new one, never a mix.
+
+    The data is written to a temporary file in the same directory, flushed to
+    disk, and then moved over the target with os.replace.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """Read a JSON file, returning `default` if it does not exist."""
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def fsync_dir(directory: str) -> None:
+    """Flush a directory entry change (create/rename/delete) to disk, where supported."""
+    if os.name == "nt":
+        return
+    fd = os.open(directory or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Hold an exclusive inter-process lock on `path` for the duration of the block.
+
+    Uses flock on POSIX and msvcrt.locking on Windows. The lock file is
+    created if needed and left in place.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
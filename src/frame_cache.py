@@ -0,0 +1,228 @@
+"""Persistent on-disk cache for loaded and derived DataFrames."""
+
+import os
+import uuid
+import pickle
+import hashlib
+import logging
+import functools
+from contextlib import suppress
+from typing import Any, Optional, Sequence
+
+import pandas as pd
+
+from config import CACHE_DIR, CACHE_MAX_BYTES
+from src.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+
+class FrameCache:
+    """
+    Size-bounded LRU cache of computed values, stored as files.
+
+    DataFrames are written as uncompressed Arrow IPC files and read back
+    through a memory map, so a cold start avoids re-parsing source data.
+    Other values are pickled. Recency is tracked with file mtimes: a hit
+    touches the entry, and the oldest entries are evicted once the cache
+    grows past `max_bytes`. Streamlit sessions share the cache from
+    separate threads, so an entry may vanish (evicted by another session)
+    at any point; that is treated as a miss.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(name: str, *parts: Any) -> str:
+        """Build a cache key from a name and any reprs that identify the inputs."""
+        digest = hashlib.sha1(repr((name,) + parts).encode()).hexdigest()
+        return f"{name.rsplit('.', 1)[-1]}-{digest[:20]}"
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or the module's miss sentinel."""
+        for ext, reader in (("arrow", self._read_arrow), ("pkl", self._read_pickle)):
+            path = self._path(key, ext)
+            if not os.path.exists(path):
+                continue
+            try:
+                value = reader(path)
+            except FileNotFoundError:
+                return _MISS
+            except Exception as e:
+                logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+                with suppress(FileNotFoundError):
+                    os.remove(path)
+                return _MISS
+            with suppress(FileNotFoundError):
+                os.utime(path)
+            return value
+        return _MISS
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value and evict least-recently-used entries if over budget."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        if isinstance(value, pd.DataFrame) and _arrow_available():
+            path, writer = self._path(key, "arrow"), self._write_arrow
+        else:
+            path, writer = self._path(key, "pkl"), self._write_pickle
+
+        # Unique per write: sessions in the same process may store the same key at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            writer(tmp_path, value)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not cache {key}: {e}")
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            return
+
+        self._evict()
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            with suppress(FileNotFoundError):
+                os.remove(os.path.join(self.directory, name))
+
+    def _evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # Evicted by another session meanwhile
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    @staticmethod
+    def _write_arrow(path: str, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    @staticmethod
+    def _read_arrow(path: str) -> pd.DataFrame:
+        import pyarrow as pa
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+    @staticmethod
+    def _write_pickle(path: str, value: Any) -> None:
+        with open(path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _read_pickle(path: str) -> Any:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def _arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_cache: Optional[FrameCache] = None
+
+
+def get_cache() -> FrameCache:
+    """Get the shared on-disk cache."""
+    global _cache
+    if _cache is None:
+        _cache = FrameCache()
+    return _cache
+
+
+def disk_cached(datasets: Sequence[str]):
+    """
+    Cache a function's result on disk, keyed by its arguments and data versions.
+
+    The key includes the storage backend's version (mtime/size fingerprint)
+    of every dataset in `datasets`, so entries are invalidated automatically
+    when the underlying data changes. Arguments must have stable reprs.
+
+    Args:
+        datasets: Storage datasets the function's result depends on
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            versions = tuple((backend.name, d, backend.version(d)) for d in datasets)
+            cache = get_cache()
+            key = cache.make_key(name, versions, args, sorted(kwargs.items()))
+
+            value = cache.get(key)
+            if value is _MISS:
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+if __name__ == "__main__":
+    # Benchmark: cold load from CSV vs from the memory-mapped cache entry
+    import time
+    import tempfile
+    import numpy as np
+
+    n_symbols, rows_per_symbol = 200, 5_000
+    rng = np.random.default_rng(0)
+    times = pd.date_range("2024-01-01", periods=rows_per_symbol, freq="h", tz="UTC")
+    bench_df = pd.DataFrame({
+        "timestamp": np.tile(times, n_symbols),
+        "symbol": np.repeat([f"SYM{i}" for i in range(n_symbols)], rows_per_symbol),
+        "funding_rate": rng.normal(1e-5, 2e-5, n_symbols * rows_per_symbol),
+        "premium": rng.normal(0, 1e-4, n_symbols * rows_per_symbol),
+    })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "history.csv")
+        bench_df.to_csv(csv_path, index=False)
+        cache = FrameCache(os.path.join(tmp, "cache"))
+        cache.put("history", bench_df)
+
+        started = time.perf_counter()
+        from_csv = pd.read_csv(csv_path)
+        from_csv["timestamp"] = pd.to_datetime(from_csv["timestamp"], format="ISO8601", utc=True)
+        csv_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cached = cache.get("history")
+        cache_time = time.perf_counter() - started
+
+    pd.testing.assert_frame_equal(cached, bench_df)
+    print(f"{len(bench_df):,} rows")
+    print(f"CSV parse:  {csv_time * 1000:.0f} ms")
+    print(f"Cache read: {cache_time * 1000:.0f} ms")
+    print(f"Speedup:    {csv_time / cache_time:.0f}x")
@@ -1,128 +1,194 @@
 """Fetch full funding rate history for all Hyperliquid perps."""
 
-import os
 import time
 import logging
-import requests
 import pandas as pd
-from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from config import API_URL, MAX_RETRIES, RETRY_DELAY_SECONDS, FUNDING_HISTORY_FILE, DATA_DIR
+from config import API_URL
+from src.api_client import get_client
+from src.backends import get_backend, to_epoch_ms
+from src.batch import FundingBatch
+from src.rollups import update_rollups
+from src.rolling import rebuild_rolling
+from src.matrix import update_matrix_cache
 
 logger = logging.getLogger(__name__)
 
+# fundingHistory returns at most this many entries per request
+PAGE_SIZE = 500
+
 
 def get_all_symbols() -> List[str]:
     """Get all perpetual symbols from Hyperliquid."""
-    payload = {"type": "metaAndAssetCtxs"}
-    response = requests.post(API_URL, json=payload, timeout=30)
-    response.raise_for_status()
-    data = response.json()
-    universe = data[0]["universe"]
-    return [asset["name"] for asset in universe]
+    return get_client().symbols()
 
 
-def _fetch_funding_page(coin: str, start_time: int = 0) -> list:
+def _fetch_funding_page(
+    coin: str,
+    start_time: int = 0,
+    api_url: str = API_URL,
+    end_time: Optional[int] = None
+) -> list:
     """Fetch a single page of funding history (up to 500 entries)."""
     payload = {
         "type": "fundingHistory",
         "coin": coin,
         "startTime": start_time,
     }
+    if end_time is not None:
+        payload["endTime"] = end_time
+
+    return get_client().post(payload, timeout=60, api_url=api_url)
+
 
-    response = requests.post(API_URL, json=payload, timeout=60)
-    response.raise_for_status()
-    return response.json()
+def _parse_funding_entries(data: list) -> FundingBatch:
+    """Convert raw fundingHistory entries to a columnar batch."""
+    return FundingBatch.from_history_page(data)
 
 
-def fetch_funding_history(coin: str) -> List[dict]:
+def fetch_funding_history(
+    coin: str,
+    start_time: int = 0,
+    api_url: str = API_URL,
+    end_time: Optional[int] = None
+) -> FundingBatch:
     """
-    Fetch full funding rate history for a single coin, paginating through all pages.
+    Fetch funding rate history for a single coin, paginating through all pages.
 
     Args:
         coin: Symbol like "BTC", "ETH"
+        start_time: Epoch milliseconds to start from (0 = full history)
+        api_url: Info endpoint to query
+        end_time: Optional inclusive epoch-millisecond upper bound
 
     Returns:
-        List of dicts with: timestamp, symbol, funding_rate, premium
+        FundingBatch with funding_rate and premium columns
     """
-    all_rows = []
-    start_time = 0
+    pages = []
 
     while True:
-        data = _fetch_funding_page(coin, start_time)
+        data = _fetch_funding_page(coin, start_time, api_url, end_time)
 
         if not data:
             break
 
-        for entry in data:
-            all_rows.append({
-                "timestamp": datetime.fromtimestamp(entry["time"] / 1000, tz=timezone.utc).isoformat(),
-                "symbol": entry["coin"],
-                "funding_rate": float(entry["fundingRate"]),
-                "premium": float(entry["premium"]),
-            })
+        pages.append(_parse_funding_entries(data))
 
         # If we got fewer than 500, we've reached the end
-        if len(data) < 500:
+        if len(data) < PAGE_SIZE:
             break
 
         # Next page starts after the last entry's timestamp
         start_time = data[-1]["time"] + 1
         time.sleep(1)
 
-    return all_rows
+    return FundingBatch.concat(pages)
+
+
+def load_high_water_marks(dataset: str = "funding_history") -> Dict[str, int]:
+    """
+    Get the latest stored funding time for each symbol in the history dataset.
+
+    Args:
+        dataset: History dataset to read (the staging copy while a full backfill runs)
+
+    Returns:
+        Dict of symbol -> last stored timestamp (epoch milliseconds)
+    """
+    df = get_backend().read(dataset, columns=["timestamp", "symbol"])
+    if df.empty:
+        return {}
+
+    df["time"] = to_epoch_ms(df["timestamp"])
+    return df.groupby("symbol")["time"].max().to_dict()
 
 
-def fetch_all_funding_history(coins: Optional[List[str]] = None) -> pd.DataFrame:
+def fetch_all_funding_history(
+    coins: Optional[List[str]] = None,
+    incremental: bool = False,
+    workers: int = 1,
+    restart: bool = False
+) -> Dict[str, Any]:
     """
-    Fetch full funding history for all (or specified) coins and save to CSV.
+    Fetch funding history for all (or specified) coins and save it.
+
+    In incremental mode each coin resumes from the last timestamp already stored
+    in the history dataset, and only the new rows are appended to it. Otherwise
+    the full history is fetched into a staging dataset that replaces the stored
+    history once every coin has finished. Pages are written as they arrive and
+    checkpointed, so an interrupted run resumes where it stopped (see
+    src.backfill).
 
     Args:
-        coins: Optional list of symbols to fetch. If None, fetches all.
+        coins: Optional list of symbols to fetch. If None, fetches all listed
+            symbols (plus, in incremental mode, every symbol already stored).
+        incremental: If True, only fetch and append rows after the stored history.
+        workers: Number of coins to fetch concurrently under a shared rate limiter.
+        restart: Start over instead of resuming an interrupted run.
+
+    Returns:
+        Summary dict from src.backfill.backfill_history
+    """
+    from src.backfill import backfill_history
+    return backfill_history(coins=coins, incremental=incremental, workers=workers, restart=restart)
+
+
+def fill_history_gaps() -> pd.DataFrame:
+    """
+    Detect holes in the stored history and re-download only those ranges.
+
+    Each gap is fetched with startTime/endTime set just inside the two
+    observations that bound it, so no existing rows are downloaded again.
+    Recovered rows are upserted into the history and folded into the
+    rollups; rolling stats are recomputed since the rows land mid-series.
 
     Returns:
-        DataFrame with all funding history.
+        DataFrame of the rows that were recovered.
     """
-    if coins is None:
-        logger.info("Fetching symbol list from Hyperliquid...")
-        coins = get_all_symbols()
-        logger.info(f"Found {len(coins)} symbols")
-
-    all_rows = []
-    total = len(coins)
-
-    for idx, coin in enumerate(coins, 1):
-        logger.info(f"Fetching {idx}/{total}: {coin}...")
-
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                rows = fetch_funding_history(coin)
-                all_rows.extend(rows)
-                logger.info(f"  Got {len(rows)} entries for {coin}")
-                break
-            except Exception as e:
-                if attempt < MAX_RETRIES:
-                    logger.warning(f"  Attempt {attempt} failed for {coin}: {e}. Retrying in {RETRY_DELAY_SECONDS}s...")
-                    time.sleep(RETRY_DELAY_SECONDS)
-                else:
-                    logger.error(f"  Failed to fetch {coin} after {MAX_RETRIES} attempts: {e}")
-
-        # Rate limit: 2-second delay between requests
-        if idx < total:
-            time.sleep(2)
-
-    # Build DataFrame and save
-    df = pd.DataFrame(all_rows)
-
-    if not df.empty:
-        df.sort_values(["symbol", "timestamp"], inplace=True)
-        df.reset_index(drop=True, inplace=True)
-
-        os.makedirs(DATA_DIR, exist_ok=True)
-        df.to_csv(FUNDING_HISTORY_FILE, index=False)
-        logger.info(f"Saved {len(df)} rows to {FUNDING_HISTORY_FILE}")
-    else:
-        logger.warning("No data fetched.")
+    from src.analytics import find_gaps, gap_report
+
+    history = get_backend().read("funding_history", columns=["timestamp", "symbol"])
+    gaps = find_gaps(history)
+
+    if gaps.empty:
+        logger.info("No gaps found in funding history.")
+        return pd.DataFrame()
+
+    report = gap_report(gaps)
+    logger.info(f"Found {len(gaps)} gaps ({report.sum()} missing hours) across {len(report)} symbols")
+
+    recovered = []
+    for idx, gap in enumerate(gaps.itertuples(index=False), 1):
+        start_ms = int(gap.gap_start.value // 10**6) + 1
+        end_ms = int(gap.gap_end.value // 10**6) - 1
+        logger.info(f"Refetching {idx}/{len(gaps)}: {gap.symbol} {gap.gap_start} -> {gap.gap_end} ({gap.missing}h)")
+
+        try:
+            recovered.append(fetch_funding_history(gap.symbol, start_ms, end_time=end_ms))
+        except Exception as e:
+            logger.error(f"  Failed to refetch gap for {gap.symbol}: {e}")
+
+        if idx < len(gaps):
+            time.sleep(1)
+
+    df = FundingBatch.concat(recovered).to_frame()
+    if df.empty:
+        logger.info("No rows available from the API for the detected gaps.")
+        return df
+
+    # Keep only rows that are genuinely new, so the rollups never double count
+    df = df.drop_duplicates(subset=["symbol", "timestamp"])
+    stored = pd.MultiIndex.from_frame(history[["symbol", "timestamp"]])
+    df = df[~pd.MultiIndex.from_frame(df[["symbol", "timestamp"]]).isin(stored)]
+    if df.empty:
+        logger.info("All refetched rows were already stored.")
+        return df
+
+    get_backend().upsert("funding_history", df)
+    update_rollups("funding_history", df)
+    rebuild_rolling("funding_history")
+    update_matrix_cache("funding_history", df)
+    logger.info(f"Recovered {len(df)} rows into funding history")
 
     return df
@@ -0,0 +1,289 @@
+"""Dense symbols x hours matrices of funding observations, and their memory-mapped cache."""
+
+import os
+import logging
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config import MATRIX_DIR
+from src.backends import get_backend, to_epoch_ms
+from src.fileutil import write_json_atomic, read_json, file_lock
+
+logger = logging.getLogger(__name__)
+
+HOUR_MS = 3600 * 1000
+
+# Value columns cached as matrices
+MATRIX_COLUMNS = ("funding_rate", "premium")
+
+# Bump when the cache layout changes
+MATRIX_VERSION = 1
+
+
+class FundingMatrix(NamedTuple):
+    """
+    One value per symbol per hour on a regular hourly grid.
+
+    `values[i, j]` is the observation for `symbols[i]` in the hour starting
+    `start_ms + j * HOUR_MS`; hours without an observation are NaN.
+    """
+    values: np.ndarray
+    symbols: List[str]
+    start_ms: int
+
+    @property
+    def hours(self) -> pd.DatetimeIndex:
+        """Start of each column's hour (UTC)."""
+        return pd.DatetimeIndex(
+            self.start_ms + np.arange(self.values.shape[1], dtype=np.int64) * HOUR_MS,
+            dtype=pd.DatetimeTZDtype("ms", "UTC")
+        )
+
+    def rows(self, symbols: Sequence[str]) -> "FundingMatrix":
+        """
+        The rows for `symbols`, in that order (unknown symbols are skipped).
+
+        A view when the rows are evenly spaced (e.g. one symbol, or a run of
+        neighbours); otherwise the selected rows are copied.
+        """
+        position = {symbol: i for i, symbol in enumerate(self.symbols)}
+        keep = [symbol for symbol in symbols if symbol in position]
+        return FundingMatrix(_take_rows(self.values, [position[s] for s in keep]), keep, self.start_ms)
+
+
+def _take_rows(values: np.ndarray, positions: List[int]) -> np.ndarray:
+    """values[positions], as a strided view when the positions form an arithmetic sequence."""
+    if len(positions) == 1:
+        return values[positions[0]:positions[0] + 1]
+    step = positions[1] - positions[0] if len(positions) > 1 else 0
+    if step > 0 and positions == list(range(positions[0], positions[-1] + 1, step)):
+        return values[positions[0]:positions[-1] + 1:step]
+    return values[positions]
+
+
+def dense_matrix(
+    df: pd.DataFrame,
+    column: str = "funding_rate",
+    symbols: Optional[Sequence[str]] = None,
+    dtype: type = np.float64
+) -> FundingMatrix:
+    """
+    Scatter long-format rows into a dense symbols x hours matrix.
+
+    Timestamps are floored to the hour; if a symbol has several rows in one
+    hour the last one wins.
+
+    Args:
+        df: Rows with timestamp, symbol and `column`
+        column: Value column to place in the matrix
+        symbols: Row order (defaults to the sorted symbols present in df)
+        dtype: Matrix dtype
+
+    Returns:
+        FundingMatrix covering the first to the last hour present in df
+    """
+    if symbols is None:
+        symbols = sorted(df["symbol"].unique().tolist())
+    symbols = list(symbols)
+    if df.empty:
+        return FundingMatrix(np.empty((len(symbols), 0), dtype=dtype), symbols, 0)
+
+    times = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True).dt.as_unit("ms").array.asi8
+    hours = times // HOUR_MS
+    start = int(hours.min())
+
+    values = np.full((len(symbols), int(hours.max()) - start + 1), np.nan, dtype=dtype)
+    rows = pd.Index(symbols).get_indexer(df["symbol"])
+    known = rows >= 0
+    values[rows[known], hours[known] - start] = df[column].to_numpy(dtype=np.float64)[known]
+
+    return FundingMatrix(values, symbols, start * HOUR_MS)
+
+
+def _epoch_hour(value) -> int:
+    """Hours since the epoch of a datetime-like (naive values are UTC)."""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts
+    return int(ts.value // 10**6 // HOUR_MS)
+
+
+def _matrix_file(source: str, column: str) -> str:
+    return os.path.join(MATRIX_DIR, f"{source}_{column}.npy")
+
+
+def _index_file(source: str) -> str:
+    """Sidecar with the row (symbol) and column (hour) index of the cached matrices."""
+    return os.path.join(MATRIX_DIR, f"{source}_index.json")
+
+
+def _lock_file(source: str) -> str:
+    return os.path.join(MATRIX_DIR, f"{source}.lock")
+
+
+def _allocate(path: str, hours: int, n_symbols: int, existing: Optional[np.ndarray] = None) -> None:
+    """
+    Create a NaN-filled hours x symbols float32 .npy file, copying `existing` into its first rows.
+
+    Written beside the target and moved over it, so readers holding a map of
+    the old file keep a consistent (if stale) view.
+    """
+    tmp_path = f"{path}.tmp"
+    values = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(hours, n_symbols))
+    values[:] = np.nan
+    if existing is not None:
+        values[:existing.shape[0], :existing.shape[1]] = existing
+    values.flush()
+    del values
+    os.replace(tmp_path, path)
+
+
+def _scatter(source: str, index: dict, df: pd.DataFrame) -> None:
+    """Write rows into the cached matrices in place; they must fit the current index and capacity."""
+    times = to_epoch_ms(df["timestamp"]).to_numpy()
+    hours = times // HOUR_MS - index["start_ms"] // HOUR_MS
+    columns = pd.Index(index["symbols"]).get_indexer(df["symbol"])
+
+    for column in MATRIX_COLUMNS:
+        if column not in df:
+            continue
+        values = np.load(_matrix_file(source, column), mmap_mode="r+")
+        values[hours, columns] = df[column].to_numpy(dtype=np.float32)
+        values.flush()
+        del values
+
+
+def _rebuild(source: str, df: Optional[pd.DataFrame] = None) -> dict:
+    """Rebuild the cache of `source` and return its new index. Call with the cache's lock held."""
+    version = get_backend().version(source)
+    if df is None:
+        df = get_backend().read(source, columns=["timestamp", "symbol", *MATRIX_COLUMNS])
+
+    if df.empty:
+        symbols, start_ms, hours = [], 0, 0
+    else:
+        times = to_epoch_ms(df["timestamp"])
+        symbols = sorted(df["symbol"].unique().tolist())
+        start_ms = int(times.min()) // HOUR_MS * HOUR_MS
+        hours = int(times.max()) // HOUR_MS - start_ms // HOUR_MS + 1
+
+    index = {
+        "version": MATRIX_VERSION,
+        "symbols": symbols,
+        "start_ms": start_ms,
+        "hours": hours,
+        "capacity": hours,
+        "source_version": version,
+    }
+    for column in MATRIX_COLUMNS:
+        _allocate(_matrix_file(source, column), hours, len(symbols))
+    if not df.empty:
+        _scatter(source, index, df)
+    write_json_atomic(_index_file(source), index)
+
+    logger.info(f"Rebuilt {source} matrix cache: {len(symbols)} symbols x {hours} hours")
+    return index
+
+
+def rebuild_matrix_cache(source: str = "funding_history", df: Optional[pd.DataFrame] = None) -> None:
+    """
+    Rebuild the cached hourly matrices of a raw dataset from scratch.
+
+    Args:
+        source: Raw dataset name
+        df: The full raw dataset (read from storage if None)
+    """
+    with file_lock(_lock_file(source)):
+        _rebuild(source, df)
+
+
+def update_matrix_cache(source: str, new_rows: pd.DataFrame) -> None:
+    """
+    Write newly ingested rows into the cached matrices.
+
+    New hours after the cached range are appended in place; when they run
+    past the allocated capacity the files are regrown to twice the size, so
+    appending an hour at a time is amortized O(symbols). Rows for a new
+    symbol or an hour before the cached range trigger a full rebuild.
+
+    Args:
+        source: Raw dataset the rows belong to
+        new_rows: Newly stored rows with timestamp, symbol, funding_rate, premium
+    """
+    if new_rows.empty:
+        return
+
+    times = to_epoch_ms(new_rows["timestamp"])
+    with file_lock(_lock_file(source)):
+        index = read_json(_index_file(source))
+        if (
+            index is None or index.get("version") != MATRIX_VERSION or not index["symbols"]
+            or not set(new_rows["symbol"].unique()) <= set(index["symbols"])
+            or int(times.min()) < index["start_ms"]
+        ):
+            _rebuild(source)
+            return
+
+        hours = int(times.max()) // HOUR_MS - index["start_ms"] // HOUR_MS + 1
+        if hours > index["capacity"]:
+            capacity = max(hours, 2 * index["capacity"])
+            for column in MATRIX_COLUMNS:
+                path = _matrix_file(source, column)
+                _allocate(path, capacity, len(index["symbols"]), np.load(path, mmap_mode="r")[:index["hours"]])
+            index["capacity"] = capacity
+
+        _scatter(source, index, new_rows)
+        index["hours"] = max(index["hours"], hours)
+        index["source_version"] = get_backend().version(source)
+        write_json_atomic(_index_file(source), index)
+
+
+def load_matrix(
+    source: str = "funding_history",
+    column: str = "funding_rate",
+    symbols: Optional[Sequence[str]] = None,
+    start=None,
+    end=None
+) -> FundingMatrix:
+    """
+    Slice the cached hourly matrix of a raw dataset, rebuilding the cache if it is stale.
+
+    The cache is stored hours x symbols, so a time range is a contiguous
+    block of the memory map and the returned symbols x hours matrix is a
+    transposed view of it: nothing is copied or pivoted, and pages are read
+    from disk only when touched. Symbol subsets are views too when evenly
+    spaced in the (sorted) symbol index, otherwise just those rows are copied.
+
+    Args:
+        source: Raw dataset name
+        column: "funding_rate" or "premium"
+        symbols: Symbols to keep, in this order (None = all)
+        start: Inclusive lower time bound
+        end: Inclusive upper time bound
+
+    Returns:
+        Read-only float32 FundingMatrix; missing hours are NaN
+    """
+    # The index and the files it describes are read under the cache's lock,
+    # so a concurrent rebuild cannot swap in files with other symbols between
+    # the two. Once mapped, the files stay valid even if they are replaced.
+    with file_lock(_lock_file(source)):
+        index = read_json(_index_file(source))
+        if (
+            index is None or index.get("version") != MATRIX_VERSION
+            or index["source_version"] != get_backend().version(source)
+        ):
+            # Missing, or the dataset was written without updating the cache
+            index = _rebuild(source)
+
+        values = np.load(_matrix_file(source, column), mmap_mode="r")
+    first_hour = index["start_ms"] // HOUR_MS
+    begin, stop = 0, index["hours"]
+    if start is not None:
+        begin = min(max(_epoch_hour(start) - first_hour, 0), stop)
+    if end is not None:
+        stop = max(min(_epoch_hour(end) - first_hour + 1, stop), begin)
+
+    matrix = FundingMatrix(values[begin:stop].T, index["symbols"], index["start_ms"] + begin * HOUR_MS)
+    return matrix if symbols is None else matrix.rows(symbols)
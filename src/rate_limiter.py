@@ -0,0 +1,61 @@
+"""Thread-safe token bucket for staying inside the API request-weight budget."""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every worker that talks to the API.
+
+    Tokens refill continuously at `rate_per_second` up to `capacity`. Callers
+    block in `acquire` until enough weight is available, and can `charge` extra
+    weight after the fact for costs that are only known once a response arrives
+    (the bucket may go negative, which delays the next acquire).
+    """
+
+    def __init__(self, capacity: float, rate_per_second: float):
+        self.capacity = float(capacity)
+        self.rate_per_second = float(rate_per_second)
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, weight_per_minute: float, burst: float) -> "TokenBucket":
+        """Create a bucket from a per-minute weight budget."""
+        return cls(capacity=burst, rate_per_second=weight_per_minute / 60.0)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._last_refill = now
+
+    def acquire(self, weight: float = 1.0) -> None:
+        """Block until `weight` tokens are available, then take them."""
+        weight = min(float(weight), self.capacity)
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = (weight - self._tokens) / self.rate_per_second
+            time.sleep(wait)
+
+    def charge(self, weight: float) -> None:
+        """Take `weight` tokens without blocking."""
+        if weight <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= weight
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available (may be negative after a charge)."""
+        with self._lock:
+            self._refill()
+            return self._tokens
@@ -0,0 +1,352 @@
+"""Rolling funding rate statistics, in batch and as O(1) incremental state."""
+
+import os
+import math
+import logging
+from collections import deque
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from config import ROLLING_WINDOWS, ROLLING_DIR
+from src.backends import get_backend, to_epoch_ms, from_epoch_ms
+from src.fileutil import write_json_atomic, read_json
+
+logger = logging.getLogger(__name__)
+
+HOUR_MS = 3600 * 1000
+
+# Bump when the persisted engine state format changes
+STATE_VERSION = 3
+
+
+def rolling_dataset(source: str) -> str:
+    """Dataset name holding rolling stats of `source` (e.g. funding_history_rolling)."""
+    return f"{source}_rolling"
+
+
+def _state_file(source: str) -> str:
+    """State metadata (format version and windows), written once the per-symbol files are complete."""
+    return os.path.join(ROLLING_DIR, f"{source}_state.json")
+
+
+def _state_dir(source: str) -> str:
+    return os.path.join(ROLLING_DIR, f"{source}_state")
+
+
+def _symbol_state_file(source: str, symbol: str) -> str:
+    return os.path.join(_state_dir(source), f"{quote(symbol, safe='')}.json")
+
+
+def _halflife_hours(hours: int) -> float:
+    """Half-life giving the same per-hour decay as a span-`hours` EWMA."""
+    return math.log(0.5) / math.log(1 - 2.0 / (hours + 1))
+
+
+def compute_rolling_stats(df: pd.DataFrame, windows: Dict[str, int] = ROLLING_WINDOWS) -> pd.DataFrame:
+    """
+    Compute rolling mean, std, EWMA and z-score per symbol for every window.
+
+    Windows are measured in time, not rows: a 30d window holds whatever
+    observations fall in the trailing 30 days, so missing hours do not
+    stretch it. The EWMA decays with elapsed time for the same reason. Uses
+    pandas' grouped rolling/ewm kernels, so no Python code runs per group.
+
+    Args:
+        df: Rows with timestamp, symbol, funding_rate
+        windows: Window name -> length in hours
+
+    Returns:
+        DataFrame with timestamp, symbol and one <stat>_<window> column per
+        stat and window, sorted by symbol and timestamp
+    """
+    df = df[["timestamp", "symbol", "funding_rate"]].copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    df = df.sort_values(["symbol", "timestamp"]).reset_index(drop=True)
+
+    by_time = df.set_index("timestamp").groupby("symbol", sort=False)["funding_rate"]
+    grouped = df.groupby("symbol", sort=False)["funding_rate"]
+    out = df[["timestamp", "symbol"]].copy()
+
+    for name, hours in windows.items():
+        rolling = by_time.rolling(f"{hours}h", min_periods=1)
+        mean = pd.Series(rolling.mean().to_numpy(), index=df.index)
+        std = pd.Series(rolling.std().to_numpy(), index=df.index)
+        ewma = grouped.ewm(
+            halflife=pd.Timedelta(hours=_halflife_hours(hours)),
+            times=df["timestamp"]
+        ).mean().reset_index(level=0, drop=True)
+
+        out[f"mean_{name}"] = mean
+        out[f"std_{name}"] = std
+        out[f"ewma_{name}"] = ewma
+        out[f"zscore_{name}"] = ((df["funding_rate"] - mean) / std).replace([np.inf, -np.inf], np.nan)
+
+    return out
+
+
+class WindowState:
+    """
+    Running state for one symbol and one time window.
+
+    Keeps the (time, value) pairs inside the window plus their sum and sum of
+    squares. Each update appends one pair and evicts the ones that aged out,
+    so the amortized cost is O(1). The sums are re-derived from the buffer
+    every RESYNC_EVERY updates to stop floating-point drift from accumulating.
+    """
+
+    RESYNC_EVERY = 1000
+
+    __slots__ = ("span_ms", "halflife_ms", "buffer", "total", "total_sq",
+                 "ewm_num", "ewm_den", "last_time", "updates")
+
+    def __init__(self, hours: int, buffer=(), ewm_num: float = 0.0, ewm_den: float = 0.0,
+                 last_time: Optional[int] = None):
+        self.span_ms = hours * HOUR_MS
+        self.halflife_ms = _halflife_hours(hours) * HOUR_MS
+        self.buffer = deque((int(t), float(v)) for t, v in buffer)
+        self.total = math.fsum(v for _, v in self.buffer)
+        self.total_sq = math.fsum(v * v for _, v in self.buffer)
+        self.ewm_num = ewm_num
+        self.ewm_den = ewm_den
+        self.last_time = last_time
+        self.updates = 0
+
+    def update(self, time_ms: int, value: float) -> Dict[str, float]:
+        """Add one observation and return the window's mean, std, ewma and z-score."""
+        cutoff = time_ms - self.span_ms
+        while self.buffer and self.buffer[0][0] <= cutoff:
+            _, old = self.buffer.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        self.buffer.append((time_ms, value))
+        self.total += value
+        self.total_sq += value * value
+
+        self.updates += 1
+        if self.updates % self.RESYNC_EVERY == 0:
+            self.total = math.fsum(v for _, v in self.buffer)
+            self.total_sq = math.fsum(v * v for _, v in self.buffer)
+
+        # Time-decayed EWMA (matches pandas ewm(halflife=..., times=...))
+        decay = 0.0 if self.last_time is None else 0.5 ** ((time_ms - self.last_time) / self.halflife_ms)
+        self.ewm_num = value + decay * self.ewm_num
+        self.ewm_den = 1.0 + decay * self.ewm_den
+        self.last_time = time_ms
+
+        n = len(self.buffer)
+        mean = self.total / n
+        std = math.nan
+        if n > 1:
+            variance = (self.total_sq - n * mean * mean) / (n - 1)
+            # Treat variance lost in rounding error as exactly zero
+            std = math.sqrt(variance) if variance > 1e-12 * mean * mean else 0.0
+        zscore = (value - mean) / std if std and not math.isnan(std) else math.nan
+
+        return {"mean": mean, "std": std, "ewma": self.ewm_num / self.ewm_den, "zscore": zscore}
+
+    def to_dict(self) -> dict:
+        return {
+            "buffer": [list(pair) for pair in self.buffer],
+            "ewm_num": self.ewm_num,
+            "ewm_den": self.ewm_den,
+            "last_time": self.last_time,
+        }
+
+    @classmethod
+    def from_dict(cls, hours: int, data: dict) -> "WindowState":
+        return cls(hours, data["buffer"], data["ewm_num"], data["ewm_den"], data["last_time"])
+
+
+class RollingEngine:
+    """
+    Per-symbol incremental rolling statistics.
+
+    Observations at or before a symbol's last seen time are ignored, so
+    replaying rows that were already processed is harmless.
+    """
+
+    def __init__(self, windows: Dict[str, int] = ROLLING_WINDOWS):
+        self.windows = dict(windows)
+        self.states: Dict[str, Dict[str, WindowState]] = {}
+        self.last_time: Dict[str, int] = {}
+
+    def _symbol_states(self, symbol: str) -> Dict[str, WindowState]:
+        if symbol not in self.states:
+            self.states[symbol] = {name: WindowState(hours) for name, hours in self.windows.items()}
+        return self.states[symbol]
+
+    def update(self, symbol: str, time_ms: int, value: float) -> Optional[Dict[str, float]]:
+        """
+        Feed one observation for a symbol.
+
+        Returns:
+            Dict of <stat>_<window> -> value, or None if the observation was
+            not newer than the last one seen for the symbol
+        """
+        if time_ms <= self.last_time.get(symbol, -1):
+            return None
+        self.last_time[symbol] = time_ms
+
+        result = {}
+        for name, state in self._symbol_states(symbol).items():
+            for stat, stat_value in state.update(time_ms, value).items():
+                result[f"{stat}_{name}"] = stat_value
+        return result
+
+    def update_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Feed a batch of rows in time order.
+
+        Returns:
+            Rolling stats for the rows that were new, in the same layout as
+            compute_rolling_stats
+        """
+        df = df.assign(time=to_epoch_ms(df["timestamp"])).sort_values(["time", "symbol"])
+
+        records = []
+        for symbol, time_ms, value in zip(df["symbol"], df["time"], df["funding_rate"]):
+            stats = self.update(symbol, int(time_ms), float(value))
+            if stats is not None:
+                records.append({"time": int(time_ms), "symbol": symbol, **stats})
+
+        if not records:
+            return pd.DataFrame(columns=["timestamp", "symbol"])
+
+        out = pd.DataFrame.from_records(records)
+        out.insert(0, "timestamp", from_epoch_ms(out.pop("time")))
+        return out
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, windows: Dict[str, int] = ROLLING_WINDOWS) -> "RollingEngine":
+        """
+        Seed engine state from a full raw history without replaying it row by row.
+
+        Args:
+            df: Raw rows with timestamp, symbol, funding_rate
+        """
+        engine = cls(windows)
+        df = df.assign(time=to_epoch_ms(df["timestamp"])).sort_values(["symbol", "time"])
+
+        for symbol, rows in df.groupby("symbol", sort=False):
+            times = rows["time"].to_numpy()
+            values = rows["funding_rate"].to_numpy(dtype="float64")
+            last = int(times[-1])
+            engine.last_time[symbol] = last
+
+            states = {}
+            for name, hours in windows.items():
+                inside = times > last - hours * HOUR_MS
+                state = WindowState(hours, zip(times[inside], values[inside]))
+                # EWMA numerator/denominator are decay-weighted sums over all history
+                weights = 0.5 ** ((last - times) / state.halflife_ms)
+                state.ewm_num = float(np.dot(weights, values))
+                state.ewm_den = float(weights.sum())
+                state.last_time = last
+                states[name] = state
+            engine.states[symbol] = states
+
+        return engine
+
+    def symbol_to_dict(self, symbol: str) -> dict:
+        """Serialize one symbol's state."""
+        return {
+            "last_time": self.last_time[symbol],
+            "states": {name: state.to_dict() for name, state in self.states[symbol].items()},
+        }
+
+    def load_symbol(self, symbol: str, data: dict) -> None:
+        """Restore one symbol's state from symbol_to_dict output."""
+        self.last_time[symbol] = int(data["last_time"])
+        self.states[symbol] = {
+            name: WindowState.from_dict(self.windows[name], state) for name, state in data["states"].items()
+        }
+
+
+def _save_symbol_states(source: str, engine: RollingEngine, symbols: Iterable[str]) -> None:
+    for symbol in symbols:
+        write_json_atomic(_symbol_state_file(source, symbol), engine.symbol_to_dict(symbol))
+
+
+def _load_symbol_states(source: str, symbols: Iterable[str]) -> RollingEngine:
+    """Load the state of just the given symbols; symbols without a file start empty."""
+    engine = RollingEngine(ROLLING_WINDOWS)
+    for symbol in symbols:
+        data = read_json(_symbol_state_file(source, symbol))
+        if data is not None:
+            engine.load_symbol(symbol, data)
+    return engine
+
+
+def rebuild_rolling(source: str, df: Optional[pd.DataFrame] = None) -> None:
+    """
+    Recompute and persist rolling stats for a raw dataset, and reseed its engine state.
+
+    Args:
+        source: Raw dataset name ("funding_history" or "funding_rates")
+        df: The full raw dataset (read from storage if None)
+    """
+    if df is None:
+        df = get_backend().read(source, columns=["timestamp", "symbol", "funding_rate"])
+
+    stats = compute_rolling_stats(df)
+    get_backend().write(rolling_dataset(source), stats)
+
+    # Drop the metadata first so a crash part-way through forces another rebuild
+    meta_path = _state_file(source)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    state_dir = _state_dir(source)
+    if os.path.isdir(state_dir):
+        for name in os.listdir(state_dir):
+            os.remove(os.path.join(state_dir, name))
+
+    engine = RollingEngine.from_history(df)
+    _save_symbol_states(source, engine, engine.states)
+    write_json_atomic(meta_path, {"version": STATE_VERSION, "windows": ROLLING_WINDOWS})
+
+    logger.info(f"Rebuilt {source} rolling stats from {len(df)} rows")
+
+
+def update_rolling(source: str, new_rows: pd.DataFrame) -> None:
+    """
+    Advance the persisted rolling state with newly ingested rows.
+
+    Each new observation costs O(1) per window; the resulting stats are
+    appended to the rolling dataset so readers never recompute them. State is
+    kept in one file per symbol, and only the symbols in `new_rows` are read
+    and rewritten.
+
+    Args:
+        source: Raw dataset the rows belong to
+        new_rows: Newly appended rows with timestamp, symbol, funding_rate
+    """
+    if new_rows.empty:
+        return
+
+    meta = read_json(_state_file(source))
+    if meta is None or meta.get("version") != STATE_VERSION or meta["windows"] != ROLLING_WINDOWS:
+        # No usable state yet (or the windows changed): start from stored data
+        rebuild_rolling(source)
+        return
+
+    symbols = new_rows["symbol"].unique().tolist()
+    engine = _load_symbol_states(source, symbols)
+    stats = engine.update_frame(new_rows)
+
+    if not stats.empty:
+        get_backend().append(rolling_dataset(source), stats)
+    _save_symbol_states(source, engine, symbols)
+
+
+def load_rolling_stats(
+    source: str,
+    columns=None,
+    symbols=None,
+    start=None,
+    end=None
+) -> pd.DataFrame:
+    """Read persisted rolling stats, with the same filters as StorageBackend.read."""
+    return get_backend().read(rolling_dataset(source), columns=columns, symbols=symbols, start=start, end=end)
@@ -0,0 +1,235 @@
+"""Materialized daily and weekly funding rate rollups per symbol."""
+
+import logging
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.backends import get_backend, to_epoch_ms, ROLLUP_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("daily", "weekly")
+
+
+def rollup_dataset(source: str, period: str) -> str:
+    """Dataset name holding `period` rollups of `source` (e.g. funding_history_daily)."""
+    return f"{source}_{period}"
+
+
+def _bucket_start(timestamps: pd.Series, period: str) -> pd.Series:
+    """Start of the UTC day, or of the Monday-based week, each timestamp falls in."""
+    days = timestamps.dt.floor("D")
+    if period == "daily":
+        return days
+    return days - pd.to_timedelta(days.dt.dayofweek, unit="D")
+
+
+def compute_rollups(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    Aggregate raw funding rows into one row per symbol per bucket.
+
+    Args:
+        df: Rows with timestamp, symbol, funding_rate
+        period: "daily" or "weekly"
+
+    Returns:
+        DataFrame with ROLLUP_COLUMNS
+    """
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    rates = df["funding_rate"].astype("float64")
+
+    work = pd.DataFrame({
+        "timestamp": _bucket_start(timestamps, period),
+        "symbol": df["symbol"].values,
+        "value": rates.values,
+        "sq": rates.values ** 2,
+        "nz": (rates.values != 0).astype("int64"),
+        "time": to_epoch_ms(timestamps).values,
+    })
+
+    grouped = work.groupby(["symbol", "timestamp"], sort=True)
+    rollups = grouped.agg(
+        count=("value", "size"),
+        sum=("value", "sum"),
+        sum_sq=("sq", "sum"),
+        min=("value", "min"),
+        max=("value", "max"),
+        nonzero=("nz", "sum"),
+        first_time=("time", "min"),
+        last_time=("time", "max"),
+    ).reset_index()
+
+    return rollups[ROLLUP_COLUMNS]
+
+
+def merge_rollups(existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combine two sets of rollups covering the same or overlapping buckets.
+
+    Counts and sums add, min/max and first/last times take the extremes.
+    Both inputs must come from disjoint sets of raw rows.
+    """
+    if existing.empty:
+        return new[ROLLUP_COLUMNS]
+
+    combined = pd.concat([existing[ROLLUP_COLUMNS], new[ROLLUP_COLUMNS]], ignore_index=True)
+    merged = combined.groupby(["symbol", "timestamp"], sort=True).agg(
+        count=("count", "sum"),
+        sum=("sum", "sum"),
+        sum_sq=("sum_sq", "sum"),
+        min=("min", "min"),
+        max=("max", "max"),
+        nonzero=("nonzero", "sum"),
+        first_time=("first_time", "min"),
+        last_time=("last_time", "max"),
+    ).reset_index()
+
+    return merged[ROLLUP_COLUMNS]
+
+
+def update_rollups(source: str, new_rows: pd.DataFrame) -> None:
+    """
+    Fold newly ingested raw rows into the stored daily and weekly rollups.
+
+    Only the buckets touched by `new_rows` are read back and rewritten. The
+    rows must not have been folded in before (the ingest paths only pass
+    rows that were just appended).
+
+    Args:
+        source: Raw dataset the rows belong to ("funding_history" or "funding_rates")
+        new_rows: Newly appended rows with timestamp, symbol, funding_rate
+    """
+    if new_rows.empty:
+        return
+
+    backend = get_backend()
+
+    for period in PERIODS:
+        dataset = rollup_dataset(source, period)
+        partial = compute_rollups(new_rows, period)
+
+        existing = backend.read(
+            dataset,
+            symbols=partial["symbol"].unique().tolist(),
+            start=partial["timestamp"].min(),
+        )
+        touched = existing.merge(partial[["symbol", "timestamp"]], on=["symbol", "timestamp"])
+
+        backend.upsert(dataset, merge_rollups(touched, partial))
+
+    logger.info(f"Updated {source} rollups with {len(new_rows)} rows")
+
+
+def rebuild_rollups(source: str, df: Optional[pd.DataFrame] = None) -> None:
+    """
+    Recompute the daily and weekly rollups of a raw dataset from scratch.
+
+    Args:
+        source: Raw dataset name
+        df: The full raw dataset (read from storage if None)
+    """
+    backend = get_backend()
+    if df is None:
+        df = backend.read(source, columns=["timestamp", "symbol", "funding_rate"])
+
+    for period in PERIODS:
+        backend.write(rollup_dataset(source, period), compute_rollups(df, period))
+
+    logger.info(f"Rebuilt {source} rollups from {len(df)} rows")
+
+
+def load_rollups(
+    source: str,
+    period: str = "daily",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Read stored rollups, optionally limited to buckets within a date range.
+
+    Returns:
+        DataFrame with ROLLUP_COLUMNS
+    """
+    start = pd.Timestamp(start_date, tz="UTC") if start_date is not None else None
+    end = pd.Timestamp(end_date, tz="UTC") if end_date is not None else None
+    return get_backend().read(rollup_dataset(source, period), start=start, end=end)
+
+
+def query_rollups(
+    source: str,
+    period: Optional[str] = "daily",
+    symbols: Optional[List[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> pd.DataFrame:
+    """
+    Aggregate a raw dataset inside the storage backend (see StorageBackend.aggregate).
+
+    The result has the same columns as stored rollups but is computed from
+    the raw rows at query time, so it is never stale. Only valid for
+    backends with `supports_aggregation`.
+
+    Args:
+        source: Raw dataset name
+        period: "daily", "weekly", or None for one row per symbol
+        symbols: Symbols to include (None = all)
+        start_date: First UTC date to include
+        end_date: Last UTC date to include (the whole day)
+
+    Returns:
+        DataFrame with ROLLUP_COLUMNS
+    """
+    start = pd.Timestamp(start_date, tz="UTC") if start_date is not None else None
+    end = None
+    if end_date is not None:
+        end = pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+    return get_backend().aggregate(source, period, symbols=symbols, start=start, end=end)
+
+
+def range_stats(rollups: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-symbol stats over all buckets in `rollups`, without touching raw rows.
+
+    Returns:
+        DataFrame indexed by symbol with: count, mean, std (sample), min, max,
+        activity (fraction of non-zero observations)
+    """
+    totals = rollups.groupby("symbol").agg(
+        count=("count", "sum"),
+        sum=("sum", "sum"),
+        sum_sq=("sum_sq", "sum"),
+        min=("min", "min"),
+        max=("max", "max"),
+        nonzero=("nonzero", "sum"),
+    )
+
+    n = totals["count"].astype("float64")
+    mean = totals["sum"] / n
+    variance = (totals["sum_sq"] - n * mean ** 2) / (n - 1)
+    std = np.sqrt(variance.clip(lower=0)).where(n > 1)
+
+    return pd.DataFrame({
+        "count": totals["count"],
+        "mean": mean,
+        "std": std,
+        "min": totals["min"],
+        "max": totals["max"],
+        "activity": totals["nonzero"] / n,
+    })
+
+
+def bucket_means(rollups: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mean funding rate per symbol per bucket, pivoted as symbols x buckets.
+
+    Returns:
+        DataFrame indexed by symbol with one column per bucket start
+    """
+    means = rollups.assign(mean=rollups["sum"] / rollups["count"])
+    return means.pivot(index="symbol", columns="timestamp", values="mean")
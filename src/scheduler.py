@@ -1,13 +1,20 @@
 """Scheduler for periodic data collection."""
 
+import math
 import time
+import random
 import logging
-import schedule
-from datetime import datetime
+import threading
+from typing import Callable, Dict, Optional
 
-from config import COLLECTION_INTERVAL_HOURS, MAX_RETRIES, RETRY_DELAY_SECONDS
+from config import (
+    COLLECTION_INTERVAL_SECONDS, COLLECTION_JITTER_SECONDS, MAX_RETRIES, RETRY_DELAY_SECONDS,
+    EXPORT_STOP_TIMEOUT_SECONDS,
+)
+from src.exporters import ExportQueue, default_exporters
 from src.fetcher import fetch_funding_rates
-from src.storage import save_funding_rates
+from src.segment_log import LogCompactor
+from src.storage import save_funding_rates, compact_funding_log
 
 # Configure logging
 logging.basicConfig(
@@ -17,68 +24,266 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def collect_funding_rates(use_sheets: bool = False) -> bool:
+class TickStats:
+    """Per-tick lateness, duration and outcome counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+
+    def record(self, lateness: float, duration: float, ok: bool = True) -> None:
+        with self._lock:
+            self.ticks += 1
+            self.failures += 0 if ok else 1
+            self.total_lateness += lateness
+            self.max_lateness = max(self.max_lateness, lateness)
+            self.total_duration += duration
+            self.max_duration = max(self.max_duration, duration)
+
+    def record_skipped(self, count: int) -> None:
+        with self._lock:
+            self.skipped += count
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Snapshot of the counters.
+
+        Returns:
+            Dict with: ticks, failures, skipped, mean_lateness_ms,
+            max_lateness_ms, mean_duration_ms, max_duration_ms
+        """
+        with self._lock:
+            n = self.ticks or 1
+            return {
+                "ticks": self.ticks,
+                "failures": self.failures,
+                "skipped": self.skipped,
+                "mean_lateness_ms": self.total_lateness / n * 1000,
+                "max_lateness_ms": self.max_lateness * 1000,
+                "mean_duration_ms": self.total_duration / n * 1000,
+                "max_duration_ms": self.max_duration * 1000,
+            }
+
+
+class IntervalScheduler:
+    """
+    Run a job every `interval` seconds, aligned to wall-clock boundaries.
+
+    Ticks fall on multiples of the interval since the epoch (the top of the
+    hour for 3600, :00/:10/:20... for 10). The wall clock is read once to
+    find the first boundary; after that every tick time is the anchor plus a
+    whole number of intervals on the monotonic clock, so neither slow jobs
+    nor sleep overshoot accumulate into drift, and wall-clock steps (NTP)
+    cannot cause double or missed runs.
+
+    Each tick may be delayed by a random `jitter` of up to that many seconds,
+    drawn independently per tick so it never accumulates. Jobs run on the
+    scheduler thread; if one overruns the next tick, the missed ticks are
+    skipped (and counted) rather than run back-to-back.
+
+    The job receives the monotonic deadline of the next tick, so it can stop
+    retrying in time. With `run_immediately`, the first run's deadline is
+    the first boundary, and that boundary is skipped if the first run was
+    still going when it passed.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[float], bool],
+        interval: float = COLLECTION_INTERVAL_SECONDS,
+        jitter: float = COLLECTION_JITTER_SECONDS,
+        run_immediately: bool = True
+    ):
+        if interval <= 0:
+            raise ValueError(f"Interval must be positive, got {interval}")
+        self.job = job
+        self.interval = float(interval)
+        self.jitter = max(float(jitter), 0.0)
+        self.run_immediately = run_immediately
+        self.stats = TickStats()
+        self._stop = threading.Event()
+
+    def _anchor(self) -> float:
+        """Monotonic time of the next wall-clock interval boundary."""
+        wall, mono = time.time(), time.monotonic()
+        boundary = math.ceil(wall / self.interval) * self.interval
+        return mono + (boundary - wall)
+
+    def stop(self) -> None:
+        """Ask `run` to return once the current tick (if any) has finished."""
+        self._stop.set()
+
+    @property
+    def stop_event(self) -> threading.Event:
+        """Set once `stop` is called; jobs wait on it instead of sleeping so they end promptly."""
+        return self._stop
+
+    def run(self, max_ticks: Optional[int] = None) -> None:
+        """
+        Run ticks until `stop` is called (or `max_ticks` have run).
+
+        Args:
+            max_ticks: Stop after this many ticks (None = run forever)
+        """
+        ran = 0
+        anchor = self._anchor()
+        tick = 0
+
+        if self.run_immediately:
+            self._tick(time.monotonic(), 0.0, anchor)
+            ran += 1
+            tick = self._next_tick(anchor, -1)
+
+        while not self._stop.is_set() and (max_ticks is None or ran < max_ticks):
+            due = anchor + tick * self.interval
+            fire_at = due + random.uniform(0, self.jitter)
+            if self._stop.wait(max(fire_at - time.monotonic(), 0)):
+                break
+
+            self._tick(due, fire_at - due, due + self.interval)
+            ran += 1
+            tick = self._next_tick(anchor, tick)
+
+    def _next_tick(self, anchor: float, tick: int) -> int:
+        """Index of the next boundary still ahead; boundaries the job ran past are skipped."""
+        next_tick = max(tick + 1, math.floor((time.monotonic() - anchor) / self.interval) + 1)
+        skipped = next_tick - tick - 1
+        if skipped > 0:
+            self.stats.record_skipped(skipped)
+            logger.warning(f"Collection overran its interval: skipped {skipped} tick(s)")
+        return next_tick
+
+    def _tick(self, due: float, jitter: float, deadline: float) -> None:
+        started = time.monotonic()
+        lateness = max(started - due - jitter, 0.0)
+
+        ok = False
+        try:
+            ok = bool(self.job(deadline))
+        except Exception as e:
+            logger.error(f"Scheduled job failed: {e}")
+
+        duration = time.monotonic() - started
+        self.stats.record(lateness, duration, ok)
+        logger.info(
+            f"Tick {self.stats.ticks}: {'ok' if ok else 'failed'} in {duration * 1000:.0f} ms "
+            f"(started {lateness * 1000:.1f} ms late)"
+        )
+
+
+def collect_funding_rates(
+    use_sheets: bool = False,
+    compactor: Optional[LogCompactor] = None,
+    deadline: Optional[float] = None,
+    exports: Optional[ExportQueue] = None,
+    stop: Optional[threading.Event] = None
+) -> bool:
     """
     Fetch and save funding rates with retry logic.
 
+    Rates are stored locally first; exporters only ever see a batch that is
+    already durable, and never delay the next collection.
+
     Args:
         use_sheets: If True, also write to Google Sheets
+        compactor: Background compactor to hand the logged rates to. If None,
+            they are compacted into storage before returning.
+        deadline: Monotonic time of the next scheduled collection; no retry
+            is started that would run past it
+        exports: Background export queue to hand the rates to. If None and
+            use_sheets is set, they are exported before returning (failures
+            are spooled for the next run).
+        stop: Event that cancels the retry wait when set (e.g. the
+            scheduler's stop_event)
 
     Returns:
-        True if successful, False otherwise
+        True if the rates were stored, False otherwise
     """
     for attempt in range(MAX_RETRIES):
         try:
             logger.info(f"Collecting funding rates (attempt {attempt + 1}/{MAX_RETRIES})")
 
-            rates = fetch_funding_rates()
-            save_funding_rates(rates)
+            # Always a fresh snapshot: at sub-minute intervals a cached one could be a tick old
+            rates = fetch_funding_rates(max_age=0)
+            save_funding_rates(rates, compact=compactor is None)
+            if compactor is not None:
+                compactor.wake()
 
-            logger.info(f"Successfully saved {len(rates)} funding rates to CSV")
-
-            # Also write to Google Sheets if enabled
-            if use_sheets:
-                try:
-                    from src.sheets import append_funding_rates
-                    url = append_funding_rates(rates)
-                    if url:
-                        logger.info(f"Successfully saved to Google Sheets: {url}")
-                except Exception as e:
-                    logger.warning(f"Failed to write to Google Sheets: {e}")
-                    # Don't fail the whole collection if sheets fails
-
-            return True
+            logger.info(f"Successfully logged {len(rates)} funding rates")
+            break
 
         except Exception as e:
             logger.error(f"Error collecting rates: {e}")
 
             if attempt < MAX_RETRIES - 1:
+                if deadline is not None and time.monotonic() + RETRY_DELAY_SECONDS >= deadline:
+                    logger.warning("Not retrying: the next scheduled collection is due first")
+                    return False
                 logger.info(f"Retrying in {RETRY_DELAY_SECONDS} seconds...")
-                time.sleep(RETRY_DELAY_SECONDS)
+                if stop is None:
+                    time.sleep(RETRY_DELAY_SECONDS)
+                elif stop.wait(RETRY_DELAY_SECONDS):
+                    logger.info("Stopping: not retrying")
+                    return False
+    else:
+        logger.error("All retry attempts failed")
+        return False
+
+    if exports is not None:
+        exports.submit(rates)
+    elif use_sheets:
+        ExportQueue(default_exporters(use_sheets)).export_now(rates)
+
+    return True
+
 
-    logger.error("All retry attempts failed")
-    return False
+def run_scheduler(
+    use_sheets: bool = False,
+    interval: float = COLLECTION_INTERVAL_SECONDS,
+    jitter: float = COLLECTION_JITTER_SECONDS
+):
+    """
+    Collect funding rates on a fixed, wall-clock-aligned interval.
 
+    Runs once immediately, then on every interval boundary (hourly by
+    default; 10-60 seconds captures predicted funding between payments).
 
-def run_scheduler(use_sheets: bool = False):
-    """Start the hourly scheduler."""
+    Args:
+        use_sheets: If True, also write to Google Sheets
+        interval: Seconds between collections
+        jitter: Maximum random delay added to each collection, in seconds
+    """
     logger.info("Starting funding rate collector scheduler")
     if use_sheets:
         logger.info("Google Sheets export enabled")
 
-    # Run immediately on start
-    collect_funding_rates(use_sheets=use_sheets)
+    # Merge logged snapshots into storage, and run exporters, off the collection path
+    compactor = LogCompactor(compact_funding_log)
+    compactor.start()
+    exports = ExportQueue(default_exporters(use_sheets))
+    exports.start()
 
-    # Schedule hourly collection
-    schedule.every(COLLECTION_INTERVAL_HOURS).hours.do(
-        collect_funding_rates, use_sheets=use_sheets
+    scheduler = IntervalScheduler(
+        lambda deadline: collect_funding_rates(
+            compactor=compactor, deadline=deadline, exports=exports, stop=scheduler.stop_event
+        ),
+        interval=interval,
+        jitter=jitter
     )
+    logger.info(f"Scheduled to run every {interval:g} second(s), jitter up to {jitter:g} second(s)")
 
-    logger.info(f"Scheduled to run every {COLLECTION_INTERVAL_HOURS} hour(s)")
-
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    try:
+        scheduler.run()
+    finally:
+        exports.stop(timeout=EXPORT_STOP_TIMEOUT_SECONDS)
+        compactor.stop()
+        logger.info(f"Scheduler stats: {scheduler.stats.summary()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,300 @@
+"""Crash-safe, append-only segment log for live funding snapshots."""
+
+import os
+import json
+import zlib
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import SEGMENT_LOG_DIR, COMPACT_INTERVAL_SECONDS
+from src.batch import FundingBatch
+from src.decode import loads
+from src.fileutil import file_lock, fsync_dir
+
+logger = logging.getLogger(__name__)
+
+# Every record is framed as <payload length><crc32 of payload><payload>
+_HEADER = struct.Struct("<II")
+
+ACTIVE_SEGMENT = "active.log"
+
+
+def _encode_batch(batch: FundingBatch) -> bytes:
+    return json.dumps({
+        "time": batch.time.tolist(),
+        "symbol_code": batch.symbol_code.tolist(),
+        "symbols": batch.symbols,
+        "values": {name: column.tolist() for name, column in batch.values.items()},
+    }, separators=(",", ":")).encode()
+
+
+def _frame_record(payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode_batch(payload: bytes) -> FundingBatch:
+    record = loads(payload)
+    return FundingBatch(record["time"], record["symbol_code"], record["symbols"], record["values"])
+
+
+def _scan(path: str, offset: int = 0) -> Tuple[List[bytes], int]:
+    """
+    Read the complete, checksummed records of a segment.
+
+    Args:
+        path: Segment file
+        offset: Byte offset of a record boundary to start reading from
+
+    Returns:
+        Tuple of (record payloads, end offset of the valid prefix). Anything
+        after a truncated or corrupt record is a torn write and is ignored.
+    """
+    payloads = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+
+    valid = 0
+    while valid + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, valid)
+        start = valid + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        payloads.append(payload)
+        valid = start + length
+
+    if valid < len(data):
+        logger.warning(f"Ignoring {len(data) - valid} bytes of incomplete record at the end of {path}")
+    return payloads, offset + valid
+
+
+class SegmentLog:
+    """
+    Write-ahead log of collected batches, split into segment files.
+
+    New batches are appended to the active segment as length-prefixed,
+    CRC-checked records and fsync'd before `append` returns. Rotation seals
+    the active segment by atomically renaming it to a numbered segment, which
+    is never written again. Readers only consume whole records, so a crash
+    mid-append loses at most the batch being written and never exposes a
+    partial row. All mutations hold an exclusive file lock, so overlapping
+    collector processes serialize instead of interleaving writes. Compaction
+    holds that lock only to rotate and to delete segments; compactions are
+    serialized by a second lock, so a slow merge never blocks `append`.
+    """
+
+    def __init__(self, directory: str = SEGMENT_LOG_DIR):
+        self.directory = directory
+        self.active_path = os.path.join(directory, ACTIVE_SEGMENT)
+        self.lock_path = os.path.join(directory, ".lock")
+        self.compact_lock_path = os.path.join(directory, ".compact.lock")
+        # (inode, offset) of the active segment's end as of our last append; bytes
+        # before it are known to be whole records and need no re-checking
+        self._checked: Optional[Tuple[int, int]] = None
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the log's exclusive lock."""
+        with file_lock(self.lock_path):
+            yield
+
+    def append(self, batch: FundingBatch) -> None:
+        """
+        Durably append one batch to the active segment.
+
+        A torn tail left by a crash is truncated first, or the new record
+        would be unreachable. Only bytes written since this process's last
+        append (normally none) are checked, so an append does not rescan the
+        whole segment.
+        """
+        record = _frame_record(_encode_batch(batch))
+
+        with self.locked():
+            os.makedirs(self.directory, exist_ok=True)
+            created = not os.path.exists(self.active_path)
+
+            with open(self.active_path, "ab") as f:
+                size = f.tell()
+                inode = os.fstat(f.fileno()).st_ino
+                checked = 0
+                if self._checked is not None and self._checked[0] == inode and self._checked[1] <= size:
+                    checked = self._checked[1]
+                if checked < size:
+                    _, valid = _scan(self.active_path, checked)
+                    if valid < size:
+                        f.truncate(valid)
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+                self._checked = (inode, f.tell())
+
+            if created:
+                fsync_dir(self.directory)
+
+    def sealed_segments(self) -> List[str]:
+        """Paths of sealed segments, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith("segment-") and name.endswith(".log"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def rotate(self) -> Optional[str]:
+        """
+        Seal the active segment, if it has any records. Call with the lock held.
+
+        Returns:
+            Path of the newly sealed segment, or None
+        """
+        if not os.path.exists(self.active_path) or os.path.getsize(self.active_path) == 0:
+            return None
+
+        sealed = self.sealed_segments()
+        sequence = int(os.path.basename(sealed[-1])[8:-4]) + 1 if sealed else 1
+        path = os.path.join(self.directory, f"segment-{sequence:010d}.log")
+
+        os.replace(self.active_path, path)
+        fsync_dir(self.directory)
+        self._checked = None
+        return path
+
+    @staticmethod
+    def read_segment(path: str) -> List[FundingBatch]:
+        """Batches stored in a segment (whole records only)."""
+        payloads, _ = _scan(path)
+        return [_decode_batch(payload) for payload in payloads]
+
+    def remove(self, paths: List[str]) -> None:
+        """Delete segments whose contents have been compacted. Call with the lock held."""
+        for path in paths:
+            os.remove(path)
+        if paths:
+            fsync_dir(self.directory)
+
+    def compact(self, merge: Callable[[FundingBatch], None]) -> int:
+        """
+        Seal the active segment and hand every sealed segment's rows to `merge`.
+
+        Segments are deleted only after `merge` returns, so a crash during
+        compaction replays them next time; `merge` must therefore ignore rows
+        it has already stored. Sealed segments are never written again, so
+        they are read and merged without the log's lock and appends carry on
+        meanwhile.
+
+        Args:
+            merge: Callback that writes a batch into the columnar store
+
+        Returns:
+            Number of rows passed to `merge`
+        """
+        with file_lock(self.compact_lock_path):
+            with self.locked():
+                self.rotate()
+                segments = self.sealed_segments()
+            if not segments:
+                return 0
+
+            batches = [batch for path in segments for batch in self.read_segment(path)]
+            batch = FundingBatch.concat(batches)
+            if len(batch):
+                merge(batch)
+
+            with self.locked():
+                self.remove(segments)
+
+        logger.info(f"Compacted {len(segments)} segment(s), {len(batch)} rows")
+        return len(batch)
+
+    def _rewrite(self, path: str, batch: FundingBatch) -> None:
+        """Atomically replace a sealed segment's contents with a single batch."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_frame_record(_encode_batch(batch)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        fsync_dir(self.directory)
+
+    def drain(self, export: Callable[[FundingBatch], Any], max_rows: int) -> int:
+        """
+        Hand every logged row to `export`, oldest first, at most `max_rows` rows per call.
+
+        For destinations that cannot ignore rows they already have: each
+        segment is deleted as soon as all of its rows are exported, and if
+        `export` raises, the segment is rewritten without the chunks already
+        sent before the error is re-raised. Only a crash mid-segment re-sends
+        that segment's earlier chunks.
+
+        Args:
+            export: Callback that ships one batch and raises on failure
+            max_rows: Most rows per `export` call
+
+        Returns:
+            Number of rows exported
+        """
+        exported = 0
+        with file_lock(self.compact_lock_path):
+            with self.locked():
+                self.rotate()
+                segments = self.sealed_segments()
+
+            for path in segments:
+                batches = self.read_segment(path)
+                pending = FundingBatch.concat(batches) if batches else None
+                offset = 0
+                try:
+                    while pending is not None and offset < len(pending):
+                        end = min(offset + max_rows, len(pending))
+                        export(pending.take(np.arange(offset, end)))
+                        offset = end
+                except Exception:
+                    if offset:
+                        self._rewrite(path, pending.take(np.arange(offset, len(pending))))
+                    raise
+                with self.locked():
+                    self.remove([path])
+                exported += len(pending) if pending is not None else 0
+
+        if exported:
+            logger.info(f"Drained {len(segments)} segment(s), {exported} rows")
+        return exported
+
+
+class LogCompactor(threading.Thread):
+    """
+    Background thread that compacts the log after each wake-up, or every
+    `interval` seconds regardless, until stopped.
+    """
+
+    def __init__(self, compact: Callable[[], int], interval: float = COMPACT_INTERVAL_SECONDS):
+        super().__init__(name="log-compactor", daemon=True)
+        self.compact = compact
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self) -> None:
+        """Request a compaction as soon as possible."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Stop after any compaction in progress, then compact one last time."""
+        self._stopping.set()
+        self._wake.set()
+        self.join()
+
+    def run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Log compaction failed (segments kept for retry): {e}")
+            if self._stopping.is_set():
+                return
@@ -2,12 +2,17 @@
 
 import os
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 import gspread
+import numpy as np
 from google.oauth2.service_account import Credentials
 
-from config import GOOGLE_CREDENTIALS_FILE, SPREADSHEET_NAME, WORKSHEET_NAME
+from config import (
+    GOOGLE_CREDENTIALS_FILE, SPREADSHEET_NAME, WORKSHEET_NAME, SHEETS_ROTATION, SHEETS_LATEST_WORKSHEET,
+)
+from src.batch import FundingBatch
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +21,10 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive"
 ]
 
+ROTATIONS = (None, "monthly", "monthly_spreadsheet")
+
+HEADERS = ["timestamp", "symbol", "funding_rate", "funding_rate_pct", "annualized_rate", "mark_price"]
+
 
 def get_gspread_client() -> gspread.Client:
     """
@@ -37,7 +46,7 @@ def get_gspread_client() -> gspread.Client:
     return gspread.authorize(creds)
 
 
-def get_or_create_spreadsheet(client: gspread.Client) -> gspread.Spreadsheet:
+def get_or_create_spreadsheet(client: gspread.Client, name: str = SPREADSHEET_NAME) -> gspread.Spreadsheet:
     """
     Get existing spreadsheet or create a new one.
 
@@ -45,11 +54,11 @@ def get_or_create_spreadsheet(client: gspread.Client) -> gspread.Spreadsheet:
         Spreadsheet object
     """
     try:
-        spreadsheet = client.open(SPREADSHEET_NAME)
-        logger.info(f"Opened existing spreadsheet: {SPREADSHEET_NAME}")
+        spreadsheet = client.open(name)
+        logger.info(f"Opened existing spreadsheet: {name}")
     except gspread.SpreadsheetNotFound:
-        spreadsheet = client.create(SPREADSHEET_NAME)
-        logger.info(f"Created new spreadsheet: {SPREADSHEET_NAME}")
+        spreadsheet = client.create(name)
+        logger.info(f"Created new spreadsheet: {name}")
         # Make it accessible (you can also share with specific emails)
         spreadsheet.share(None, perm_type='anyone', role='reader')
         logger.info("Spreadsheet shared as view-only to anyone with link")
@@ -70,53 +79,246 @@ def get_or_create_worksheet(
     try:
         worksheet = spreadsheet.worksheet(name)
     except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title=name, rows=1000, cols=10)
+        worksheet = spreadsheet.add_worksheet(title=name, rows=1000, cols=len(HEADERS))
         # Add headers
-        headers = ["timestamp", "symbol", "funding_rate", "funding_rate_pct",
-                   "annualized_rate", "mark_price"]
-        worksheet.append_row(headers)
+        worksheet.append_row(HEADERS)
         logger.info(f"Created worksheet with headers: {name}")
 
     return worksheet
 
 
-def append_funding_rates(rates: List[Dict[str, Any]]) -> Optional[str]:
+def build_rows(rates: FundingBatch) -> List[list]:
+    """Worksheet rows (in HEADERS order) for a batch of funding rates."""
+    rows = []
+    funding_rates = rates.values["funding_rate"].tolist()
+    mark_prices = rates.values["mark_price"].tolist()
+    for timestamp, symbol, funding_rate, mark_price in zip(
+        rates.iso_timestamps(), rates.symbol_array().tolist(), funding_rates, mark_prices
+    ):
+        funding_pct = funding_rate * 100
+        annualized = funding_pct * 24 * 365  # 8-hour funding * 3 * 365
+
+        rows.append([
+            timestamp,
+            symbol,
+            funding_rate,
+            round(funding_pct, 6),
+            round(annualized, 2),
+            mark_price
+        ])
+    return rows
+
+
+def _is_quota_error(error: Exception) -> bool:
+    """True for an API error caused by exceeding the Sheets request quota (HTTP 429)."""
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    response = getattr(error, "response", None)
+    return getattr(error, "code", None) == 429 or getattr(response, "status_code", None) == 429
+
+
+def rotation_target(month: str, rotation: Optional[str] = SHEETS_ROTATION) -> Tuple[str, str]:
+    """
+    Spreadsheet and worksheet that rows from `month` (YYYY-MM) are appended to.
+
+    With "monthly_spreadsheet" each month gets its own spreadsheet
+    ("Hyperliquid Funding Rates 2025-01"), with "monthly" its own worksheet
+    ("Funding Rates 2025-01"), and with None everything goes to one
+    worksheet. The Sheets cell limit is per spreadsheet, so with "monthly"
+    old tabs have to be archived by hand eventually. "monthly_spreadsheet"
+    avoids that but is opt-in, since every new spreadsheet is shared with
+    anyone who has the link.
+    """
+    if rotation == "monthly":
+        return SPREADSHEET_NAME, f"{WORKSHEET_NAME} {month}"
+    if rotation == "monthly_spreadsheet":
+        return f"{SPREADSHEET_NAME} {month}", WORKSHEET_NAME
+    if rotation is None:
+        return SPREADSHEET_NAME, WORKSHEET_NAME
+    raise ValueError(f"Unknown sheets rotation: {rotation} (choose from {ROTATIONS})")
+
+
+class SheetsExporter:
+    """
+    Google Sheets writer that authenticates once and reuses its handles.
+
+    The authorized client, each spreadsheet and each worksheet are looked up
+    on first use and cached, so a write is one `append_rows` call instead of
+    a credentials read, an auth round-trip and several Drive/Sheets lookups.
+    Errors are raised for the caller to retry: the export queue already
+    backs off between attempts (and stops waiting on shutdown), so writes
+    rejected for quota (HTTP 429) are not retried here too. On any other API
+    error the cached spreadsheet and worksheet handles are dropped first
+    (the sheet may have been deleted or renamed).
+
+    Rows are appended to a worksheet (or spreadsheet) per month, see
+    `rotation_target`, so no sheet grows without bound and append latency
+    stays flat. If `latest_worksheet` is set, that tab of the main
+    spreadsheet is overwritten in place with the newest snapshot using a
+    single range update, unless the batch is older than the snapshot already
+    there (e.g. a replayed dead-letter batch).
+
+    A batch spanning several months takes one append per month. If a later
+    month fails, the rows already appended are remembered, and the retry
+    (in memory or replayed from the dead-letter spool, however it is
+    chunked) sends only the rest.
+
+    The client factory is injectable so tests can use a fake gspread client
+    and count its calls (see src.exporters).
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], gspread.Client] = get_gspread_client,
+        rotation: Optional[str] = SHEETS_ROTATION,
+        latest_worksheet: Optional[str] = SHEETS_LATEST_WORKSHEET
+    ):
+        rotation_target("2000-01", rotation)  # Validate early
+        self.client_factory = client_factory
+        self.rotation = rotation
+        self.latest_worksheet = latest_worksheet
+        self._lock = threading.RLock()
+        self._client: Optional[gspread.Client] = None
+        self._spreadsheets: Dict[str, gspread.Spreadsheet] = {}
+        self._worksheets: Dict[Tuple[str, str], gspread.Worksheet] = {}
+        # Rows (headers included) and time (epoch ms) of the last snapshot written; None until the first one
+        self._latest_rows: Optional[int] = None
+        self._latest_time: Optional[int] = None
+        # (time, symbol) of rows appended by calls that then failed, so retries skip them
+        self._appended: Set[Tuple[int, str]] = set()
+
+    def spreadsheet(self, name: str = SPREADSHEET_NAME) -> gspread.Spreadsheet:
+        """A spreadsheet (authenticating and opening it on first use)."""
+        if self._client is None:
+            self._client = self.client_factory()
+        if name not in self._spreadsheets:
+            self._spreadsheets[name] = get_or_create_spreadsheet(self._client, name)
+        return self._spreadsheets[name]
+
+    def worksheet(self, name: str = WORKSHEET_NAME, spreadsheet: str = SPREADSHEET_NAME) -> gspread.Worksheet:
+        """A worksheet of a spreadsheet, created with headers if needed."""
+        key = (spreadsheet, name)
+        if key not in self._worksheets:
+            self._worksheets[key] = get_or_create_worksheet(self.spreadsheet(spreadsheet), name)
+        return self._worksheets[key]
+
+    def reset(self) -> None:
+        """Forget cached spreadsheet and worksheet handles (the authorized client is kept)."""
+        self._spreadsheets.clear()
+        self._worksheets.clear()
+
+    def _call(self, request: Callable[[], None]) -> None:
+        """Run one Sheets request, dropping cached handles on any API error but a quota one."""
+        with self._lock:
+            try:
+                request()
+            except gspread.exceptions.APIError as e:
+                if _is_quota_error(e):
+                    logger.warning("Sheets quota exceeded")
+                else:
+                    self.reset()
+                raise
+
+    def append_rows(
+        self,
+        rows: List[list],
+        name: str = WORKSHEET_NAME,
+        spreadsheet: str = SPREADSHEET_NAME
+    ) -> None:
+        """Append rows to a worksheet in one request."""
+        self._call(lambda: self.worksheet(name, spreadsheet).append_rows(rows, value_input_option="RAW"))
+
+    def write_latest(self, rows: List[list]) -> None:
+        """
+        Overwrite the latest-snapshot tab with `rows` in one range update.
+
+        Rows left over from a longer previous snapshot are blanked in the
+        same request, so the tab never grows. The first update of a process
+        blanks the tab's whole grid, since earlier runs may have left rows.
+        """
+        def update():
+            worksheet = self.worksheet(self.latest_worksheet)
+            previous = worksheet.row_count if self._latest_rows is None else self._latest_rows
+            values = [HEADERS] + rows
+            values += [[""] * len(HEADERS)] * max(previous - len(values), 0)
+            worksheet.update(range_name="A1", values=values, value_input_option="RAW")
+
+        self._call(update)
+        self._latest_rows = len(rows) + 1
+
+    def __call__(self, rates: FundingBatch) -> str:
+        """
+        Append a batch of funding rates, raising on failure so callers can retry.
+
+        Returns:
+            URL of the spreadsheet holding the newest rows
+        """
+        keys = list(zip(rates.time.tolist(), rates.symbol_array().tolist()))
+        pending = rates
+        if self._appended:
+            sent = np.fromiter((key in self._appended for key in keys), dtype=bool, count=len(keys))
+            pending = rates.take(~sent)
+            if sent.any():
+                logger.info(f"Skipping {int(sent.sum())} rows already appended before an earlier failure")
+
+        months = pending.time.astype("datetime64[ms]").astype("datetime64[M]")
+        target = None
+        for month in np.unique(months):
+            target = rotation_target(str(month), self.rotation)
+            in_month = pending.take(months == month)
+            rows = build_rows(in_month)
+            self.append_rows(rows, name=target[1], spreadsheet=target[0])
+            self._appended.update(zip(in_month.time.tolist(), in_month.symbol_array().tolist()))
+            logger.info(f"Appended {len(rows)} rows to Google Sheet {target[0]} / {target[1]}")
+
+        newest = int(rates.time.max()) if len(rates) else None
+        if self.latest_worksheet and newest is not None and (self._latest_time is None or newest > self._latest_time):
+            self.write_latest(build_rows(rates.take(rates.time == newest)))
+            self._latest_time = newest
+
+        # The whole batch is in the sheet, so its retry markers are no longer needed
+        self._appended.difference_update(keys)
+        return self.spreadsheet(target[0] if target else SPREADSHEET_NAME).url
+
+
+_exporter: Optional[SheetsExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> SheetsExporter:
+    """Get the process-wide Sheets exporter (one authenticated client per process)."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = SheetsExporter()
+        return _exporter
+
+
+def export_funding_rates(rates: FundingBatch) -> str:
+    """
+    Append funding rates to Google Sheet, raising on failure so callers can retry.
+
+    Args:
+        rates: Collected funding rates
+
+    Returns:
+        Spreadsheet URL
+    """
+    return get_exporter()(rates)
+
+
+def append_funding_rates(rates: FundingBatch) -> Optional[str]:
     """
     Append funding rates to Google Sheet.
 
     Args:
-        rates: List of funding rate records
+        rates: Collected funding rates
 
     Returns:
         Spreadsheet URL if successful, None otherwise
     """
     try:
-        client = get_gspread_client()
-        spreadsheet = get_or_create_spreadsheet(client)
-        worksheet = get_or_create_worksheet(spreadsheet)
-
-        # Prepare rows
-        rows = []
-        for rate in rates:
-            funding_rate = rate["funding_rate"]
-            funding_pct = funding_rate * 100
-            annualized = funding_pct * 24 * 365  # 8-hour funding * 3 * 365
-
-            rows.append([
-                rate["timestamp"],
-                rate["symbol"],
-                funding_rate,
-                round(funding_pct, 6),
-                round(annualized, 2),
-                rate["mark_price"]
-            ])
-
-        # Batch append for efficiency
-        worksheet.append_rows(rows, value_input_option="RAW")
-
-        logger.info(f"Appended {len(rows)} rows to Google Sheet")
-        return spreadsheet.url
-
+        return export_funding_rates(rates)
     except Exception as e:
         logger.error(f"Failed to write to Google Sheets: {e}")
         return None
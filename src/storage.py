@@ -1,11 +1,19 @@
-"""CSV storage for funding rates data."""
+"""Storage for live funding rate snapshots."""
 
 import os
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
 
-from config import FUNDING_RATES_FILE, DATA_DIR
+from config import DATA_DIR, LATEST_RATES_FILE
+from src.backends import get_backend, to_epoch_ms, DATASET_COLUMNS
+from src.batch import FundingBatch
+from src.segment_log import SegmentLog
+from src.fileutil import write_json_atomic, read_json
+from src.rollups import update_rollups
+from src.rolling import update_rolling
+
+_segment_log = SegmentLog()
 
 
 def ensure_data_dir():
@@ -13,30 +21,160 @@ def ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def save_funding_rates(rates: List[Dict[str, Any]]) -> None:
+def save_funding_rates(rates: FundingBatch, compact: bool = True) -> None:
     """
-    Append funding rates to CSV file.
+    Durably record collected funding rates.
+
+    The batch is first appended to the crash-safe segment log. Compaction
+    then moves logged rows into the configured storage backend, refreshes
+    the latest-snapshot sidecar so that get_latest_rates and
+    get_available_symbols never need to scan the full history, and folds the
+    new rows into the daily/weekly rollups and the rolling stats.
 
     Args:
-        rates: List of funding rate records
+        rates: Collected funding rates
+        compact: Compact immediately (pass False when a LogCompactor runs)
     """
-    ensure_data_dir()
+    _segment_log.append(rates)
+    if compact:
+        compact_funding_log()
+
+
+def compact_funding_log() -> int:
+    """
+    Merge every logged batch into storage and delete the merged segments.
+
+    Returns:
+        Number of logged rows processed
+    """
+    return _segment_log.compact(_merge_funding_rates)
 
-    df = pd.DataFrame(rates)
 
-    file_exists = os.path.exists(FUNDING_RATES_FILE)
+def _merge_funding_rates(batch: FundingBatch) -> None:
+    """
+    Store logged rows that are not in the funding_rates dataset yet.
 
-    df.to_csv(
-        FUNDING_RATES_FILE,
-        mode='a',
-        header=not file_exists,
-        index=False
+    Duplicate (timestamp, symbol) rows, within the batch or already stored
+    by an earlier compaction that crashed before deleting its segments, are
+    dropped, so derived datasets never count a row twice.
+    """
+    ensure_data_dir()
+    backend = get_backend()
+
+    df = batch.to_frame().drop_duplicates(subset=["timestamp", "symbol"], keep="last")
+    stored = backend.read(
+        "funding_rates",
+        columns=["timestamp", "symbol"],
+        symbols=df["symbol"].unique().tolist(),
+        start=df["timestamp"].min()
     )
+    if not stored.empty:
+        stored_keys = pd.MultiIndex.from_arrays([stored["symbol"], to_epoch_ms(stored["timestamp"])])
+        new_keys = pd.MultiIndex.from_arrays([df["symbol"], to_epoch_ms(df["timestamp"])])
+        df = df[~new_keys.isin(stored_keys)]
+    if df.empty:
+        return
+
+    backend.append("funding_rates", df)
+    _update_latest_snapshot(df)
+    update_rollups("funding_rates", df)
+    update_rolling("funding_rates", df)
+
+
+def _update_latest_snapshot(df: pd.DataFrame) -> None:
+    """
+    Merge a newly saved batch into the latest-snapshot sidecar.
+
+    The sidecar holds the rows of the most recent collection plus the sorted
+    list of every symbol seen so far, and is replaced atomically.
+    """
+    if df.empty:
+        return
+
+    snapshot = read_json(LATEST_RATES_FILE)
+    if snapshot is None:
+        snapshot = _build_latest_snapshot()
+
+    timestamps = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    batch_latest = timestamps.max()
+    latest = df[timestamps == batch_latest].copy()
+    latest["timestamp"] = batch_latest.isoformat()
+
+    current = snapshot.get("timestamp")
+    if current is None or batch_latest >= pd.Timestamp(current):
+        snapshot["timestamp"] = batch_latest.isoformat()
+        snapshot["rates"] = latest.to_dict(orient="records")
+
+    snapshot["symbols"] = sorted(set(snapshot.get("symbols", [])) | set(df["symbol"].unique().tolist()))
+
+    write_json_atomic(LATEST_RATES_FILE, snapshot)
+
+
+def _build_latest_snapshot() -> Dict[str, Any]:
+    """Build the latest-snapshot sidecar contents by scanning stored data once."""
+    symbols = query_funding_rates(columns=["symbol"])
+    timestamps = query_funding_rates(columns=["timestamp"])
+
+    if timestamps.empty:
+        return {"timestamp": None, "rates": [], "symbols": []}
+
+    latest_timestamp = timestamps["timestamp"].max()
+    latest = query_funding_rates(start=latest_timestamp)
+    latest["timestamp"] = latest_timestamp.isoformat()
+
+    return {
+        "timestamp": latest_timestamp.isoformat(),
+        "rates": latest.to_dict(orient="records"),
+        "symbols": sorted(symbols["symbol"].unique().tolist()),
+    }
+
+
+def _load_latest_snapshot() -> Dict[str, Any]:
+    """Read the latest-snapshot sidecar, rebuilding it if it is missing."""
+    snapshot = read_json(LATEST_RATES_FILE)
+    if snapshot is None:
+        snapshot = _build_latest_snapshot()
+        if snapshot["timestamp"] is not None:
+            write_json_atomic(LATEST_RATES_FILE, snapshot)
+    return snapshot
+
+
+def query_funding_rates(
+    symbols: Optional[List[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Read only the funding rate rows and columns that match the filters.
+
+    Filters are pushed down to the storage backend, so rows outside the
+    selection are dropped while reading instead of after loading everything.
+
+    Args:
+        symbols: Symbols to include (None = all)
+        start: Inclusive start time (None = no lower bound)
+        end: Inclusive end time (None = no upper bound)
+        columns: Columns to return (None = all)
+
+    Returns:
+        DataFrame with matching funding rate data, sorted by timestamp
+    """
+    backend = get_backend()
+
+    if not backend.exists("funding_rates"):
+        return pd.DataFrame(columns=columns or DATASET_COLUMNS["funding_rates"])
+
+    df = backend.read("funding_rates", columns=columns, symbols=symbols, start=start, end=end)
+
+    if "timestamp" in df.columns:
+        df = df.sort_values("timestamp")
+    return df
 
 
 def load_funding_rates(days: int = None) -> pd.DataFrame:
     """
-    Load funding rates from CSV file.
+    Load funding rates from the configured storage backend.
 
     Args:
         days: Optional number of days to load (None = all data)
@@ -44,35 +182,31 @@ def load_funding_rates(days: int = None) -> pd.DataFrame:
     Returns:
         DataFrame with funding rate data
     """
-    if not os.path.exists(FUNDING_RATES_FILE):
-        return pd.DataFrame(columns=["timestamp", "symbol", "funding_rate", "mark_price", "day_ntl_vlm", "open_interest"])
-
-    df = pd.read_csv(FUNDING_RATES_FILE)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-
+    cutoff = None
     if days is not None:
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        df = df[df["timestamp"] >= cutoff]
 
-    return df.sort_values("timestamp")
+    return query_funding_rates(start=cutoff)
 
 
 def get_latest_rates() -> pd.DataFrame:
     """
     Get the most recent funding rates for all symbols.
 
+    Reads only the latest-snapshot sidecar, so the cost does not grow with
+    the amount of stored history.
+
     Returns:
         DataFrame with latest rates per symbol
     """
-    df = load_funding_rates()
+    snapshot = _load_latest_snapshot()
 
-    if df.empty:
-        return df
-
-    # Get the most recent timestamp
-    latest_timestamp = df["timestamp"].max()
+    if not snapshot["rates"]:
+        return pd.DataFrame(columns=DATASET_COLUMNS["funding_rates"])
 
-    return df[df["timestamp"] == latest_timestamp]
+    df = pd.DataFrame(snapshot["rates"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", utc=True)
+    return df
 
 
 def get_available_symbols() -> List[str]:
@@ -82,12 +216,7 @@ def get_available_symbols() -> List[str]:
     Returns:
         List of symbol names
     """
-    df = load_funding_rates()
-
-    if df.empty:
-        return []
-
-    return sorted(df["symbol"].unique().tolist())
+    return _load_latest_snapshot()["symbols"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+"""Parallel parameter sweeps of the threshold carry strategy."""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.backtest import HOURS_PER_YEAR, threshold_backtest, trailing_mean
+from src.matrix import FundingMatrix
+
+logger = logging.getLogger(__name__)
+
+# Columns written for every parameter set, in file order
+RESULT_COLUMNS = [
+    "entry_pct", "exit_pct", "lookback_hours", "rebalance_hours", "fee_bps",
+    "final_index", "total_return", "annualized_return", "sharpe", "max_drawdown", "turnover", "hours",
+]
+
+# Rows buffered before each write to the results file
+WRITE_BATCH_ROWS = 1000
+
+
+class SweepParams(NamedTuple):
+    entry_pct: float  # Open when trailing mean funding (annualized %) rises above this
+    exit_pct: float   # Close when it falls below this
+    lookback_hours: int
+    rebalance_hours: int
+    fee_bps: float
+
+
+def parameter_grid(
+    entry_pct: Sequence[float],
+    exit_pct: Sequence[float],
+    lookback_hours: Sequence[int],
+    rebalance_hours: Sequence[int],
+    fee_bps: Sequence[float]
+) -> List[SweepParams]:
+    """
+    Every combination of the given values, skipping exits above their entry.
+
+    Ordered by lookback first, so consecutive tasks can reuse a worker's
+    trailing means.
+    """
+    grid = itertools.product(lookback_hours, entry_pct, exit_pct, rebalance_hours, fee_bps)
+    return [
+        SweepParams(entry, exit, lookback, rebalance, fee)
+        for lookback, entry, exit, rebalance, fee in grid
+        if exit <= entry
+    ]
+
+
+def _hourly(pct: float) -> float:
+    """Annualized funding in percent to an hourly rate."""
+    return pct / 100 / HOURS_PER_YEAR
+
+
+# Per-process state: the memory-mapped matrix and the last trailing mean computed from it
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(values_path: str) -> None:
+    """Map the shared matrix read-only; every worker shares the same OS pages."""
+    _worker["matrix"] = FundingMatrix(np.load(values_path, mmap_mode="r"), [], 0)
+    _worker["score"] = (None, None)
+
+
+def _run_one(params: SweepParams) -> Tuple:
+    matrix: FundingMatrix = _worker["matrix"]
+    lookback, score = _worker["score"]
+    if lookback != params.lookback_hours:
+        rates = np.asarray(matrix.values, dtype=np.float64)
+        score = trailing_mean(rates, ~np.isnan(rates), params.lookback_hours)
+        _worker["score"] = (params.lookback_hours, score)
+
+    stats = threshold_backtest(
+        matrix,
+        _hourly(params.entry_pct),
+        _hourly(params.exit_pct),
+        lookback_hours=params.lookback_hours,
+        rebalance_hours=params.rebalance_hours,
+        fee_bps=params.fee_bps,
+        score=score
+    ).stats().iloc[0]
+    return tuple(params) + tuple(float(stats[column]) for column in RESULT_COLUMNS[len(params):])
+
+
+def run_sweep(
+    matrix: FundingMatrix,
+    grid: Sequence[SweepParams],
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> Iterator[Tuple]:
+    """
+    Backtest every parameter set across a process pool, streaming result rows back in order.
+
+    The matrix is written once to a temporary .npy file that every worker
+    memory-maps, so tasks only carry their parameters and workers share one
+    copy of the data rather than unpickling their own.
+
+    Args:
+        matrix: Hourly funding rates, symbols x hours
+        grid: Parameter sets to run
+        workers: Worker processes (default: one per core)
+        chunk_size: Parameter sets sent to a worker at a time (default:
+            enough for ~4 chunks per worker)
+
+    Yields:
+        Tuples in RESULT_COLUMNS order, in grid order
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, len(grid) // (workers * 4))
+
+    shared_dir = tempfile.mkdtemp(prefix="sweep-")
+    try:
+        values_path = os.path.join(shared_dir, "values.npy")
+        np.save(values_path, np.ascontiguousarray(matrix.values, dtype=np.float64))
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(values_path,)) as pool:
+            yield from pool.map(_run_one, grid, chunksize=chunk_size)
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+def write_results(rows: Iterator[Tuple], path: str, total: Optional[int] = None) -> int:
+    """
+    Stream result rows to a Parquet file, one row group per WRITE_BATCH_ROWS rows.
+
+    Args:
+        rows: Result tuples in RESULT_COLUMNS order
+        path: Output .parquet file
+        total: Expected row count, for progress logging
+
+    Returns:
+        Number of rows written
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Writing sweep results requires pyarrow (pip install pyarrow)") from e
+
+    schema = pa.schema(
+        [(column, pa.int64() if column in ("lookback_hours", "rebalance_hours", "hours") else pa.float64())
+         for column in RESULT_COLUMNS]
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    written = 0
+    started = time.monotonic()
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in itertools.chain(rows, [None]):
+            if row is not None:
+                batch.append(row)
+            if batch and (row is None or len(batch) >= WRITE_BATCH_ROWS):
+                columns = list(zip(*batch))
+                writer.write_table(pa.table(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+                ))
+                written += len(batch)
+                batch = []
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Wrote {written:,}{f'/{total:,}' if total else ''} results "
+                    f"({written / max(elapsed, 1e-9):.0f}/s)"
+                )
+    return written
+
+
+if __name__ == "__main__":
+    # Benchmark: sweep throughput with 1 worker vs one per core
+    n_symbols, n_hours = 100, 24 * 180
+    rng = np.random.default_rng(0)
+    values = rng.normal(1e-5, 2e-5, (n_symbols, n_hours))
+    values[rng.random(values.shape) < 0.02] = np.nan
+    matrix = FundingMatrix(values, [f"SYM{i}" for i in range(n_symbols)], 0)
+    grid = parameter_grid([5, 10, 20, 40], [-5, 0, 5], [24, 168], [1, 24], [0, 5])
+    print(f"{n_symbols} symbols x {n_hours:,} hours, {len(grid)} parameter sets")
+
+    cores = os.cpu_count() or 1
+    baseline = None
+    for workers in sorted({1, cores}):
+        started = time.perf_counter()
+        rows = list(run_sweep(matrix, grid, workers=workers))
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(
+            f"{workers:3d} worker(s): {elapsed:6.2f} s, {len(rows) / elapsed:6.1f} sets/s "
+            f"(speedup {baseline / elapsed:.1f}x)"
+        )